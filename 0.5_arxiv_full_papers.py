@@ -21,6 +21,8 @@ from typing import List, Dict, Optional
 import requests
 from pathlib import Path
 
+from json_stream import iter_records
+
 # Try to import PDF libraries
 try:
     import fitz  # pymupdf (import as fitz, not PyMuPDF)
@@ -220,18 +222,16 @@ def process_arxiv_papers():
     print(f"⏱️  Rate limit: {RATE_LIMIT_DELAY}s between downloads")
     print()
 
-    # Load existing data
+    # Load existing data (streamed, keeping only the arXiv papers)
     print("📖 Loading existing arXiv abstracts...")
     try:
-        with open(INPUT_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        arxiv_papers = [doc for doc in iter_records(INPUT_FILE, key='documents')
+                        if doc.get('source') == 'arxiv']
     except FileNotFoundError:
         print(f"❌ ERROR: {INPUT_FILE} not found!")
         print("   Run 0.1_superconductor_scraper.py first to collect arXiv abstracts.")
         return
 
-    # Filter arXiv papers
-    arxiv_papers = [doc for doc in data if doc.get('source') == 'arxiv']
     print(f"✅ Found {len(arxiv_papers)} arXiv papers")
 
     if MAX_PAPERS:
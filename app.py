@@ -4,220 +4,294 @@ Superconductor Semantic Search V7 - Semantic Relevance Search
 
 Gradio interface for the semantic search engine using Model V7.
 Returns the most semantically relevant results with difficulty labels.
+Documents are indexed as overlapping passages; passage hits are aggregated
+per document and the best-matching passage is shown as the snippet.
+
+Search modes: 'dense' (embeddings), 'lexical' (BM25) or 'hybrid' (both,
+merged by reciprocal rank fusion; the default, set with SEARCH_MODE).
+Filters (source, difficulty, type, focus_area) are applied inside the
+search, so a filtered list still has k results when k documents match.
+
+Query encoding backend: ENCODER_BACKEND=torch (default) / torch-int8 / onnx /
+onnx-int8 (export the ONNX graphs first with export_onnx_encoder.py).
+
+JSON API (served next to the UI, sharing the same model and index):
+    GET  /api/search?q=meissner+effect&k=10&sort_by_difficulty=false&mode=hybrid
+    GET  /api/search?q=cooper+pairs&difficulty=Beginner&source=wikipedia&source=youtube
+    POST /api/search/batch   {"queries": [...], "k": 10, "sort_by_difficulty": false, "mode": "hybrid",
+                              "filters": {"difficulty": ["Beginner"]}}
+    GET  /api/filters        filterable values per field
+    GET  /metrics            per-stage latency histograms (Prometheus text format)
+
+Every search is traced (see search_metrics.py): API responses carry an
+X-Trace-Id header (taken from X-Request-ID / traceparent when sent), and
+SEARCH_TRACE_LOG=1 prints one JSON line per request with its stage timings.
+
+Startup is staged: the server comes up at once and loads the model, index
+and caches in a background thread. Health checks for orchestrators:
+    GET  /healthz            liveness (503 only if startup failed)
+    GET  /readyz             readiness (503 until loaded) with per-stage timings
+Searches before that are answered with 503 + Retry-After, or held for up to
+SEARCH_READY_WAIT_SECONDS if that is set.
+
+Hot swap: with SEARCH_BUNDLES_DIR set, the version named in its CURRENT
+file is served and the directory is watched (see bundle_watcher.py); a new
+version is loaded and smoke-tested in the background, then swapped in
+while requests already running finish on the old one.
 """
 
 import gradio as gr
-import json
-import numpy as np
-from sentence_transformers import SentenceTransformer, util
+import uvicorn
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
 import os
-from pathlib import Path
+import threading
+
+from build_search_index import DIFFICULTY_LABELS
+from bundle_watcher import (
+    WATCH_INTERVAL_SECONDS,
+    BundleWatcher,
+    bundle_from_manifest,
+    read_current,
+    read_manifest,
+)
+from query_batcher import BATCH_MAX_SIZE
+from search_engine import SearchBundle, search_modes
+from search_filters import normalize_filters
+from search_html import EMPTY_QUERY_HTML, SOURCE_EMOJIS, render_results_html, render_startup_html
+from search_metrics import REGISTRY, TRACE_ID_HEADER, incoming_trace_id, span, trace
+from startup import READY_WAIT_SECONDS, RETRY_AFTER_SECONDS, StagedStartup
 
 # ============================================================================
-# LOAD MODEL AND DOCUMENTS
+# STAGED STARTUP
 # ============================================================================
 
-print("=" * 70)
-print("🚀 Loading Superconductor Search V7...")
-print("=" * 70)
-
-# Load Model V7
-print("📥 Loading Model V7...")
+# Model, index and caches load in a background thread; the server answers
+# /healthz and /readyz (and rejects searches with 503) until they are ready
 model_path = "models/superconductor-search-v7"
-model = SentenceTransformer(model_path)
-print(f"✅ Model V7 loaded from: {model_path}")
-
-# Load documents
-print("📥 Loading documents...")
+# Documents are served from the index artifact's memory-mapped document store;
+# the raw corpus is only read (hashed) to check the artifact is up to date
 docs_path = "training/documents.json"
-with open(docs_path, 'r', encoding='utf-8') as f:
-    documents = json.load(f)
-print(f"✅ Documents loaded: {len(documents)} documents")
-
-# Encode all documents
-print("🔄 Encoding documents...")
-doc_texts = [str(doc.get('content', ''))[:500] for doc in documents]  # Use first 500 chars
-doc_embeddings = model.encode(doc_texts, convert_to_numpy=True, show_progress_bar=True)
-print(f"✅ Document embeddings created: {doc_embeddings.shape}")
+index_dir = os.environ.get("SEARCH_INDEX_DIR", "search_index")
+
+# Versioned bundles directory to serve from and watch (unset = fixed model / index above)
+bundles_dir = os.environ.get('SEARCH_BUNDLES_DIR')
+bundle_watcher: Optional[BundleWatcher] = None
+
+# Published once every stage has succeeded; requests never see a partial bundle.
+# Each request reads this reference once, so a swap never mixes two versions
+search_bundle: Optional[SearchBundle] = None
+if bundles_dir:
+    if read_current(bundles_dir) is None:
+        raise FileNotFoundError(f"{bundles_dir}/CURRENT not found - activate a version with bundle_watcher.py")
+    _loading_bundle = bundle_from_manifest(read_manifest(bundles_dir, read_current(bundles_dir)), docs_path)
+else:
+    _loading_bundle = SearchBundle(model_path, docs_path, index_dir)
+
+def swap_bundle(bundle: SearchBundle):
+    """Serve bundle from now on; the previous one is retired once its requests finish."""
+    global search_bundle
+    previous, search_bundle = search_bundle, bundle
+    threading.Thread(target=previous.retire, name='bundle-retire', daemon=True).start()
+
+def publish_bundle():
+    global search_bundle, bundle_watcher
+    search_bundle = _loading_bundle
+    if bundles_dir:
+        bundle_watcher = BundleWatcher(
+            bundles_dir, swap_bundle, current_version=search_bundle.version, default_docs_path=docs_path,
+            interval_seconds=float(os.environ.get('SEARCH_BUNDLE_WATCH_INTERVAL', WATCH_INTERVAL_SECONDS)),
+        ).start()
+
+startup = StagedStartup(_loading_bundle.stages(), on_ready=publish_bundle)
+startup.start()
+
+# How long a request waits for startup before it is rejected (0 = reject at once)
+ready_wait_seconds = float(os.environ.get('SEARCH_READY_WAIT_SECONDS', READY_WAIT_SECONDS))
+
+class NotReadyError(RuntimeError):
+    """Search requested before startup finished (or after it failed)."""
+
+def current_bundle(timeout: Optional[float] = None) -> SearchBundle:
+    """
+    The loaded search bundle, waiting up to timeout (default: SEARCH_READY_WAIT_SECONDS).
 
-print("=" * 70)
-print(f"✅ Search system ready! {len(documents)} documents indexed")
-print("=" * 70)
+    Raises:
+        NotReadyError: Startup is still running or has failed
+    """
+    if not startup.wait(ready_wait_seconds if timeout is None else timeout):
+        raise NotReadyError(f"Search engine is {startup.state} (stage: {startup.current_stage})")
+    return search_bundle
 
 # ============================================================================
-# HELPER FUNCTIONS
+# SEARCH FUNCTIONS
 # ============================================================================
 
-def get_document_difficulty_label(doc: dict) -> str:
+def search(query: str, num_results: int = 10, sort_by_difficulty: bool = False,
+           mode: Optional[str] = None, filters: Optional[Dict] = None) -> list:
     """
-    Get difficulty label for a document based on its source and difficulty_level field.
+    Search for documents matching the query (see SearchBundle.search).
 
-    Returns:
-        'Beginner', 'Intermediate', or 'Advanced'
-    """
-    # First check if document has explicit difficulty level
-    doc_difficulty = doc.get('difficulty_level', None)
-    if doc_difficulty:
-        if doc_difficulty <= 2:
-            return 'Beginner'
-        elif doc_difficulty <= 3:
-            return 'Intermediate'
-        else:
-            return 'Advanced'
-
-    # Fallback: infer from source
-    source = doc.get('source', 'unknown')
-    if source == 'simple_wikipedia':
-        return 'Beginner'
-    elif source in ['wikipedia', 'youtube', 'hyperphysics']:
-        return 'Intermediate'
-    elif source in ['arxiv', 'mit_ocw']:
-        return 'Advanced'
-    else:
-        return 'Intermediate'
-
-def get_best_results(similarities: np.ndarray, top_k: int = 10, sort_by_difficulty: bool = False) -> list:
+    Raises:
+        NotReadyError: Startup has not finished
     """
-    Get top-k results sorted by similarity score.
-
-    Args:
-        similarities: Similarity scores for all documents
-        top_k: Number of results to return
-        sort_by_difficulty: If True, sort results by difficulty (Beginner → Advanced)
-                          while preserving semantic relevance within each tier
+    return current_bundle().search(query, num_results, sort_by_difficulty, mode, filters)
 
-    Returns:
-        List of (idx, score, doc, difficulty) tuples
+def search_many(queries: list, num_results: int = 10, sort_by_difficulty: bool = False,
+                mode: Optional[str] = None, filters: Optional[Dict] = None) -> list:
     """
-    # Get top indices sorted by similarity
-    top_indices = np.argsort(-similarities)[:top_k]
-
-    results = []
-    for idx in top_indices:
-        doc = documents[idx]
-        score = float(similarities[idx])
-        difficulty = get_document_difficulty_label(doc)
-
-        results.append((idx, score, doc, difficulty))
-
-    # Sort by difficulty if requested
-    if sort_by_difficulty:
-        # Define difficulty ordering
-        difficulty_order = {'Beginner': 1, 'Intermediate': 2, 'Advanced': 3}
+    Search several queries at once (see SearchBundle.search_many).
 
-        # Sort by difficulty first (ascending), then by similarity (descending) within each tier
-        results.sort(key=lambda x: (difficulty_order.get(x[3], 2), -x[1]))
-
-    return results
-
-# ============================================================================
-# SEARCH FUNCTION
-# ============================================================================
+    Raises:
+        NotReadyError: Startup has not finished
+    """
+    return current_bundle().search_many(queries, num_results, sort_by_difficulty, mode, filters)
 
-def perform_search(query, sort_by_difficulty=False, num_results=10):
+def perform_search(query, sort_by_difficulty=False, num_results=10, difficulties=None, sources=None):
     """
-    Search for documents matching the query.
+    Search for documents matching the query and render them as HTML (Gradio UI).
     Returns the most relevant documents and labels them by their difficulty level.
 
     Args:
         query: Search query string
         sort_by_difficulty: If True, sort results by difficulty (Beginner → Advanced)
         num_results: Number of results to return
+        difficulties / sources: Only return these difficulty levels / sources (None or empty = all)
     """
     if not query or not query.strip():
-        return "<p style='color: red;'>Please enter a search query.</p>"
-
-    # Encode query
-    query_embedding = model.encode([query], convert_to_numpy=True)
+        return EMPTY_QUERY_HTML
 
-    # Calculate similarities
-    similarities = util.cos_sim(query_embedding, doc_embeddings)[0].cpu().numpy()
+    try:
+        bundle = current_bundle()
+    except NotReadyError:
+        return render_startup_html(startup.status())
 
-    # Get best results (sorted by similarity or difficulty)
-    results = get_best_results(similarities, top_k=num_results, sort_by_difficulty=sort_by_difficulty)
+    filters = {'difficulty': difficulties or None, 'source': sources or None}
+    with trace('ui'):
+        results = bundle.search(query, num_results, sort_by_difficulty, filters=filters)
+        with span('render'):
+            return render_results_html(query, results, sort_by_difficulty)
 
-    if not results:
-        return "<p style='color: orange;'>No results found. Try a different query.</p>"
+# ============================================================================
+# JSON API
+# ============================================================================
 
-    # Colors for different difficulty levels
-    difficulty_colors = {
-        'Beginner': '#16a34a',       # Green
-        'Intermediate': '#0ea5e9',   # Blue
-        'Advanced': '#f59e0b'        # Orange
+API_MAX_RESULTS = 100
+API_MAX_BATCH_QUERIES = 256
+
+class BatchSearchRequest(BaseModel):
+    queries: List[str]
+    k: int = Field(10, ge=1, le=API_MAX_RESULTS)
+    sort_by_difficulty: bool = False
+    mode: Optional[str] = None
+    filters: Optional[Dict[str, List[str]]] = None
+
+def check_search_mode(mode: Optional[str]):
+    if mode is not None and mode not in search_modes():
+        raise HTTPException(status_code=400, detail=f"mode must be one of {search_modes()}")
+
+def check_filters(filters: Optional[Dict]) -> Optional[Dict]:
+    try:
+        normalize_filters(filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return filters
+
+def require_bundle() -> SearchBundle:
+    """Endpoint dependency: the search bundle, or 503 with the startup status."""
+    try:
+        return current_bundle()
+    except NotReadyError:
+        raise HTTPException(status_code=503, detail=startup.status(),
+                            headers={'Retry-After': str(RETRY_AFTER_SECONDS)})
+
+api = FastAPI(title="Superconductor Semantic Search V7")
+
+@api.get("/healthz")
+def healthz():
+    """Liveness: 200 while starting or ready, 503 once startup has failed."""
+    status = {'status': startup.state}
+    return status if startup.alive else JSONResponse(status, status_code=503)
+
+@api.get("/readyz")
+def readyz():
+    """Readiness: 200 once searches can be served, else 503 with stage progress and timings."""
+    status = startup.status()
+    if startup.ready:
+        status['bundle'] = search_bundle.describe()
+        if bundle_watcher is not None:
+            status['bundle_watcher'] = bundle_watcher.status()
+        return status
+    return JSONResponse(status, status_code=503, headers={'Retry-After': str(RETRY_AFTER_SECONDS)})
+
+@api.get("/api/search")
+def api_search(request: Request, response: Response,
+               q: str = Query(..., description="Search query"),
+               k: int = Query(10, ge=1, le=API_MAX_RESULTS),
+               sort_by_difficulty: bool = False,
+               mode: Optional[str] = Query(None, description=f"One of {search_modes()}"),
+               source: Optional[List[str]] = Query(None, description="Only these sources"),
+               difficulty: Optional[List[str]] = Query(None, description="Beginner / Intermediate / Advanced"),
+               type: Optional[List[str]] = Query(None, description="Only these document types"),
+               focus_area: Optional[List[str]] = Query(None, description="Only these focus areas"),
+               bundle: SearchBundle = Depends(require_bundle)):
+    """Search one query; returns ids, scores, source, difficulty, URL and snippet as JSON."""
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Query must not be empty")
+    check_search_mode(mode)
+    mode = mode or bundle.default_search_mode
+    filters = {'source': source, 'difficulty': difficulty, 'type': type, 'focus_area': focus_area}
+    with trace('api_search', incoming_trace_id(request.headers)) as request_trace:
+        response.headers[TRACE_ID_HEADER] = request_trace.trace_id
+        return {'query': q, 'k': k, 'mode': mode,
+                'results': bundle.search(q, k, sort_by_difficulty, mode, filters)}
+
+@api.post("/api/search/batch")
+def api_search_batch(request: BatchSearchRequest, http_request: Request, response: Response,
+                     bundle: SearchBundle = Depends(require_bundle)):
+    """Search many queries in one request (encoded and searched as one batch)."""
+    if len(request.queries) > API_MAX_BATCH_QUERIES:
+        raise HTTPException(status_code=400,
+                            detail=f"At most {API_MAX_BATCH_QUERIES} queries per request")
+    if any(not q.strip() for q in request.queries):
+        raise HTTPException(status_code=400, detail="Queries must not be empty")
+    check_search_mode(request.mode)
+    mode = request.mode or bundle.default_search_mode
+    filters = check_filters(request.filters)
+
+    with trace('api_search_batch', incoming_trace_id(http_request.headers)) as request_trace:
+        response.headers[TRACE_ID_HEADER] = request_trace.trace_id
+        all_results = (bundle.search_many(request.queries, request.k, request.sort_by_difficulty, mode, filters)
+                       if request.queries else [])
+    return {
+        'k': request.k,
+        'mode': mode,
+        'results': [{'query': q, 'results': results}
+                    for q, results in zip(request.queries, all_results)],
     }
 
-    source_emojis = {
-        'arxiv': '📄',
-        'youtube': '📺',
-        'wikipedia': '📖',
-        'simple_wikipedia': '📘',
-        'mit_ocw': '🎓',
-        'scholarpedia': '📚',
-        'hyperphysics': '🔬'
-    }
+@api.get("/metrics")
+def metrics():
+    """Per-stage and per-endpoint latency histograms, in the Prometheus text format."""
+    return PlainTextResponse(REGISTRY.render(), media_type='text/plain; version=0.0.4')
 
-    # Header
-    sort_info = "📚 Sorted: Beginner → Advanced (preserving relevance within each level)" if sort_by_difficulty else "🎯 Sorted: Most semantically relevant first"
-    html = f"""
-    <div style='margin-bottom: 20px; padding: 15px; background: #1e293b;
-                border-left: 4px solid #8b5cf6; border-radius: 10px; border: 1px solid #334155;'>
-        <h3 style='color:#f1f5f9; margin: 0 0 8px 0;'>🔍 Search Results for: "{query}"</h3>
-        <p style='margin: 0 0 5px 0; color: #94a3b8; font-size: 0.95em;'>
-            Found <strong>{len(results)}</strong> relevant results
-        </p>
-        <p style='margin: 0; color: #a78bfa; font-size: 0.85em; font-style: italic;'>
-            {sort_info}
-        </p>
-    </div>
-    """
-
-    # Results
-    for i, (idx, score, doc, difficulty) in enumerate(results, 1):
-        source = doc.get('source', 'unknown')
-        source_emoji = source_emojis.get(source, '📋')
-        source_label = source.replace('_', ' ').title()
-        title = doc.get('title', 'Untitled')
-        url = doc.get('url', '#')
-        difficulty_color = difficulty_colors.get(difficulty, '#0ea5e9')
-
-        html += f"""
-        <div style='background: #1e293b; border-radius: 12px; padding: 16px; margin-bottom: 14px;
-                    border: 1px solid #334155; box-shadow: 0 2px 8px rgba(0,0,0,0.3);
-                    border-left: 4px solid {difficulty_color};'>
-            <div style='display: flex; align-items: center; gap: 10px; margin-bottom: 8px;'>
-                <span style='background: {difficulty_color}; color: white; font-weight: 700;
-                             border-radius: 50%; width: 28px; height: 28px; display: flex;
-                             align-items: center; justify-content: center; font-size: 0.9em;'>
-                    {i}
-                </span>
-                <a href='{url}' target='_blank' style='font-size: 1.1em; font-weight: 600;
-                   color: #f1f5f9; text-decoration: none; flex: 1;'>
-                    {source_emoji} {title}
-                </a>
-            </div>
-            <div style='display: flex; gap: 8px; flex-wrap: wrap;'>
-                <span style='background: {difficulty_color}; color: white; padding: 4px 12px;
-                             border-radius: 999px; font-size: 0.85em; font-weight: 600;'>
-                    {difficulty}
-                </span>
-                <span style='background: #312e81; color: #a5b4fc; padding: 4px 12px;
-                             border-radius: 999px; font-size: 0.85em; font-weight: 600;'>
-                    {source_label}
-                </span>
-                <span style='background: #0f172a; color: #94a3b8; padding: 4px 12px;
-                             border-radius: 999px; font-size: 0.85em;'>
-                    Similarity: {score:.4f}
-                </span>
-            </div>
-        </div>
-        """
-
-    return html
+@api.get("/api/filters")
+def api_filters(bundle: SearchBundle = Depends(require_bundle)):
+    """Filterable values per field (source, difficulty, type, focus_area)."""
+    return bundle.filter_index.facet_values()
 
 # ============================================================================
 # GRADIO INTERFACE
 # ============================================================================
 
+def source_choices():
+    """Source filter choices from the loaded index (unchanged while starting)."""
+    if not startup.ready:
+        return gr.update()
+    return gr.update(choices=search_bundle.filter_index.facet_values()['source'])
+
 with gr.Blocks(title="Superconductor Semantic Search V7", theme=gr.themes.Soft()) as demo:
     gr.HTML("""
     <style>
@@ -268,22 +342,47 @@ with gr.Blocks(title="Superconductor Semantic Search V7", theme=gr.themes.Soft()
         info="When checked, results are reordered from easiest to most complex, providing an intro/recap at the top"
     )
 
+    with gr.Row():
+        difficulty_filter = gr.Dropdown(
+            choices=DIFFICULTY_LABELS,
+            multiselect=True,
+            label="🎚️ Only these difficulty levels",
+            info="Leave empty for all levels"
+        )
+        source_filter = gr.Dropdown(
+            # Known sources until the index is loaded (refreshed on page load)
+            choices=sorted(SOURCE_EMOJIS),
+            multiselect=True,
+            label="📂 Only these sources",
+            info="Leave empty for all sources"
+        )
+
     search_button = gr.Button("🔍 Search", variant="primary", size="lg")
 
     results_output = gr.HTML(label="Results")
 
     query_input.submit(
-        fn=lambda q, sort_diff: perform_search(q, sort_diff, 10),
-        inputs=[query_input, difficulty_sort_checkbox],
+        fn=lambda q, sort_diff, levels, sources: perform_search(q, sort_diff, 10, levels, sources),
+        inputs=[query_input, difficulty_sort_checkbox, difficulty_filter, source_filter],
         outputs=results_output
     )
 
     search_button.click(
-        fn=lambda q, sort_diff: perform_search(q, sort_diff, 10),
-        inputs=[query_input, difficulty_sort_checkbox],
+        fn=lambda q, sort_diff, levels, sources: perform_search(q, sort_diff, 10, levels, sources),
+        inputs=[query_input, difficulty_sort_checkbox, difficulty_filter, source_filter],
         outputs=results_output
     )
 
+    demo.load(fn=source_choices, outputs=source_filter)
+
+# Let concurrent events reach the batcher instead of being serialized by Gradio
+demo.queue(default_concurrency_limit=int(os.environ.get('GRADIO_CONCURRENCY', BATCH_MAX_SIZE)))
+
+# Serve the JSON API and the Gradio UI from one process (same model and index)
+app = gr.mount_gradio_app(api, demo, path="/")
+
 # Launch
 if __name__ == "__main__":
-    demo.launch()
+    uvicorn.run(app,
+                host=os.environ.get('GRADIO_SERVER_NAME', '127.0.0.1'),
+                port=int(os.environ.get('GRADIO_SERVER_PORT', 7860)))
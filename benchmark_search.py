@@ -0,0 +1,389 @@
+"""
+Benchmark Search - Superconductor Search
+=========================================
+
+Latency / throughput regression benchmark for the search stack, run
+against a model and its built index artifact.
+
+Measures:
+- Load time of every engine stage (model, index, passages, bm25, ann, ...)
+- Corpus encode throughput (documents/s and passages/s, token-bucketed as
+  build_search_index.py encodes, embedding cache bypassed)
+- Single-query latency distribution through engine.search (cold caches,
+  then cached)
+- QPS at several concurrency levels (threads calling engine.search, so
+  concurrent requests are coalesced by the request batcher as in app.py)
+- Peak RSS after each phase
+
+Results are written as JSON with the git commit, so runs can be compared
+across commits; --compare checks a run against a baseline file and exits
+with code 1 if latency or throughput regressed by more than --tolerance.
+
+Usage:
+    python benchmark_search.py                                     # Full suite
+    python benchmark_search.py --output bench/$(git rev-parse --short HEAD).json
+    python benchmark_search.py --compare bench/baseline.json --tolerance 0.15
+    python benchmark_search.py --backend onnx-int8 --mode dense --concurrency 1 8 32
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import faiss
+
+from build_search_index import load_benchmark_queries
+from length_batching import TOKEN_BUDGET, encode_length_bucketed
+from search_engine import DOCUMENTS_FILE, INDEX_DIR, MODEL_PATH, SearchBundle, search_modes
+
+try:
+    import resource
+except ImportError:  # Windows: no peak RSS
+    resource = None
+
+# Configuration
+BENCHMARK_OUTPUT = 'search_benchmark.json'
+BENCHMARK_K = 10
+ENCODE_DOCUMENTS = 256           # Documents encoded for the throughput measurement
+LATENCY_QUERIES = 200            # Queries timed one at a time
+WARMUP_QUERIES = 10              # Untimed searches before each measurement
+CONCURRENCY_LEVELS = [1, 4, 16, 64]
+REGRESSION_TOLERANCE = 0.2       # Allowed relative slowdown in --compare
+PERCENTILES = [50, 90, 95, 99]
+
+# ============================================================================
+# MEASUREMENT HELPERS
+# ============================================================================
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process so far (None where unsupported)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def latency_summary(latencies_ms: np.ndarray) -> Dict:
+    """Percentiles, mean and max of a latency sample, in milliseconds."""
+    if not len(latencies_ms):
+        return {}
+    summary = {f'p{p}': round(float(value), 3)
+               for p, value in zip(PERCENTILES, np.percentile(latencies_ms, PERCENTILES))}
+    summary['mean'] = round(float(latencies_ms.mean()), 3)
+    summary['max'] = round(float(latencies_ms.max()), 3)
+    return summary
+
+def clear_caches(engine: SearchBundle):
+    """Empty the query caches, so every search pays for encoding and scanning."""
+    engine.query_embedding_cache.clear()
+    engine.result_cache.clear()
+
+def git_commit() -> Optional[str]:
+    """Commit of the code being benchmarked (None outside a git checkout)."""
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def environment() -> Dict:
+    """Machine and library versions the numbers were measured with."""
+    return {
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'faiss': getattr(faiss, '__version__', None),
+    }
+
+# ============================================================================
+# BENCHMARKS
+# ============================================================================
+
+def benchmark_load(engine: SearchBundle) -> Dict:
+    """Run the engine's loading stages, timing each one."""
+    print("\n📥 Loading search engine (timed per stage)...")
+    seconds = {}
+    for name, stage in engine.stages():
+        start = time.perf_counter()
+        stage()
+        seconds[name] = round(time.perf_counter() - start, 3)
+    return {
+        'stage_seconds': seconds,
+        'model_load_seconds': seconds['model'],
+        'total_seconds': round(sum(seconds.values()), 3),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+def benchmark_encode(engine: SearchBundle, num_documents: int = ENCODE_DOCUMENTS,
+                     token_budget: int = TOKEN_BUDGET) -> Dict:
+    """Encode the passages of the first num_documents documents, as the index build does."""
+    num_documents = min(num_documents, len(engine.doc_store))
+    num_passages = int(engine.doc_offsets[num_documents])
+    texts = [engine.passage_store.text(i) for i in range(num_passages)]
+    print(f"\n⚙️  Encoding {num_documents:,} documents ({num_passages:,} passages)...")
+
+    encode_length_bucketed(engine.model, texts[:WARMUP_QUERIES], token_budget, report=False)
+    start = time.perf_counter()
+    encode_length_bucketed(engine.model, texts, token_budget, report=False)
+    seconds = time.perf_counter() - start
+    return {
+        'documents': num_documents,
+        'passages': num_passages,
+        'token_budget': token_budget,
+        'seconds': round(seconds, 3),
+        'docs_per_second': round(num_documents / seconds, 1) if seconds else None,
+        'passages_per_second': round(num_passages / seconds, 1) if seconds else None,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+def benchmark_latency(engine: SearchBundle, queries: List[str], k: int, mode: str) -> Dict:
+    """Serial searches: each query once with cold caches, then again from the result cache."""
+    print(f"\n⏱️  Single-query latency ({len(queries):,} queries, mode: {mode})...")
+    for query in queries[:WARMUP_QUERIES]:
+        engine.search(query, k, mode=mode)
+    clear_caches(engine)
+
+    latencies = {'cold': np.empty(len(queries)), 'cached': np.empty(len(queries))}
+    for phase, sample in latencies.items():
+        for i, query in enumerate(queries):
+            start = time.perf_counter()
+            engine.search(query, k, mode=mode)
+            sample[i] = (time.perf_counter() - start) * 1000
+    return {
+        'queries': len(queries),
+        'cold_ms': latency_summary(latencies['cold']),
+        'cached_ms': latency_summary(latencies['cached']),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+def benchmark_concurrency(engine: SearchBundle, queries: List[str], k: int, mode: str,
+                          levels: List[int] = CONCURRENCY_LEVELS) -> List[Dict]:
+    """
+    QPS with `level` threads searching at once (cold caches, each query once per level).
+
+    Returns:
+        One result per level: QPS, request latency and the mean batch the
+        request batcher formed
+    """
+    print(f"\n🚀 Throughput at concurrency {levels}...")
+    results = []
+    for level in levels:
+        clear_caches(engine)
+        latencies = np.empty(len(queries))
+        batches_before = engine.search_batcher.batches
+        requests_before = engine.search_batcher.requests
+        next_query = iter(range(len(queries)))
+        lock = threading.Lock()
+
+        def worker():
+            while True:
+                with lock:
+                    i = next(next_query, None)
+                if i is None:
+                    return
+                start = time.perf_counter()
+                engine.search(queries[i], k, mode=mode)
+                latencies[i] = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=level) as pool:
+            for future in [pool.submit(worker) for _ in range(level)]:
+                future.result()
+        seconds = time.perf_counter() - start
+
+        batches = engine.search_batcher.batches - batches_before
+        requests = engine.search_batcher.requests - requests_before
+        results.append({
+            'concurrency': level,
+            'queries': len(queries),
+            'seconds': round(seconds, 3),
+            'qps': round(len(queries) / seconds, 1) if seconds else None,
+            'latency_ms': latency_summary(latencies),
+            'mean_batch_size': round(requests / batches, 2) if batches else None,
+        })
+        print(f"   {level:>4} threads: {results[-1]['qps']:>9,.1f} QPS, "
+              f"p95 {results[-1]['latency_ms']['p95']:.2f} ms, "
+              f"mean batch {results[-1]['mean_batch_size']}")
+    return results
+
+def run_benchmarks(model_path: str = MODEL_PATH, index_dir: str = INDEX_DIR,
+                   docs_path: str = DOCUMENTS_FILE, backend: Optional[str] = None,
+                   mode: Optional[str] = None, k: int = BENCHMARK_K,
+                   num_queries: int = LATENCY_QUERIES, encode_documents: int = ENCODE_DOCUMENTS,
+                   levels: List[int] = CONCURRENCY_LEVELS) -> Dict:
+    """
+    Run the full suite against a built index (never rebuilds it).
+
+    Returns:
+        JSON-ready report
+    """
+    engine = SearchBundle(model_path, docs_path, index_dir, backend, allow_rebuild=False)
+    load = benchmark_load(engine)
+    mode = engine.resolve_mode(mode)
+
+    queries = load_benchmark_queries()[:num_queries]
+    if not queries:
+        raise ValueError("No benchmark queries found")
+
+    try:
+        encode = benchmark_encode(engine, encode_documents)
+        latency = benchmark_latency(engine, queries, k, mode)
+        concurrency = benchmark_concurrency(engine, queries, k, mode, levels)
+    finally:
+        engine.close()
+
+    return {
+        'created_at': datetime.now().isoformat(),
+        'environment': environment(),
+        'config': {
+            'model_path': model_path,
+            'index_dir': index_dir,
+            'encoder_backend': engine.encoder_backend,
+            'index_type': engine.index_info['index_type'],
+            'model_fingerprint': engine.index_info['model_fingerprint'],
+            'num_documents': len(engine.doc_store),
+            'num_passages': len(engine.passage_store),
+            'mode': mode,
+            'k': k,
+        },
+        'load': load,
+        'encode': encode,
+        'latency': latency,
+        'concurrency': concurrency,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+# ============================================================================
+# REPORTING
+# ============================================================================
+
+def key_metrics(report: Dict) -> Dict[str, float]:
+    """
+    Headline numbers compared across runs (tail percentiles and cached
+    latencies stay in the report only: too noisy to gate on).
+
+    Names ending in '_per_second' / 'qps' are better when higher, the rest
+    (seconds, milliseconds, megabytes) when lower.
+    """
+    metrics = {
+        'model_load_seconds': report['load']['model_load_seconds'],
+        'load_total_seconds': report['load']['total_seconds'],
+        'encode_docs_per_second': report['encode']['docs_per_second'],
+        'latency_cold_p50_ms': report['latency']['cold_ms']['p50'],
+        'latency_cold_p95_ms': report['latency']['cold_ms']['p95'],
+        'peak_rss_mb': report['peak_rss_mb'],
+    }
+    for level in report['concurrency']:
+        metrics[f"concurrency_{level['concurrency']}_qps"] = level['qps']
+    return {name: value for name, value in metrics.items() if value is not None}
+
+def higher_is_better(name: str) -> bool:
+    return name.endswith(('_per_second', '_qps'))
+
+def compare_reports(baseline: Dict, current: Dict, tolerance: float = REGRESSION_TOLERANCE) -> List[Dict]:
+    """
+    Relative change of every headline metric present in both reports.
+
+    Returns:
+        One row per metric; 'regressed' if it got worse by more than tolerance
+    """
+    old, new = key_metrics(baseline), key_metrics(current)
+    rows = []
+    for name in old:
+        if name not in new or not old[name]:
+            continue
+        change = (new[name] - old[name]) / old[name]
+        worse = -change if higher_is_better(name) else change
+        rows.append({'metric': name, 'baseline': old[name], 'current': new[name],
+                     'change': round(change, 4), 'regressed': worse > tolerance})
+    return rows
+
+def print_report(report: Dict):
+    print(f"\n{'=' * 70}")
+    print(f"📊 SEARCH BENCHMARK ({report['config']['encoder_backend']}, "
+          f"{report['config']['index_type']} index, mode: {report['config']['mode']})")
+    print('=' * 70)
+    stages = ', '.join(f"{name} {seconds:.2f}s" for name, seconds in report['load']['stage_seconds'].items())
+    print(f"Load:    {report['load']['total_seconds']:.2f}s ({stages})")
+    print(f"Encode:  {report['encode']['docs_per_second']:,.1f} docs/s, "
+          f"{report['encode']['passages_per_second']:,.1f} passages/s")
+    for phase in ('cold', 'cached'):
+        latency = report['latency'][f'{phase}_ms']
+        print(f"Latency ({phase}): p50 {latency['p50']:.2f} ms, p95 {latency['p95']:.2f} ms, "
+              f"p99 {latency['p99']:.2f} ms, max {latency['max']:.2f} ms")
+    for level in report['concurrency']:
+        print(f"QPS @ {level['concurrency']:>3} threads: {level['qps']:,.1f}")
+    if report['peak_rss_mb'] is not None:
+        print(f"Peak RSS: {report['peak_rss_mb']:,.1f} MB")
+
+def print_comparison(rows: List[Dict], tolerance: float):
+    print(f"\n{'Metric':<28} {'Baseline':>12} {'Current':>12} {'Change':>9}")
+    print("─" * 64)
+    for row in rows:
+        flag = '❌' if row['regressed'] else '  '
+        print(f"{row['metric']:<28} {row['baseline']:>12,.3f} {row['current']:>12,.3f} "
+              f"{row['change']:>+8.1%} {flag}")
+    regressions = sum(row['regressed'] for row in rows)
+    if regressions:
+        print(f"\n❌ {regressions} metric(s) regressed by more than {tolerance:.0%}")
+    else:
+        print(f"\n✅ No regression beyond {tolerance:.0%}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Latency / throughput benchmark of the search stack')
+    parser.add_argument('--model', default=MODEL_PATH, help=f'Model directory (default: {MODEL_PATH})')
+    parser.add_argument('--index', default=INDEX_DIR, help=f'Index artifact directory (default: {INDEX_DIR})')
+    parser.add_argument('--documents', default=DOCUMENTS_FILE,
+                        help=f'Corpus the index is built from (default: {DOCUMENTS_FILE})')
+    parser.add_argument('--backend', help='Encoder backend (default: ENCODER_BACKEND env)')
+    parser.add_argument('--mode', help=f'Search mode, one of {search_modes()} (default: the index default)')
+    parser.add_argument('--k', type=int, default=BENCHMARK_K, help=f'Results per query (default: {BENCHMARK_K})')
+    parser.add_argument('--queries', type=int, default=LATENCY_QUERIES,
+                        help=f'Benchmark queries used (default: {LATENCY_QUERIES})')
+    parser.add_argument('--encode-documents', type=int, default=ENCODE_DOCUMENTS,
+                        help=f'Documents encoded for throughput (default: {ENCODE_DOCUMENTS})')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=CONCURRENCY_LEVELS,
+                        help=f'Thread counts for the QPS runs (default: {CONCURRENCY_LEVELS})')
+    parser.add_argument('--output', default=BENCHMARK_OUTPUT, help=f'JSON results (default: {BENCHMARK_OUTPUT})')
+    parser.add_argument('--compare', help='Baseline results JSON to compare against')
+    parser.add_argument('--tolerance', type=float, default=REGRESSION_TOLERANCE,
+                        help=f'Allowed relative regression for --compare (default: {REGRESSION_TOLERANCE})')
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("⏱️  SEARCH BENCHMARK - LATENCY, THROUGHPUT, MEMORY")
+    print("=" * 70)
+
+    report = run_benchmarks(args.model, args.index, args.documents, args.backend, args.mode, args.k,
+                            args.queries, args.encode_documents, args.concurrency)
+    print_report(report)
+
+    directory = os.path.dirname(args.output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Benchmark results saved: {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f"\n📈 Compared with {args.compare} (commit {baseline['environment'].get('git_commit')})")
+        rows = compare_reports(baseline, report, args.tolerance)
+        print_comparison(rows, args.tolerance)
+        if any(row['regressed'] for row in rows):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+BM25 Index - Superconductor Search
+===================================
+
+Lexical (BM25) inverted index over the same passages as the FAISS index,
+plus reciprocal rank fusion of lexical and dense rankings.
+
+Exact-term queries ("MgB2", "YBCO", "Brian Josephson") are where the
+MiniLM embedding is weakest and where term matching is strongest.
+
+Features:
+- Compressed sparse row postings: per-term offsets into flat row / weight
+  arrays, with the BM25 weight of each posting precomputed at build time
+- A query only touches the postings of its own terms (no corpus scan);
+  the arrays are memory-mapped from the index directory
+- reciprocal_rank_fusion: merges ranked id lists (e.g. dense + BM25)
+"""
+
+import json
+import os
+import re
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Defaults
+BM25_K1 = 1.2             # Term frequency saturation
+BM25_B = 0.75             # Length normalization
+RRF_K = 60                # Reciprocal rank fusion damping (score = sum 1 / (RRF_K + rank))
+HYBRID_DEPTH = 50         # Documents taken from each ranking before fusion
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have how in is it its of on or that the
+their this to was were what when which who why will with
+""".split())
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase alphanumeric tokens without stopwords ("MgB2" -> "mgb2")."""
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+class BM25Index:
+    """
+    BM25 postings in CSR layout.
+
+    Files:
+        bm25_vocab.json    term list (position = term id)
+        bm25_offsets.npy   int64 (n_terms + 1) start of each term's postings
+        bm25_rows.npy      int32 passage row of each posting (ascending per term)
+        bm25_weights.npy   float32 BM25 weight of each posting
+    """
+
+    FILES = ['bm25_vocab.json', 'bm25_offsets.npy', 'bm25_rows.npy', 'bm25_weights.npy']
+
+    def __init__(self, vocab: List[str], offsets: np.ndarray, rows: np.ndarray,
+                 weights: np.ndarray, num_rows: int, params: Dict):
+        self.vocab = vocab
+        self.term_ids = {term: i for i, term in enumerate(vocab)}
+        self.offsets = offsets
+        self.rows = rows
+        self.weights = weights
+        self.num_rows = num_rows
+        self.params = params
+
+    @classmethod
+    def build(cls, texts: List[str], k1: float = BM25_K1, b: float = BM25_B) -> 'BM25Index':
+        """Tokenize texts (one per index row) and compute BM25 postings."""
+        term_ids = {}
+        token_ids = []
+        lengths = np.zeros(len(texts), dtype=np.int64)
+        for row, text in enumerate(texts):
+            ids = [term_ids.setdefault(token, len(term_ids)) for token in tokenize(text)]
+            token_ids.append(np.asarray(ids, dtype=np.int64))
+            lengths[row] = len(ids)
+
+        num_rows = len(texts)
+        terms = np.concatenate(token_ids) if token_ids else np.zeros(0, dtype=np.int64)
+        rows = np.repeat(np.arange(num_rows, dtype=np.int64), lengths)
+
+        # (term, row) pairs sorted by term then row = CSR postings with term frequencies
+        pairs, tf = np.unique(terms * max(num_rows, 1) + rows, return_counts=True)
+        posting_terms = pairs // max(num_rows, 1)
+        posting_rows = pairs % max(num_rows, 1)
+
+        df = np.bincount(posting_terms, minlength=len(term_ids))
+        offsets = np.concatenate([[0], np.cumsum(df)]).astype(np.int64)
+        idf = np.log1p((num_rows - df + 0.5) / (df + 0.5))
+        avgdl = float(lengths.mean()) if num_rows and lengths.mean() > 0 else 1.0
+        norm = k1 * (1 - b + b * lengths / avgdl)
+        weights = idf[posting_terms] * tf * (k1 + 1) / (tf + norm[posting_rows])
+
+        params = {'k1': k1, 'b': b, 'avgdl': avgdl, 'num_terms': len(term_ids),
+                  'num_postings': int(len(pairs))}
+        return cls(list(term_ids), offsets, posting_rows.astype(np.int32),
+                   weights.astype(np.float32), num_rows, params)
+
+    def save(self, index_dir: str):
+        """Write the postings files into index_dir."""
+        with open(os.path.join(index_dir, 'bm25_vocab.json'), 'w', encoding='utf-8') as f:
+            json.dump(self.vocab, f, ensure_ascii=False)
+        np.save(os.path.join(index_dir, 'bm25_offsets.npy'), self.offsets)
+        np.save(os.path.join(index_dir, 'bm25_rows.npy'), self.rows)
+        np.save(os.path.join(index_dir, 'bm25_weights.npy'), self.weights)
+
+    @classmethod
+    def load(cls, index_dir: str, num_rows: int, params: Dict) -> 'BM25Index':
+        """Open saved postings (memory-mapped)."""
+        with open(os.path.join(index_dir, 'bm25_vocab.json'), 'r', encoding='utf-8') as f:
+            vocab = json.load(f)
+        offsets = np.load(os.path.join(index_dir, 'bm25_offsets.npy'))
+        rows = np.load(os.path.join(index_dir, 'bm25_rows.npy'), mmap_mode='r')
+        weights = np.load(os.path.join(index_dir, 'bm25_weights.npy'), mmap_mode='r')
+        return cls(vocab, offsets, rows, weights, num_rows, params)
+
+    def search(self, query: str, k: int, row_mask: Optional[np.ndarray] = None) -> tuple:
+        """
+        Top-k rows for one query.
+
+        Args:
+            row_mask: Boolean mask of rows allowed in the result (filtered search)
+
+        Returns:
+            (rows, scores), best first; fewer than k if fewer rows match
+        """
+        term_ids = {self.term_ids[t] for t in tokenize(query) if t in self.term_ids}
+        if not term_ids or k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        # Gather only this query's postings and sum weights per row
+        spans = [(self.offsets[t], self.offsets[t + 1]) for t in term_ids]
+        rows = np.concatenate([self.rows[start:end] for start, end in spans])
+        weights = np.concatenate([self.weights[start:end] for start, end in spans])
+        candidates, inverse = np.unique(rows, return_inverse=True)
+        scores = np.bincount(inverse, weights=weights).astype(np.float32)
+        if row_mask is not None:
+            allowed = row_mask[candidates]
+            candidates, scores = candidates[allowed], scores[allowed]
+
+        k = min(k, len(candidates))
+        if k == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return candidates[top].astype(np.int64), scores[top]
+
+    def search_many(self, queries: List[str], k: int, row_mask: Optional[np.ndarray] = None) -> tuple:
+        """
+        search() for several queries, padded to a (b, k) batch.
+
+        Returns:
+            (rows, scores), each (b, k); empty slots have row -1 and score -inf
+        """
+        all_rows = np.full((len(queries), k), -1, dtype=np.int64)
+        all_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        for i, query in enumerate(queries):
+            rows, scores = self.search(query, k, row_mask)
+            all_rows[i, :len(rows)] = rows
+            all_scores[i, :len(rows)] = scores
+        return all_rows, all_scores
+
+def reciprocal_rank_fusion(rankings: List[np.ndarray], k: int, rrf_k: int = RRF_K) -> tuple:
+    """
+    Fuse ranked id lists with reciprocal rank fusion.
+
+    Each id scores sum(1 / (rrf_k + rank)) over the rankings it appears in
+    (rank starts at 1), so no score calibration between rankers is needed.
+
+    Args:
+        rankings: 1-D id arrays, best first (-1 = empty slot, skipped)
+
+    Returns:
+        (ids, scores) of the top-k fused ids, best first
+    """
+    ids = np.concatenate([ranking for ranking in rankings])
+    ranks = np.concatenate([np.arange(1, len(ranking) + 1) for ranking in rankings])
+    valid = ids >= 0
+    ids, ranks = ids[valid], ranks[valid]
+    if ids.size == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+    fused_ids, inverse = np.unique(ids, return_inverse=True)
+    scores = np.bincount(inverse, weights=1.0 / (rrf_k + ranks)).astype(np.float32)
+    order = np.argsort(-scores, kind='stable')[:k]
+    return fused_ids[order].astype(np.int64), scores[order]
@@ -5,34 +5,183 @@ Build Search Index - Superconductor Search v2
 Builds FAISS vector index for semantic search using the trained model.
 
 Features:
-- Loads trained model from models/superconductor-search-v2
-- Generates embeddings for all 1,762 documents
+- Loads trained model from models/superconductor-search-v7
+- Splits documents into overlapping passages (whole text, not just the
+  first 2,000 characters) and generates an embedding per passage
 - Creates FAISS index for efficient similarity search
-- Saves index and document mapping for search engine
+  (exact flat scan, or approximate HNSW / IVF-Flat / IVF-PQ)
+- Optionally stores vectors as float16, int8 (scalar quantized) or binary
+  codes, with exact float32 rescoring of a small candidate set at query time
+- Saves index, embeddings and document mapping for search engine
+- Tags the saved artifact with model and corpus fingerprints so the
+  app can reuse it at startup instead of re-encoding the corpus
+- Lays the artifact out for memory-mapping (embeddings.npy, FAISS mmap IO,
+  JSON Lines document store + offsets) so worker processes share one copy
+  through the page cache
+- Saves the passage -> document mapping and passage texts, used to
+  aggregate passage hits into documents and show the matching passage
+- Builds a BM25 inverted index over the same passages (CSR postings) for
+  lexical / hybrid retrieval
+- Optional multi-process encoding: the corpus is split into shards encoded
+  by a pool of CPU workers and merged in order (parallel_encode.py)
+- Texts are encoded in length-sorted, token-budgeted batches instead of
+  fixed-size ones, with a padding waste report (length_batching.py)
+- Texts already encoded by this model (by any script) come from the
+  shared on-disk embedding cache (embedding_cache.py)
+- Incremental: an embedding manifest keyed by document content hash (see
+  incremental_index.py) means only new or changed documents are encoded;
+  deleted ones are tombstoned and compacted away periodically
+
+Usage:
+    python build_search_index.py                          # Exact IndexFlatIP
+    python build_search_index.py --index-type hnsw        # HNSW graph
+    python build_search_index.py --index-type ivf_pq --nlist 64 --pq-m 32
+    python build_search_index.py --quantization int8      # 4x smaller vectors + rescoring
+    python build_search_index.py --chunk-words 0          # One vector per document
+    python build_search_index.py --full-rebuild           # Ignore stored vectors, re-encode everything
+    python build_search_index.py --compact                # Drop tombstoned vectors now
+    python build_search_index.py --encode-workers 8       # Sharded encoding on 8 processes
+    python build_search_index.py --token-budget 0         # Fixed batches of BATCH_SIZE texts
+    python build_search_index.py --benchmark              # Recall/latency of index variants
+    python build_search_index.py --model models/v8 --output bundles/v8/search_index
+                                                          # Versioned bundle (bundle_watcher.py)
 """
 
 import json
+import argparse
+import hashlib
+import importlib.util
+import mmap
+import tempfile
+import time
 import numpy as np
 import faiss
 from sentence_transformers import SentenceTransformer
-from typing import List, Dict
+from typing import List, Dict, Optional
 import os
 from datetime import datetime
 
+from bm25_index import BM25Index
+from embedding_cache import cached_encode
+from encoder import ONNX_SUBDIR
+from incremental_index import COMPACT_TOMBSTONE_RATIO, document_keys, open_manifest
+from json_stream import iter_records, load_records, resolve_records_path
+from length_batching import BATCH_SIZE, TOKEN_BUDGET, encode_length_bucketed
+from parallel_encode import ENCODE_WORKERS, default_threads_per_worker, encode_sharded
+from passages import CHUNK_OVERLAP, CHUNK_WORDS, check_chunking, chunking_info, passage_offsets, split_passages
+from search_filters import write_document_facets
+
 # Configuration
-MODEL_PATH = 'models/superconductor-search-v2'
+MODEL_PATH = 'models/superconductor-search-v7'
 DOCUMENTS_FILE = 'training/documents.json'
 INDEX_OUTPUT = 'search_index'
-BATCH_SIZE = 32
+TEXT_MAX_CHARS = 2000  # Characters of document text embedded after the title (--chunk-words 0 only)
+INCREMENTAL = True     # Reuse stored vectors of unchanged documents (--full-rebuild to disable)
+
+# Index types (all use inner product on L2-normalized vectors = cosine)
+INDEX_TYPES = ['flat', 'hnsw', 'ivf_flat', 'ivf_pq']
+INDEX_TYPE = 'flat'
+HNSW_M = 32               # Graph neighbours per node
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 64       # Candidate list size at query time
+IVF_NPROBE = 8            # Inverted lists visited at query time
+PQ_M = 16                 # Sub-quantizers (must divide the embedding dimension)
+PQ_NBITS = 8              # Bits per sub-quantizer code
+
+# Vector storage inside the index (ivf_pq is already compressed and ignores this)
+QUANTIZATIONS = ['none', 'float16', 'int8', 'binary']
+QUANTIZATION = 'none'
+RESCORE_FACTOR = 4        # Candidates fetched per result for exact float32 rescoring
+SCALAR_QUANTIZER_TYPES = {
+    'float16': faiss.ScalarQuantizer.QT_fp16,
+    'int8': faiss.ScalarQuantizer.QT_8bit,
+}
+
+# Display difficulty tiers (codes stored in document_difficulty.npy)
+DIFFICULTY_LABELS = ['Beginner', 'Intermediate', 'Advanced']
+
+# Benchmark (--benchmark): index variants compared against the exact flat baseline
+BENCHMARK_K = 10
+BENCHMARK_OUTPUT = 'index_benchmark.json'
+BENCHMARK_QUERY_FILES = [
+    'training/targeted_wiki_pairs_v7.json',
+    'training/training_dataset_v7.json',
+]
+BENCHMARK_VARIANTS = [
+    # (index_type, build_params, [search_params, ...])
+    ('flat', {}, [{}]),
+    ('hnsw', {'M': 16}, [{'efSearch': 16}, {'efSearch': 64}]),
+    ('hnsw', {'M': 32}, [{'efSearch': 16}, {'efSearch': 64}, {'efSearch': 128}]),
+    ('ivf_flat', {}, [{'nprobe': 1}, {'nprobe': 4}, {'nprobe': 16}]),
+    ('ivf_pq', {}, [{'nprobe': 4}, {'nprobe': 16}]),
+    ('flat', {'quantization': 'float16'}, [{}]),
+    ('flat', {'quantization': 'int8'}, [{}]),
+    ('flat', {'quantization': 'binary'}, [{}]),
+    ('hnsw', {'quantization': 'int8'}, [{'efSearch': 64}]),
+]
+
+def compute_model_fingerprint(model_path: str = MODEL_PATH) -> str:
+    """
+    Hash every file in the model directory (config, tokenizer, weights).
+
+    Content-based rather than mtime-based, so copies of the same model on
+    different replicas produce the same fingerprint. Exported query-encoder
+    graphs (onnx/) are skipped: they do not change the document embeddings.
+    """
+    sha = hashlib.sha256()
+    for root, dirs, files in os.walk(model_path):
+        dirs[:] = sorted(d for d in dirs if not (root == model_path and d == ONNX_SUBDIR))
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            sha.update(os.path.relpath(path, model_path).encode('utf-8') + b'\0')
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    sha.update(chunk)
+    return sha.hexdigest()
 
-def load_documents() -> List[Dict]:
-    """Load all documents."""
+def compute_corpus_hash(documents_file: str = DOCUMENTS_FILE) -> str:
+    """Hash the raw bytes of the documents file (or its .jsonl / .json sibling)."""
+    sha = hashlib.sha256()
+    with open(resolve_records_path(documents_file), 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+def get_document_difficulty_label(doc: dict) -> str:
+    """
+    Get difficulty label for a document based on its source and difficulty_level field.
+
+    Returns:
+        'Beginner', 'Intermediate', or 'Advanced'
+    """
+    # First check if document has explicit difficulty level
+    doc_difficulty = doc.get('difficulty_level', None)
+    if doc_difficulty:
+        if doc_difficulty <= 2:
+            return 'Beginner'
+        elif doc_difficulty <= 3:
+            return 'Intermediate'
+        else:
+            return 'Advanced'
+
+    # Fallback: infer from source
+    source = doc.get('source', 'unknown')
+    if source == 'simple_wikipedia':
+        return 'Beginner'
+    elif source in ['wikipedia', 'youtube', 'hyperphysics']:
+        return 'Intermediate'
+    elif source in ['arxiv', 'mit_ocw']:
+        return 'Advanced'
+    else:
+        return 'Intermediate'
+
+def load_documents(documents_file: str = DOCUMENTS_FILE) -> List[Dict]:
+    """Load all documents (JSON array or JSON Lines, parsed incrementally)."""
     print("=" * 70)
     print("📂 Loading Documents")
     print("=" * 70)
 
-    with open(DOCUMENTS_FILE, 'r', encoding='utf-8') as f:
-        documents = json.load(f)
+    documents = load_records(documents_file, key='documents')
 
     print(f"\n✅ Loaded {len(documents):,} documents")
 
@@ -48,11 +197,25 @@ def load_documents() -> List[Dict]:
 
     return documents
 
-def prepare_texts(documents: List[Dict]) -> tuple:
-    """Prepare document texts for embedding."""
+def prepare_texts(documents: List[Dict], chunk_words: int = CHUNK_WORDS,
+                  chunk_overlap: int = CHUNK_OVERLAP) -> tuple:
+    """
+    Prepare passage texts for embedding.
+
+    With chunk_words > 0 the full document text is split into overlapping
+    passages, each embedded as title + passage. With chunk_words = 0 each
+    document is a single title + first TEXT_MAX_CHARS characters passage.
+
+    Returns:
+        (passage_texts, doc_metadata, passages, passage_doc): texts to embed,
+        per-document metadata, raw passage texts (for snippets) and the
+        document index of each passage
+    """
     print("\n📝 Preparing Document Texts...")
 
-    doc_texts = []
+    passage_texts = []
+    passages = []
+    passage_counts = []
     doc_metadata = []
 
     for doc in documents:
@@ -66,13 +229,13 @@ def prepare_texts(documents: List[Dict]) -> tuple:
         if not title or isinstance(title, dict):
             title = ''
 
-        # Combine title and text for better embeddings
-        if title:
-            full_text = f"{title}\n\n{text[:2000]}"  # Use title + first 2000 chars
-        else:
-            full_text = text[:2000]
-
-        doc_texts.append(full_text)
+        # Combine title and each passage for better embeddings
+        body = text if chunk_words > 0 else text[:TEXT_MAX_CHARS]
+        doc_passages = split_passages(body, chunk_words, chunk_overlap)
+        for passage in doc_passages:
+            passage_texts.append(f"{title}\n\n{passage}" if title else passage)
+        passages.extend(doc_passages)
+        passage_counts.append(len(doc_passages))
 
         # Store metadata for retrieval
         metadata = {
@@ -81,27 +244,68 @@ def prepare_texts(documents: List[Dict]) -> tuple:
             'source': doc.get('source', ''),
             'difficulty': doc.get('difficulty', 0),
             'url': doc.get('url', doc.get('video_id', '')),
-            'text_preview': text[:200]  # First 200 chars for preview
+            'text_preview': text[:200],  # First 200 chars for preview
+            'difficulty_level': doc.get('difficulty_level'),
+            'difficulty_label': get_document_difficulty_label(doc),
+            'type': doc.get('type', ''),
+            'focus_area': doc.get('focus_area', '')
         }
         doc_metadata.append(metadata)
 
-    print(f"✅ Prepared {len(doc_texts):,} document texts")
+    passage_doc = np.repeat(np.arange(len(doc_metadata), dtype=np.int32), passage_counts)
+
+    print(f"✅ Prepared {len(passage_texts):,} passages from {len(doc_metadata):,} documents")
+    if chunk_words > 0:
+        print(f"   Chunking: {chunk_words} words, {chunk_overlap} overlap "
+              f"(max {max(passage_counts, default=0)} passages per document)")
 
-    return doc_texts, doc_metadata
+    return passage_texts, doc_metadata, passages, passage_doc
 
-def generate_embeddings(model: SentenceTransformer, texts: List[str]) -> np.ndarray:
-    """Generate embeddings for all documents."""
+def generate_embeddings(model: Optional[SentenceTransformer], texts: List[str],
+                        model_path: str = MODEL_PATH, workers: int = ENCODE_WORKERS,
+                        threads_per_worker: Optional[int] = None,
+                        shard_dir: Optional[str] = None,
+                        token_budget: int = TOKEN_BUDGET) -> np.ndarray:
+    """
+    Generate embeddings for all documents.
+
+    Args:
+        model: Loaded model (may be None with workers > 1: only the workers encode)
+        workers: Encoder processes (> 1: sharded encoding, see parallel_encode)
+        threads_per_worker: Intra-op threads per worker (default: cores / workers)
+        shard_dir: Scratch directory for shards (default: <INDEX_OUTPUT>/shards)
+        token_budget: Padded tokens per length-bucketed batch
+                      (0: fixed batches of BATCH_SIZE, see length_batching)
+    """
     print("\n🧠 Generating Embeddings...")
-    print(f"   Model: {MODEL_PATH}")
-    print(f"   Documents: {len(texts):,}")
-    print(f"   Batch size: {BATCH_SIZE}")
+    print(f"   Model: {model_path}")
+    print(f"   Passages: {len(texts):,}")
+    if token_budget:
+        print(f"   Token budget per batch: {token_budget:,}")
+    else:
+        print(f"   Batch size: {BATCH_SIZE}")
+
+    # Cache misses go to a pool of worker processes, or to model.encode
+    # (in length-sorted, token-budgeted batches)
+    encode_fn = None
+    if workers > 1:
+        print(f"   Workers: {workers} x {threads_per_worker or default_threads_per_worker(workers)} threads")
+        encode_fn = lambda missing: encode_sharded(
+            missing, model_path, workers, threads_per_worker,
+            shard_dir or os.path.join(INDEX_OUTPUT, 'shards'), batch_size=BATCH_SIZE,
+            token_budget=token_budget)
+    elif token_budget:
+        encode_fn = lambda missing: encode_length_bucketed(
+            model, missing, token_budget, batch_size=BATCH_SIZE)
 
-    # Generate embeddings in batches
-    embeddings = model.encode(
+    # Generate embeddings in batches (texts seen before come from the embedding cache)
+    embeddings = cached_encode(
+        model,
         texts,
+        model_path,
+        encode_fn,
         batch_size=BATCH_SIZE,
-        show_progress_bar=True,
-        convert_to_numpy=True
+        show_progress_bar=True
     )
 
     print(f"\n✅ Generated embeddings: {embeddings.shape}")
@@ -110,108 +314,843 @@ def generate_embeddings(model: SentenceTransformer, texts: List[str]) -> np.ndar
 
     return embeddings
 
-def build_faiss_index(embeddings: np.ndarray) -> faiss.Index:
-    """Build FAISS index for similarity search."""
+def default_ivf_nlist(num_vectors: int) -> int:
+    """Pick an IVF list count: ~4*sqrt(n), but keep >= 39 training points per list."""
+    return max(1, min(int(4 * np.sqrt(num_vectors)), num_vectors // 39))
+
+def resolve_index_params(index_type: str, num_vectors: int,
+                         build_params: Optional[Dict] = None,
+                         search_params: Optional[Dict] = None) -> tuple:
+    """
+    Fill in default build-time and search-time parameters for an index type.
+
+    Only the knobs that apply to index_type are kept; None overrides fall
+    back to the defaults.
+
+    Returns:
+        (build_params, search_params) dicts, as recorded in index_info.json
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{index_type}' (expected one of {INDEX_TYPES})")
+
+    if index_type == 'flat':
+        defaults_build, defaults_search = {'quantization': QUANTIZATION}, {}
+    elif index_type == 'hnsw':
+        defaults_build = {'M': HNSW_M, 'efConstruction': HNSW_EF_CONSTRUCTION,
+                          'quantization': QUANTIZATION}
+        defaults_search = {'efSearch': HNSW_EF_SEARCH}
+    elif index_type == 'ivf_flat':
+        defaults_build = {'nlist': default_ivf_nlist(num_vectors), 'quantization': QUANTIZATION}
+        defaults_search = {'nprobe': IVF_NPROBE}
+    else:  # ivf_pq
+        defaults_build = {'nlist': default_ivf_nlist(num_vectors), 'pq_m': PQ_M, 'pq_nbits': PQ_NBITS}
+        defaults_search = {'nprobe': IVF_NPROBE}
+
+    # Overrides that do not apply to this index type (e.g. nprobe for HNSW) are ignored
+    build = {k: (build_params or {}).get(k) or v for k, v in defaults_build.items()}
+    search = {k: (search_params or {}).get(k) or v for k, v in defaults_search.items()}
+
+    quantization = build.get('quantization', 'none')
+    if quantization not in QUANTIZATIONS:
+        raise ValueError(f"Unknown quantization '{quantization}' (expected one of {QUANTIZATIONS})")
+    if quantization == 'binary' and index_type != 'flat':
+        raise ValueError("Binary quantization is only supported with the flat index type")
+
+    return build, search
+
+def is_quantized(info: Dict) -> bool:
+    """True if the index stores compressed vectors (scores need float32 rescoring)."""
+    return (info.get('index_type') == 'ivf_pq'
+            or info.get('index_params', {}).get('quantization', 'none') != 'none')
+
+def apply_search_params(index: faiss.Index, search_params: Dict):
+    """Set query-time knobs (efSearch, nprobe) on a FAISS index."""
+    if not search_params or isinstance(index, faiss.IndexBinary):
+        return
+    parameter_space = faiss.ParameterSpace()
+    for name, value in search_params.items():
+        parameter_space.set_index_parameter(index, name, value)
+
+def build_faiss_index(embeddings: np.ndarray, index_type: str = INDEX_TYPE,
+                      build_params: Optional[Dict] = None,
+                      search_params: Optional[Dict] = None) -> tuple:
+    """
+    Build FAISS index for similarity search.
+
+    Returns:
+        (index, build_params, search_params) with defaults filled in
+    """
     print("\n🔍 Building FAISS Index...")
 
-    dimension = embeddings.shape[1]
+    num_vectors, dimension = embeddings.shape
+    build_params, search_params = resolve_index_params(
+        index_type, num_vectors, build_params, search_params)
 
-    # Use IndexFlatIP for inner product (cosine similarity with normalized vectors)
+    # Inner product on normalized vectors = cosine similarity
     # Normalize embeddings first
     faiss.normalize_L2(embeddings)
 
     # Create index
-    index = faiss.IndexFlatIP(dimension)
+    quantization = build_params.get('quantization', 'none')
+    if quantization == 'binary':
+        # 1 bit per dimension (sign), Hamming distance
+        index = faiss.IndexBinaryFlat(dimension)
+    elif index_type == 'flat':
+        if quantization == 'none':
+            index = faiss.IndexFlatIP(dimension)
+        else:
+            index = faiss.IndexScalarQuantizer(dimension, SCALAR_QUANTIZER_TYPES[quantization],
+                                               faiss.METRIC_INNER_PRODUCT)
+    elif index_type == 'hnsw':
+        if quantization == 'none':
+            index = faiss.IndexHNSWFlat(dimension, build_params['M'], faiss.METRIC_INNER_PRODUCT)
+        else:
+            index = faiss.IndexHNSWSQ(dimension, SCALAR_QUANTIZER_TYPES[quantization],
+                                      build_params['M'], faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = build_params['efConstruction']
+    elif index_type == 'ivf_flat':
+        encoding = {'none': 'Flat', 'float16': 'SQfp16', 'int8': 'SQ8'}[quantization]
+        index = faiss.index_factory(dimension, f"IVF{build_params['nlist']},{encoding}",
+                                    faiss.METRIC_INNER_PRODUCT)
+    else:  # ivf_pq
+        if dimension % build_params['pq_m'] != 0:
+            raise ValueError(f"pq_m={build_params['pq_m']} must divide dimension {dimension}")
+        index = faiss.index_factory(
+            dimension,
+            f"IVF{build_params['nlist']},PQ{build_params['pq_m']}x{build_params['pq_nbits']}",
+            faiss.METRIC_INNER_PRODUCT)
+
+    # Train (IVF centroids / PQ codebooks / int8 ranges)
+    if not index.is_trained:
+        print(f"   Training {index_type} on {num_vectors:,} vectors...")
+        index.train(embeddings)
 
     # Add vectors
-    index.add(embeddings)
+    index.add(binarize(embeddings) if quantization == 'binary' else embeddings)
+    apply_search_params(index, search_params)
 
     print(f"✅ FAISS Index Built")
-    print(f"   Index type: IndexFlatIP (cosine similarity)")
+    print(f"   Index type: {index_type} ({type(index).__name__}, cosine similarity)")
+    if build_params:
+        print(f"   Build params: {build_params}")
+    if search_params:
+        print(f"   Search params: {search_params}")
     print(f"   Dimensions: {dimension}")
     print(f"   Total vectors: {index.ntotal:,}")
 
+    return index, build_params, search_params
+
+def binarize(embeddings: np.ndarray) -> np.ndarray:
+    """Pack the sign bits of each vector into uint8 codes for IndexBinaryFlat."""
+    return np.packbits(embeddings > 0, axis=1)
+
+def search_faiss_index(index, query_embeddings: np.ndarray, k: int,
+                       embeddings: Optional[np.ndarray] = None,
+                       rescore_factor: int = RESCORE_FACTOR,
+                       params: Optional[faiss.SearchParameters] = None) -> tuple:
+    """
+    Search a (possibly quantized) FAISS index, optionally rescoring exactly.
+
+    With embeddings given, k * rescore_factor candidates are fetched and
+    re-ranked by exact inner product against their float32 rows (only
+    those rows are read, so a memory-mapped matrix stays on disk).
+
+    Args:
+        query_embeddings: (b, dim) L2-normalized float32 queries
+        params: Per-call SearchParameters (e.g. with an ID selector)
+
+    Returns:
+        (scores, ids) arrays of shape (b, k); ids of -1 mark empty slots
+    """
+    fetch = k * max(1, rescore_factor) if embeddings is not None else k
+    fetch = max(1, min(fetch, index.ntotal))
+
+    if isinstance(index, faiss.IndexBinary):
+        distances, ids = index.search(binarize(query_embeddings), fetch, params=params)
+        scores = -distances.astype(np.float32)  # Fewer differing bits = more similar
+    else:
+        scores, ids = index.search(query_embeddings, fetch, params=params)
+
+    if embeddings is not None:
+        # Exact float32 inner product for each query's candidates
+        valid = ids >= 0
+        candidates = np.asarray(embeddings[np.where(valid, ids, 0).ravel()], dtype=np.float32)
+        candidates = candidates.reshape(ids.shape[0], ids.shape[1], -1)
+        scores = np.einsum('bfd,bd->bf', candidates, query_embeddings)
+        scores[~valid] = -np.inf
+        order = np.argsort(-scores, axis=1)
+        scores = np.take_along_axis(scores, order, axis=1)
+        ids = np.take_along_axis(ids, order, axis=1)
+
+    return scores[:, :k], ids[:, :k]
+
+def write_faiss_index(index, path: str):
+    """Write a float or binary FAISS index."""
+    if isinstance(index, faiss.IndexBinary):
+        faiss.write_index_binary(index, path)
+    else:
+        faiss.write_index(index, path)
+
+def open_faiss_index(index_dir: str, info: Dict,
+                     search_params: Optional[Dict] = None, use_mmap: bool = True) -> faiss.Index:
+    """
+    Read faiss_index.bin and apply search-time parameters.
+
+    With use_mmap, vector codes / inverted lists are memory-mapped read-only
+    (IO_FLAG_MMAP_IFC where available, else IO_FLAG_MMAP for IVF lists), so
+    worker processes share them through the page cache.
+
+    Args:
+        info: index_info.json contents (provides the default search params)
+        search_params: Overrides, e.g. {'efSearch': 128} or {'nprobe': 16};
+                       knobs the index type does not have are ignored
+    """
+    index_path = os.path.join(index_dir, 'faiss_index.bin')
+    io_flags = 0
+    if use_mmap:
+        io_flags = getattr(faiss, 'IO_FLAG_MMAP_IFC', faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+    if info.get('index_params', {}).get('quantization') == 'binary':
+        index = faiss.read_index_binary(index_path, io_flags)
+    else:
+        index = faiss.read_index(index_path, io_flags)
+    params = {k: (search_params or {}).get(k) or v
+              for k, v in info.get('search_params', {}).items()}
+    apply_search_params(index, params)
     return index
 
-def save_index(index: faiss.Index, metadata: List[Dict]):
-    """Save index and metadata to disk."""
+def save_index(index: faiss.Index, metadata: List[Dict], embeddings: np.ndarray,
+               fingerprints: Dict, index_output: str = INDEX_OUTPUT,
+               model_path: str = MODEL_PATH, index_type: str = INDEX_TYPE,
+               build_params: Optional[Dict] = None,
+               search_params: Optional[Dict] = None,
+               quantization: Optional[Dict] = None,
+               passages: Optional[List[str]] = None,
+               passage_doc: Optional[np.ndarray] = None,
+               chunking: Optional[Dict] = None,
+               bm25: Optional[BM25Index] = None):
+    """
+    Save index, embeddings and metadata to disk.
+
+    Args:
+        quantization: quantization_report() of a quantized index, recorded in index_info.json
+        passages / passage_doc: Passage text and document index of each
+                                embedding row (default: one row per document)
+        chunking: chunking_info() used to split the passages
+        bm25: Lexical index over the same rows (built from metadata titles /
+              previews if None)
+    """
+    if passage_doc is None:
+        passage_doc = np.arange(len(metadata), dtype=np.int32)
+        passages = [m.get('text_preview', '') for m in metadata]
+    if bm25 is None:
+        bm25 = BM25Index.build([f"{m.get('title', '')}\n\n{m.get('text_preview', '')}" for m in metadata])
+
     print("\n💾 Saving Index and Metadata...")
 
     # Create output directory
-    os.makedirs(INDEX_OUTPUT, exist_ok=True)
+    os.makedirs(index_output, exist_ok=True)
 
     # Save FAISS index
-    index_path = os.path.join(INDEX_OUTPUT, 'faiss_index.bin')
-    faiss.write_index(index, index_path)
+    index_path = os.path.join(index_output, 'faiss_index.bin')
+    write_faiss_index(index, index_path)
     print(f"   ✅ FAISS index saved: {index_path}")
 
-    # Save metadata
-    metadata_path = os.path.join(INDEX_OUTPUT, 'document_metadata.json')
-    with open(metadata_path, 'w', encoding='utf-8') as f:
-        json.dump(metadata, f, indent=2, ensure_ascii=False)
-    print(f"   ✅ Metadata saved: {metadata_path}")
+    # Save normalized embeddings (row i = passage i)
+    embeddings_path = os.path.join(index_output, 'embeddings.npy')
+    np.save(embeddings_path, embeddings.astype(np.float32, copy=False))
+    print(f"   ✅ Embeddings saved: {embeddings_path}")
 
-    # Save index info
+    # Save compact document store (memory-mapped by the app)
+    write_document_store(metadata, index_output)
+    print(f"   ✅ Document store saved: {os.path.join(index_output, 'document_store.jsonl')}")
+
+    # Save passage texts and passage -> document mapping
+    write_passage_store(passages, passage_doc, index_output)
+    print(f"   ✅ Passage store saved: {os.path.join(index_output, 'passage_store.jsonl')}")
+
+    # Save BM25 postings
+    bm25.save(index_output)
+    print(f"   ✅ BM25 index saved: {bm25.params['num_terms']:,} terms, "
+          f"{bm25.params['num_postings']:,} postings")
+
+    # Save index info (written last: a complete info file marks a complete artifact)
     info = {
         'created_at': datetime.now().isoformat(),
-        'model_path': MODEL_PATH,
+        'model_path': model_path,
+        'model_fingerprint': fingerprints['model_fingerprint'],
+        'corpus_hash': fingerprints['corpus_hash'],
+        'text_max_chars': TEXT_MAX_CHARS,
         'total_documents': len(metadata),
+        'total_passages': len(passage_doc),
+        'chunking': chunking or chunking_info(0),
+        'bm25': bm25.params,
         'embedding_dimension': index.d,
-        'index_type': 'IndexFlatIP',
+        'index_type': index_type,
+        'faiss_index_class': type(index).__name__,
+        'index_params': build_params or {},
+        'search_params': search_params or {},
+        'rescore_factor': RESCORE_FACTOR,
         'similarity_metric': 'cosine'
     }
+    if quantization:
+        info['quantization_report'] = quantization
 
-    info_path = os.path.join(INDEX_OUTPUT, 'index_info.json')
+    info_path = os.path.join(index_output, 'index_info.json')
     with open(info_path, 'w', encoding='utf-8') as f:
         json.dump(info, f, indent=2)
     print(f"   ✅ Index info saved: {info_path}")
 
     # Calculate total size
     index_size = os.path.getsize(index_path) / (1024 * 1024)
-    metadata_size = os.path.getsize(metadata_path) / (1024 * 1024)
-    total_size = index_size + metadata_size
+    embeddings_size = os.path.getsize(embeddings_path) / (1024 * 1024)
+    store_size = os.path.getsize(os.path.join(index_output, 'document_store.jsonl')) / (1024 * 1024)
+    total_size = index_size + embeddings_size + store_size
 
     print(f"\n📊 Index Statistics:")
     print(f"   FAISS index: {index_size:.2f} MB")
-    print(f"   Metadata: {metadata_size:.2f} MB")
+    print(f"   Embeddings: {embeddings_size:.2f} MB")
+    print(f"   Document store: {store_size:.2f} MB")
     print(f"   Total: {total_size:.2f} MB")
 
-def build_index():
-    """Main function to build search index."""
+    return info
+
+def write_jsonl_store(records: List[Dict], index_output: str, name: str):
+    """Write {name}.jsonl (one compact JSON record per line) and {name}_offsets.npy (uint64, n + 1)."""
+    offsets = np.zeros(len(records) + 1, dtype=np.uint64)
+    with open(os.path.join(index_output, f'{name}.jsonl'), 'wb') as f:
+        for i, record in enumerate(records):
+            f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n')
+            offsets[i + 1] = f.tell()
+    np.save(os.path.join(index_output, f'{name}_offsets.npy'), offsets)
+
+def write_document_store(metadata: List[Dict], index_output: str):
+    """
+    Write the compact on-disk document store.
+
+    Files:
+        document_store.jsonl        one compact JSON record per document
+        document_store_offsets.npy  uint64 byte offsets (n + 1) into the JSONL file
+        document_difficulty.npy     int8 index into DIFFICULTY_LABELS per document
+        document_facets.json / .npy filter codes (see search_filters.write_document_facets)
+    """
+    write_jsonl_store(metadata, index_output, 'document_store')
+    write_document_facets(metadata, index_output)
+
+    difficulty = np.array([DIFFICULTY_LABELS.index(m['difficulty_label']) for m in metadata], dtype=np.int8)
+    np.save(os.path.join(index_output, 'document_difficulty.npy'), difficulty)
+
+def write_passage_store(passages: List[str], passage_doc: np.ndarray, index_output: str):
+    """
+    Write passage texts and the passage -> document mapping.
+
+    Files:
+        passage_store.jsonl        {"text": ...} per passage (embedding row order)
+        passage_store_offsets.npy  uint64 byte offsets (n + 1) into the JSONL file
+        passage_doc.npy            int32 document index per passage (non-decreasing)
+    """
+    write_jsonl_store([{'text': passage} for passage in passages], index_output, 'passage_store')
+    np.save(os.path.join(index_output, 'passage_doc.npy'), np.asarray(passage_doc, dtype=np.int32))
+
+class JsonlStore:
+    """
+    Read-only, memory-mapped view of a store written by write_jsonl_store.
+
+    Records are decoded on access, so a process only pays for the records
+    it actually returns; the file pages are shared between processes.
+    """
+
+    def __init__(self, index_dir: str, name: str):
+        self._file = open(os.path.join(index_dir, f'{name}.jsonl'), 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        self._offsets = np.load(os.path.join(index_dir, f'{name}_offsets.npy'), mmap_mode='r')
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i: int) -> Dict:
+        start, end = int(self._offsets[i]), int(self._offsets[i + 1])
+        return json.loads(self._data[start:end])
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def close(self):
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._file.close()
+
+class DocumentStore(JsonlStore):
+    """Document records plus precomputed difficulty codes (see write_document_store)."""
+
+    FILES = ['document_store.jsonl', 'document_store_offsets.npy', 'document_difficulty.npy',
+             'document_facets.json', 'document_facets.npy']
+
+    def __init__(self, index_dir: str):
+        super().__init__(index_dir, 'document_store')
+        self.difficulty = np.load(os.path.join(index_dir, 'document_difficulty.npy'), mmap_mode='r')
+
+class PassageStore(JsonlStore):
+    """Passage texts plus the passage -> document mapping (see write_passage_store)."""
+
+    FILES = ['passage_store.jsonl', 'passage_store_offsets.npy', 'passage_doc.npy']
+
+    def __init__(self, index_dir: str):
+        super().__init__(index_dir, 'passage_store')
+        self.doc = np.load(os.path.join(index_dir, 'passage_doc.npy'))
+        self.doc_offsets = passage_offsets(self.doc)
+
+    def text(self, i: int) -> str:
+        return self[i]['text']
+
+def read_index_info(index_dir: str) -> Optional[Dict]:
+    """Read index_info.json from an index directory (None if absent)."""
+    info_path = os.path.join(index_dir, 'index_info.json')
+    if not os.path.exists(info_path):
+        return None
+    with open(info_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def load_index_artifact(index_dir: str, model_fingerprint: str,
+                        corpus_hash: str, mmap_embeddings: bool = True) -> Optional[Dict]:
+    """
+    Load a previously built index artifact if it matches the given model and corpus.
+
+    Args:
+        mmap_embeddings: Memory-map embeddings.npy (read-only, shared page
+                         cache across worker processes) instead of reading
+                         it into RAM
+
+    Returns:
+        Dict with 'info', 'embeddings', 'documents' (a DocumentStore),
+        'passages' (a PassageStore) and 'bm25' (a BM25Index), or None if the
+        artifact is missing, incomplete or was built from a different model /
+        corpus / text truncation.
+    """
+    info = read_index_info(index_dir)
+    embeddings_path = os.path.join(index_dir, 'embeddings.npy')
+    required = [embeddings_path] + [os.path.join(index_dir, name) for name in
+                                    DocumentStore.FILES + PassageStore.FILES + BM25Index.FILES]
+
+    if info is None or not all(os.path.exists(p) for p in required):
+        print(f"   ⚠️  No complete index artifact in {index_dir}/")
+        return None
+
+    expected = {
+        'model_fingerprint': model_fingerprint,
+        'corpus_hash': corpus_hash,
+        'text_max_chars': TEXT_MAX_CHARS,
+    }
+    stale = [key for key, value in expected.items() if info.get(key) != value]
+    if stale:
+        print(f"   ⚠️  Index artifact is stale ({', '.join(stale)} changed)")
+        return None
+
+    embeddings = np.load(embeddings_path, mmap_mode='r' if mmap_embeddings else None)
+    documents = DocumentStore(index_dir)
+    passages = PassageStore(index_dir)
+
+    if (embeddings.shape[0] != len(passages) or len(passages) != info.get('total_passages')
+            or len(documents) != info.get('total_documents')
+            or len(passages.doc_offsets) - 1 != len(documents)):
+        print(f"   ⚠️  Index artifact is inconsistent (row counts differ)")
+        documents.close()
+        passages.close()
+        return None
+
+    bm25 = BM25Index.load(index_dir, len(passages), info.get('bm25', {}))
+    return {'info': info, 'embeddings': embeddings, 'documents': documents, 'passages': passages,
+            'bm25': bm25}
+
+def build_index(model: Optional[SentenceTransformer] = None,
+                model_path: str = MODEL_PATH,
+                documents_file: str = DOCUMENTS_FILE,
+                index_output: str = INDEX_OUTPUT,
+                index_type: str = INDEX_TYPE,
+                build_params: Optional[Dict] = None,
+                search_params: Optional[Dict] = None,
+                chunk_words: int = CHUNK_WORDS,
+                chunk_overlap: int = CHUNK_OVERLAP,
+                incremental: bool = INCREMENTAL,
+                compact: bool = False,
+                encode_workers: int = ENCODE_WORKERS,
+                encode_threads: Optional[int] = None,
+                token_budget: int = TOKEN_BUDGET) -> Dict:
+    """
+    Main function to build search index.
+
+    Args:
+        model: Already-loaded model to reuse (loaded from model_path if None,
+               and only if something has to be encoded)
+        index_type: One of INDEX_TYPES
+        build_params / search_params: Overrides for resolve_index_params defaults
+        chunk_words / chunk_overlap: Passage size and overlap in words
+                                     (chunk_words = 0: one vector per document)
+        incremental: Encode only documents missing from the embedding manifest
+                     (False: re-encode everything and reset the manifest)
+        compact: Rewrite the manifest's vector file without tombstones now
+        encode_workers / encode_threads: Encoder processes and intra-op threads
+                                         per process (see parallel_encode)
+        token_budget: Padded tokens per encode batch (0: fixed BATCH_SIZE batches)
+
+    Returns:
+        Dict with 'info', 'embeddings', 'documents', 'passages' and 'bm25'
+        (same shape as load_index_artifact)
+    """
     print("=" * 70)
-    print("🎯 BUILD SEARCH INDEX - SUPERCONDUCTOR SEARCH V2")
+    print("🎯 BUILD SEARCH INDEX - SUPERCONDUCTOR SEARCH V7")
     print("=" * 70)
 
+    # Fingerprint inputs so consumers can detect a stale artifact
+    fingerprints = {
+        'model_fingerprint': compute_model_fingerprint(model_path),
+        'corpus_hash': compute_corpus_hash(documents_file),
+    }
+
     # Load documents
-    documents = load_documents()
+    documents = load_documents(documents_file)
 
     # Prepare texts
-    doc_texts, doc_metadata = prepare_texts(documents)
+    passage_texts, doc_metadata, passages, passage_doc = prepare_texts(documents, chunk_words, chunk_overlap)
+
+    # Load trained model (on first use: an incremental build may not need it)
+    def get_model() -> SentenceTransformer:
+        nonlocal model
+        if model is None:
+            print("\n🤖 Loading Trained Model...")
+            print(f"   Path: {model_path}")
+            model = SentenceTransformer(model_path)
+            print(f"✅ Model loaded")
+        return model
+
+    # Generate embeddings (only for new / changed documents)
+    print("\n🗂️  Checking Embedding Manifest...")
+    manifest = open_manifest(index_output, fingerprints['model_fingerprint'],
+                             {'chunking': chunking_info(chunk_words, chunk_overlap),
+                              'text_max_chars': TEXT_MAX_CHARS},
+                             reset=not incremental)
+    keys = document_keys(doc_metadata)
+    doc_offsets = passage_offsets(passage_doc)
+    doc_texts = [passage_texts[start:end] for start, end in zip(doc_offsets[:-1], doc_offsets[1:])]
+    embeddings = manifest.update(keys, doc_texts,
+                                 lambda texts: generate_embeddings(
+                                     # Sharded encoding loads the model in the workers only
+                                     get_model() if encode_workers <= 1 else model,
+                                     texts, model_path, encode_workers, encode_threads,
+                                     os.path.join(index_output, 'shards'), token_budget))
+    if compact or manifest.needs_compaction(COMPACT_TOMBSTONE_RATIO):
+        manifest.compact(keys)
 
-    # Load trained model
-    print("\n🤖 Loading Trained Model...")
-    print(f"   Path: {MODEL_PATH}")
-    model = SentenceTransformer(MODEL_PATH)
-    print(f"✅ Model loaded")
+    # Build BM25 postings over the same passage texts
+    print("\n🔤 Building BM25 Index...")
+    bm25 = BM25Index.build(passage_texts)
+    print(f"✅ BM25 index built: {bm25.params['num_terms']:,} terms, "
+          f"{bm25.params['num_postings']:,} postings")
 
-    # Generate embeddings
-    embeddings = generate_embeddings(model, doc_texts)
+    # Build FAISS index (normalizes embeddings in place)
+    index, build_params, search_params = build_faiss_index(
+        embeddings, index_type, build_params, search_params)
 
-    # Build FAISS index
-    index = build_faiss_index(embeddings)
+    # Measure what quantization costs in recall (and saves in memory)
+    report = None
+    if is_quantized({'index_type': index_type, 'index_params': build_params}):
+        report = print_quantization_report(get_model(), index, embeddings, model_path)
 
     # Save index and metadata
-    save_index(index, doc_metadata)
+    info = save_index(index, doc_metadata, embeddings, fingerprints,
+                      index_output, model_path, index_type,
+                      build_params, search_params, report,
+                      passages, passage_doc, chunking_info(chunk_words, chunk_overlap), bm25)
 
     print("\n" + "=" * 70)
     print("✅ SEARCH INDEX BUILT SUCCESSFULLY!")
     print("=" * 70)
-    print(f"\n📁 Output directory: {INDEX_OUTPUT}/")
+    print(f"\n📁 Output directory: {index_output}/")
     print(f"   - faiss_index.bin (FAISS vector index)")
-    print(f"   - document_metadata.json (document metadata)")
+    print(f"   - embeddings.npy (normalized passage embeddings)")
+    print(f"   - document_store.jsonl + offsets / difficulty .npy (memory-mapped store)")
+    print(f"   - passage_store.jsonl + offsets / passage_doc.npy (passage texts and mapping)")
+    print(f"   - bm25_*.npy / bm25_vocab.json (BM25 inverted index)")
     print(f"   - index_info.json (index information)")
+    print(f"   - incremental/ (embedding manifest for delta builds)")
     print("\n🎯 Ready for testing!")
     print("=" * 70 + "\n")
 
+    return {'info': info, 'embeddings': embeddings, 'documents': DocumentStore(index_output),
+            'passages': PassageStore(index_output), 'bm25': bm25}
+
+def load_benchmark_queries() -> List[str]:
+    """
+    Collect benchmark queries from the existing test suites and training files.
+
+    Sources:
+        test_search_model.TEST_CASES, scripts/testing/test_model_v7.py
+        (PROBLEM_QUERIES, TEST_QUERIES) and the 'query' field of
+        BENCHMARK_QUERY_FILES that exist.
+    """
+    from test_search_model import TEST_CASES
+
+    spec = importlib.util.spec_from_file_location(
+        'test_model_v7', os.path.join('scripts', 'testing', 'test_model_v7.py'))
+    test_model_v7 = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(test_model_v7)
+
+    queries = []
+    for query_sets in (TEST_CASES, test_model_v7.PROBLEM_QUERIES, test_model_v7.TEST_QUERIES):
+        for category_queries in query_sets.values():
+            queries.extend(category_queries)
+
+    for path in BENCHMARK_QUERY_FILES:
+        if not os.path.exists(resolve_records_path(path)):
+            continue
+        queries.extend(p['query'] for p in iter_records(path) if isinstance(p, dict) and p.get('query'))
+
+    # Deduplicate, keep first-seen order
+    return list(dict.fromkeys(q.strip() for q in queries if q.strip()))
+
+def exact_top_k(embeddings: np.ndarray, query_embeddings: np.ndarray, k: int) -> np.ndarray:
+    """Exact top-k ids by inner product (the recall baseline)."""
+    exact = faiss.IndexFlatIP(embeddings.shape[1])
+    exact.add(embeddings)
+    _, exact_ids = exact.search(query_embeddings, k)
+    return exact_ids
+
+def recall_at_k(found_ids: np.ndarray, exact_ids: np.ndarray) -> float:
+    """Mean fraction of the exact top-k ids that were found."""
+    k = exact_ids.shape[1]
+    hits = [len(np.intersect1d(found, exact)) for found, exact in zip(found_ids, exact_ids)]
+    return float(np.mean(hits) / k)
+
+def quantization_report(index, embeddings: np.ndarray, query_embeddings: np.ndarray,
+                        k: int = BENCHMARK_K, rescore_factor: int = RESCORE_FACTOR) -> Dict:
+    """
+    Memory saved and recall lost by a quantized index, versus exact float32 search.
+
+    Returns:
+        Dict with float32 / index sizes and recall@k without and with rescoring
+    """
+    k = min(k, embeddings.shape[0])
+    exact_ids = exact_top_k(embeddings, query_embeddings, k)
+    _, raw_ids = search_faiss_index(index, query_embeddings, k)
+    _, rescored_ids = search_faiss_index(index, query_embeddings, k, embeddings, rescore_factor)
+
+    float32_bytes = embeddings.shape[0] * embeddings.shape[1] * 4
+    index_bytes = index_size_bytes(index)
+    return {
+        'k': k,
+        'num_queries': int(query_embeddings.shape[0]),
+        'float32_mb': float32_bytes / (1024 * 1024),
+        'index_mb': index_bytes / (1024 * 1024),
+        'memory_saved_pct': 100 * (1 - index_bytes / float32_bytes),
+        'recall_raw': recall_at_k(raw_ids, exact_ids),
+        'recall_rescored': recall_at_k(rescored_ids, exact_ids),
+        'rescore_factor': rescore_factor,
+    }
+
+def print_quantization_report(model: SentenceTransformer, index, embeddings: np.ndarray,
+                              model_path: str = MODEL_PATH) -> Dict:
+    """Run quantization_report on the benchmark queries and print it."""
+    print("\n📉 Quantization Report...")
+    queries = load_benchmark_queries()
+    query_embeddings = cached_encode(model, queries, model_path, batch_size=BATCH_SIZE)
+    query_embeddings = np.ascontiguousarray(query_embeddings, dtype=np.float32)
+    faiss.normalize_L2(query_embeddings)
+
+    report = quantization_report(index, embeddings, query_embeddings)
+    print(f"   Vectors: {report['float32_mb']:.2f} MB float32 → {report['index_mb']:.2f} MB index "
+          f"({report['memory_saved_pct']:.1f}% saved)")
+    print(f"   Recall@{report['k']} vs exact ({report['num_queries']:,} queries): "
+          f"{report['recall_raw']:.3f} raw, {report['recall_rescored']:.3f} with "
+          f"{report['rescore_factor']}x float32 rescoring")
+    return report
+
+def index_size_bytes(index: faiss.Index) -> int:
+    """On-disk size of a FAISS index (as written by faiss.write_index)."""
+    with tempfile.NamedTemporaryFile(suffix='.bin') as tmp:
+        write_faiss_index(index, tmp.name)
+        return os.path.getsize(tmp.name)
+
+def benchmark_index_variants(embeddings: np.ndarray, query_embeddings: np.ndarray,
+                             k: int = BENCHMARK_K, variants=BENCHMARK_VARIANTS) -> List[Dict]:
+    """
+    Build each index variant from the same embeddings and measure it.
+
+    Recall@k is measured against an exact IndexFlatIP search. Latency is
+    per single query (batch size 1, as in the app), in milliseconds.
+    Quantized variants are timed and scored with float32 rescoring
+    (RESCORE_FACTOR); their recall without rescoring is reported as recall_raw.
+
+    Args:
+        embeddings: L2-normalized document embeddings
+        query_embeddings: L2-normalized query embeddings
+
+    Returns:
+        One result dict per (variant, search params) combination
+    """
+    k = min(k, embeddings.shape[0])
+    exact_ids = exact_top_k(embeddings, query_embeddings, k)
+
+    results = []
+    for index_type, build_params, search_sweep in variants:
+        start = time.perf_counter()
+        index, resolved_build, _ = build_faiss_index(embeddings.copy(), index_type, build_params)
+        build_seconds = time.perf_counter() - start
+        size_bytes = index_size_bytes(index)
+        quantized = is_quantized({'index_type': index_type, 'index_params': resolved_build})
+        rescore_embeddings = embeddings if quantized else None
+
+        for search_params in search_sweep:
+            _, resolved_search = resolve_index_params(index_type, embeddings.shape[0],
+                                                      resolved_build, search_params)
+            apply_search_params(index, resolved_search)
+
+            latencies = np.empty(len(query_embeddings))
+            found_ids = np.empty((len(query_embeddings), k), dtype=np.int64)
+            for i in range(len(query_embeddings)):
+                start = time.perf_counter()
+                _, ids = search_faiss_index(index, query_embeddings[i:i + 1], k, rescore_embeddings)
+                latencies[i] = (time.perf_counter() - start) * 1000
+                found_ids[i] = ids[0]
+
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+            result = {
+                'index_type': index_type,
+                'index_params': resolved_build,
+                'search_params': resolved_search,
+                f'recall@{k}': recall_at_k(found_ids, exact_ids),
+                'latency_ms': {'p50': float(p50), 'p95': float(p95), 'p99': float(p99)},
+                'build_seconds': build_seconds,
+                'size_mb': size_bytes / (1024 * 1024),
+            }
+            if quantized:
+                _, raw_ids = search_faiss_index(index, query_embeddings, k)
+                result['recall_raw'] = recall_at_k(raw_ids, exact_ids)
+                result['rescore_factor'] = RESCORE_FACTOR
+            results.append(result)
+
+    return results
+
+def print_benchmark_report(results: List[Dict], k: int, num_queries: int, num_vectors: int):
+    """Print benchmark results as a table."""
+    print("\n" + "=" * 104)
+    print(f"📊 INDEX BENCHMARK ({num_queries:,} queries x {num_vectors:,} vectors, k={k})")
+    print("=" * 104)
+    print(f"\n{'Variant':48s} {'Recall':>7s} {'Raw':>7s} {'p50ms':>7s} {'p95ms':>7s} {'p99ms':>7s} "
+          f"{'Build s':>8s} {'MB':>7s}")
+    print("─" * 104)
+    # Recall = with float32 rescoring for quantized variants, Raw = without
+    for r in results:
+        params = ','.join(f"{key}={value}" for key, value in {**r['index_params'], **r['search_params']}.items()
+                          if value != 'none')
+        name = f"{r['index_type']}({params})" if params else r['index_type']
+        latency = r['latency_ms']
+        raw = f"{r['recall_raw']:7.3f}" if 'recall_raw' in r else f"{'-':>7s}"
+        print(f"{name[:48]:48s} {r[f'recall@{k}']:7.3f} {raw} {latency['p50']:7.3f} {latency['p95']:7.3f} "
+              f"{latency['p99']:7.3f} {r['build_seconds']:8.2f} {r['size_mb']:7.2f}")
+
+def run_benchmark(index_output: str = INDEX_OUTPUT, k: int = BENCHMARK_K,
+                  output_file: str = BENCHMARK_OUTPUT, model_path: str = MODEL_PATH,
+                  documents_file: str = DOCUMENTS_FILE):
+    """Benchmark index variants on the current artifact's embeddings (for model_path / documents_file)."""
+    print("=" * 70)
+    print("⏱️  INDEX BENCHMARK - RECALL VS LATENCY")
+    print("=" * 70)
+
+    # Reuse the saved embeddings when they are current, otherwise build them
+    artifact = load_index_artifact(index_output, compute_model_fingerprint(model_path),
+                                   compute_corpus_hash(documents_file))
+    model = SentenceTransformer(model_path)
+    if artifact is None:
+        artifact = build_index(model=model, model_path=model_path, documents_file=documents_file,
+                               index_output=index_output)
+    embeddings = np.ascontiguousarray(artifact['embeddings'], dtype=np.float32)
+
+    queries = load_benchmark_queries()
+    print(f"\n📝 Encoding {len(queries):,} benchmark queries...")
+    query_embeddings = cached_encode(model, queries, model_path, batch_size=BATCH_SIZE)
+    query_embeddings = np.ascontiguousarray(query_embeddings, dtype=np.float32)
+    faiss.normalize_L2(query_embeddings)
+
+    results = benchmark_index_variants(embeddings, query_embeddings, k)
+    print_benchmark_report(results, k, len(queries), embeddings.shape[0])
+
+    report = {
+        'created_at': datetime.now().isoformat(),
+        'model_path': model_path,
+        'model_fingerprint': artifact['info']['model_fingerprint'],
+        'num_vectors': int(embeddings.shape[0]),
+        'num_queries': len(queries),
+        'k': k,
+        'results': results,
+    }
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Benchmark results saved: {output_file}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the FAISS search index')
+    parser.add_argument('--index-type', choices=INDEX_TYPES, default=INDEX_TYPE,
+                        help='Index structure (default: exact flat scan)')
+    parser.add_argument('--output', default=INDEX_OUTPUT, help='Output directory')
+    parser.add_argument('--model', default=MODEL_PATH, help='Model directory')
+    parser.add_argument('--documents', default=DOCUMENTS_FILE, help='Corpus JSON')
+    parser.add_argument('--hnsw-m', type=int, help=f'HNSW neighbours per node (default: {HNSW_M})')
+    parser.add_argument('--ef-construction', type=int,
+                        help=f'HNSW build candidate list (default: {HNSW_EF_CONSTRUCTION})')
+    parser.add_argument('--ef-search', type=int,
+                        help=f'HNSW query candidate list (default: {HNSW_EF_SEARCH})')
+    parser.add_argument('--nlist', type=int, help='IVF inverted lists (default: ~4*sqrt(n))')
+    parser.add_argument('--nprobe', type=int, help=f'IVF lists probed per query (default: {IVF_NPROBE})')
+    parser.add_argument('--pq-m', type=int, help=f'PQ sub-quantizers (default: {PQ_M})')
+    parser.add_argument('--pq-nbits', type=int, help=f'PQ bits per code (default: {PQ_NBITS})')
+    parser.add_argument('--quantization', choices=QUANTIZATIONS,
+                        help=f'Vector storage for flat / hnsw / ivf_flat (default: {QUANTIZATION})')
+    parser.add_argument('--chunk-words', type=int, default=CHUNK_WORDS,
+                        help=f'Words per passage, 0 = one vector per document (default: {CHUNK_WORDS})')
+    parser.add_argument('--chunk-overlap', type=int, default=CHUNK_OVERLAP,
+                        help=f'Words shared by consecutive passages (default: {CHUNK_OVERLAP})')
+    parser.add_argument('--full-rebuild', action='store_true',
+                        help='Re-encode every document (ignore the embedding manifest)')
+    parser.add_argument('--compact', action='store_true',
+                        help='Remove tombstoned vectors from the embedding manifest')
+    parser.add_argument('--encode-workers', type=int, default=ENCODE_WORKERS,
+                        help=f'Encoder processes for sharded encoding (default: {ENCODE_WORKERS})')
+    parser.add_argument('--encode-threads', type=int,
+                        help='Intra-op threads per encoder process (default: cores / workers)')
+    parser.add_argument('--token-budget', type=int, default=TOKEN_BUDGET,
+                        help=f'Padded tokens per length-bucketed encode batch, '
+                             f'0 = fixed batches of {BATCH_SIZE} (default: {TOKEN_BUDGET})')
+    parser.add_argument('--benchmark', action='store_true',
+                        help='Compare index variants (recall@k vs exact, latency, build time, size)')
+    parser.add_argument('--benchmark-k', type=int, default=BENCHMARK_K, help='k for recall@k')
+    parser.add_argument('--benchmark-output', default=BENCHMARK_OUTPUT, help='Benchmark JSON report')
+    args = parser.parse_args()
+    try:
+        check_chunking(args.chunk_words, args.chunk_overlap)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.benchmark:
+        run_benchmark(args.output, args.benchmark_k, args.benchmark_output, args.model, args.documents)
+        return
+
+    build_params = {
+        'M': args.hnsw_m,
+        'efConstruction': args.ef_construction,
+        'nlist': args.nlist,
+        'pq_m': args.pq_m,
+        'pq_nbits': args.pq_nbits,
+        'quantization': args.quantization,
+    }
+    search_params = {'efSearch': args.ef_search, 'nprobe': args.nprobe}
+
+    build_index(model_path=args.model, documents_file=args.documents,
+                index_output=args.output, index_type=args.index_type,
+                build_params=build_params, search_params=search_params,
+                chunk_words=args.chunk_words, chunk_overlap=args.chunk_overlap,
+                incremental=not args.full_rebuild, compact=args.compact,
+                encode_workers=args.encode_workers, encode_threads=args.encode_threads,
+                token_budget=args.token_budget)
+
 if __name__ == "__main__":
-    build_index()
+    main()
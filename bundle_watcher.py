@@ -0,0 +1,268 @@
+"""
+Bundle Watcher - Superconductor Search
+=======================================
+
+Zero-downtime model / index refreshes for app.py.
+
+A bundles directory holds one subdirectory per version, each with a
+bundle.json manifest naming its model, prebuilt index and corpus, plus a
+CURRENT file with the version to serve:
+
+    bundles/
+        CURRENT                  "v8-2026-10-17"
+        v7/bundle.json           {"model": "model", "index": "search_index", ...}
+        v8-2026-10-17/bundle.json
+
+The watcher polls CURRENT; when it names a new version, the bundle is
+loaded in the background, checked with a smoke query set, and handed to
+the app to swap in. Requests already running finish on the old bundle,
+which is retired once they are done. A version that fails to load or
+verify is skipped (the old one keeps serving) until CURRENT changes again.
+
+Features:
+- Pointer file switch: activating (or rolling back to) a version is one
+  atomic rename of CURRENT
+- Smoke check of every search mode before a bundle is served
+- Versions never re-encode in the server: a stale index is an error
+
+Usage:
+    # Build v8 into its own directory, then activate it
+    python build_search_index.py --model models/v8 --output bundles/v8/search_index
+    python bundle_watcher.py --root bundles --version v8 --model ../../models/v8 --activate
+
+    SEARCH_BUNDLES_DIR=bundles python app.py
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from search_bundle import SEARCH_MODES, SearchBundle
+
+# Configuration
+BUNDLE_MANIFEST = 'bundle.json'
+CURRENT_FILE = 'CURRENT'
+WATCH_INTERVAL_SECONDS = 30
+SMOKE_K = 5
+SMOKE_QUERIES = [
+    'what is superconductivity',
+    'cooper pairs',
+    'meissner effect',
+    'BCS theory',
+    'high temperature cuprate superconductors',
+    'MgB2',
+]
+
+def read_current(root: str) -> Optional[str]:
+    """Version named by root/CURRENT, or None if there is none."""
+    try:
+        with open(os.path.join(root, CURRENT_FILE), 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def set_current(root: str, version: str):
+    """Point CURRENT at version (atomic rename: the watcher never reads a partial file)."""
+    tmp_path = os.path.join(root, f'.{CURRENT_FILE}.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(version + '\n')
+    os.replace(tmp_path, os.path.join(root, CURRENT_FILE))
+
+def write_manifest(root: str, version: str, model: str, index: str = 'search_index',
+                   documents: Optional[str] = None, encoder_backend: Optional[str] = None,
+                   smoke_queries: Optional[List[str]] = None) -> str:
+    """
+    Write root/version/bundle.json.
+
+    Args:
+        model / index / documents: Paths, relative to the version directory
+                                   (or absolute)
+
+    Returns:
+        Path of the manifest
+    """
+    version_dir = os.path.join(root, version)
+    os.makedirs(version_dir, exist_ok=True)
+    manifest = {
+        'version': version,
+        'model': model,
+        'index': index,
+        'documents': documents,
+        'encoder_backend': encoder_backend,
+        'smoke_queries': smoke_queries,
+        'created_at': datetime.now().isoformat(),
+    }
+    path = os.path.join(version_dir, BUNDLE_MANIFEST)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({k: v for k, v in manifest.items() if v is not None}, f, indent=2)
+    return path
+
+def read_manifest(root: str, version: str) -> Dict:
+    """
+    bundle.json of a version, with paths resolved against its directory.
+
+    Raises:
+        FileNotFoundError: The version has no manifest
+    """
+    version_dir = os.path.join(root, version)
+    with open(os.path.join(version_dir, BUNDLE_MANIFEST), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    manifest.setdefault('index', 'search_index')
+    for key in ('model', 'index', 'documents'):
+        if manifest.get(key):
+            manifest[key] = os.path.normpath(os.path.join(version_dir, manifest[key]))
+    manifest['version'] = version
+    return manifest
+
+def bundle_from_manifest(manifest: Dict, default_docs_path: str) -> SearchBundle:
+    """Unloaded SearchBundle for a manifest (a stale index is an error, not a rebuild)."""
+    return SearchBundle(manifest['model'], manifest.get('documents') or default_docs_path,
+                        manifest['index'], manifest.get('encoder_backend'),
+                        version=manifest['version'], allow_rebuild=False)
+
+def smoke_check(bundle: SearchBundle, queries: Optional[List[str]] = None, k: int = SMOKE_K) -> Dict:
+    """
+    Run the smoke queries through every search mode of a loaded bundle.
+
+    Dense and hybrid searches must return min(k, n_docs) results for every
+    query; lexical search must return results for at least one query (exact
+    terms may legitimately be missing from a corpus).
+
+    Raises:
+        RuntimeError: A check failed
+    """
+    queries = queries or SMOKE_QUERIES
+    expected = min(k, len(bundle.doc_store))
+    report = {}
+    for mode in SEARCH_MODES:
+        start = time.perf_counter()
+        all_results = bundle.search_many(queries, k, mode=mode)
+        report[mode] = {'seconds': round(time.perf_counter() - start, 3),
+                        'results': [len(results) for results in all_results]}
+        if mode == 'lexical':
+            if not any(all_results):
+                raise RuntimeError("Smoke check failed: no lexical results for any smoke query")
+        elif any(len(results) < expected for results in all_results):
+            raise RuntimeError(f"Smoke check failed: {mode} search returned "
+                               f"{report[mode]['results']} results (expected {expected} each)")
+    return report
+
+class BundleWatcher:
+    """Poll a bundles directory and hand verified new versions to on_swap."""
+
+    def __init__(self, root: str, on_swap: Callable[[SearchBundle], None],
+                 current_version: Optional[str] = None, default_docs_path: Optional[str] = None,
+                 interval_seconds: float = WATCH_INTERVAL_SECONDS):
+        """
+        Args:
+            root: Bundles directory (with CURRENT and one subdirectory per version)
+            on_swap: Called with each new loaded and verified bundle
+            current_version: Version already being served
+            default_docs_path: Corpus for manifests that do not name one
+        """
+        self.root = root
+        self.on_swap = on_swap
+        self.current_version = current_version
+        self.default_docs_path = default_docs_path
+        self.interval_seconds = interval_seconds
+        self.loading_version = None
+        self.failed_version = None
+        self.error = None
+        self.last_swap = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='bundle-watcher', daemon=True)
+
+    def start(self) -> 'BundleWatcher':
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def status(self) -> Dict:
+        """JSON-ready watcher state."""
+        return {
+            'root': self.root,
+            'current_version': self.current_version,
+            'loading_version': self.loading_version,
+            'failed_version': self.failed_version,
+            'error': self.error,
+            'last_swap': self.last_swap,
+        }
+
+    def check(self) -> bool:
+        """
+        Load, verify and swap in the CURRENT version if it is new.
+
+        Returns:
+            True if a new bundle was swapped in
+        """
+        version = read_current(self.root)
+        if version is None or version in (self.current_version, self.failed_version):
+            return False
+
+        print(f"🔄 New search bundle: {version} (serving: {self.current_version})")
+        self.loading_version = version
+        start = time.perf_counter()
+        try:
+            manifest = read_manifest(self.root, version)
+            bundle = bundle_from_manifest(manifest, self.default_docs_path).load()
+            try:
+                report = smoke_check(bundle, manifest.get('smoke_queries'))
+            except Exception:
+                bundle.close()
+                raise
+        except Exception as e:
+            self.failed_version = version
+            self.error = f"{type(e).__name__}: {e}"
+            print(f"❌ Bundle {version} rejected, still serving {self.current_version}: {self.error}")
+            return False
+        finally:
+            self.loading_version = None
+
+        self.on_swap(bundle)
+        self.last_swap = {
+            'from': self.current_version,
+            'to': version,
+            'at': datetime.now().isoformat(),
+            'load_seconds': round(time.perf_counter() - start, 3),
+            'smoke': report,
+        }
+        self.current_version = version
+        self.failed_version = None
+        self.error = None
+        print(f"✅ Swapped in search bundle {version} ({self.last_swap['load_seconds']:.1f}s)")
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                self.check()
+            except Exception as e:  # Keep watching: the served bundle is unaffected
+                self.error = f"{type(e).__name__}: {e}"
+
+def main():
+    parser = argparse.ArgumentParser(description='Register (and activate) a search bundle version')
+    parser.add_argument('--root', required=True, help='Bundles directory')
+    parser.add_argument('--version', required=True, help='Version name (subdirectory of --root)')
+    parser.add_argument('--model', required=True, help='Model directory, relative to the version directory')
+    parser.add_argument('--index', default='search_index', help='Index directory, relative to the version directory')
+    parser.add_argument('--documents', help='Corpus JSON the index was built from (default: the app corpus)')
+    parser.add_argument('--encoder-backend', help='Query encoder backend for this version')
+    parser.add_argument('--activate', action='store_true', help='Point CURRENT at this version')
+    args = parser.parse_args()
+
+    path = write_manifest(args.root, args.version, args.model, args.index,
+                          args.documents, args.encoder_backend)
+    print(f"💾 Manifest saved: {path}")
+    if args.activate:
+        set_current(args.root, args.version)
+        print(f"✅ {args.root}/{CURRENT_FILE} -> {args.version}")
+
+if __name__ == "__main__":
+    main()
@@ -7,17 +7,21 @@ Creates hard negatives that make semantic sense:
 - Historical figures should NOT match "what is superconductivity"
 - Generic theory docs should NOT match "who is John Bardeen"
 - Papers about specific materials should NOT match queries about other materials
+
+Query pairs are streamed (read, paired with negatives, filtered and
+written one at a time), so memory holds the documents but not the pairs.
 """
 
-import json
 import random
-from typing import List, Dict, Set
+from typing import Iterable, Iterator, List, Dict, Set
 from datetime import datetime
 
+from json_stream import RecordWriter, iter_records, load_records
+
 # Configuration
 DOCUMENTS_FILE = 'data/processed/FINAL_ALL_IMPROVED_documents_20251104_223630.json'
 QUERIES_FILE = 'data/processed/FINAL_ALL_IMPROVED_queries_with_general_20251104_223630.json'
-OUTPUT_FILE = f'data/processed/queries_with_hard_negatives_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
+OUTPUT_FILE = f'data/processed/queries_with_hard_negatives_{datetime.now().strftime("%Y%m%d_%H%M%S")}.jsonl'
 
 def identify_biographical_docs(documents: List[Dict]) -> Set[str]:
     """
@@ -134,7 +138,7 @@ def get_material_from_query(query_text: str) -> str:
 
     return None
 
-def create_hard_negatives(queries: List[Dict], documents: List[Dict]) -> List[Dict]:
+def create_hard_negatives(queries: Iterable[Dict], documents: List[Dict]) -> Iterator[Dict]:
     """
     Create smart hard negatives for contrastive learning.
 
@@ -142,6 +146,9 @@ def create_hard_negatives(queries: List[Dict], documents: List[Dict]) -> List[Di
     1. Generic queries should have biographical docs as hard negatives
     2. Person-specific queries should have generic theory docs as hard negatives
     3. Material-specific queries should have docs about OTHER materials as hard negatives
+
+    Yields each original pair followed by its hard negatives (statistics
+    are printed once the queries are exhausted).
     """
     print("="*70)
     print("🔍 Creating Smart Hard Negatives")
@@ -167,7 +174,8 @@ def create_hard_negatives(queries: List[Dict], documents: List[Dict]) -> List[Di
 
     # Process queries and add hard negatives
     print("\n2️⃣ Creating hard negatives...")
-    new_queries = []
+    query_count = 0
+    label_counts = {0: 0, 1: 0}
     hard_neg_stats = {
         'generic_query_bio_negative': 0,
         'person_query_theory_negative': 0,
@@ -176,7 +184,9 @@ def create_hard_negatives(queries: List[Dict], documents: List[Dict]) -> List[Di
 
     for query in queries:
         # Keep original positive pair
-        new_queries.append(query)
+        query_count += 1
+        label_counts[query['label']] = label_counts.get(query['label'], 0) + 1
+        yield query
 
         query_text = query['query_text']
         positive_doc_id = query['doc_id']
@@ -190,7 +200,8 @@ def create_hard_negatives(queries: List[Dict], documents: List[Dict]) -> List[Di
                 negative_docs = random.sample(list(available_bio_docs), num_negatives)
 
                 for neg_doc_id in negative_docs:
-                    new_queries.append({
+                    label_counts[0] += 1
+                    yield {
                         'query_text': query_text,
                         'query_difficulty': query.get('query_difficulty', 2),
                         'doc_id': neg_doc_id,
@@ -198,7 +209,7 @@ def create_hard_negatives(queries: List[Dict], documents: List[Dict]) -> List[Di
                         'doc_difficulty': doc_lookup[neg_doc_id].get('difficulty_level', 2),
                         'label': 0,  # NEGATIVE
                         'pair_type': 'hard_negative_generic_to_bio'
-                    })
+                    }
                     hard_neg_stats['generic_query_bio_negative'] += 1
 
         # Rule 2: Person-specific queries → generic theory docs as negatives
@@ -210,7 +221,8 @@ def create_hard_negatives(queries: List[Dict], documents: List[Dict]) -> List[Di
                 negative_docs = random.sample(list(available_theory_docs), num_negatives)
 
                 for neg_doc_id in negative_docs:
-                    new_queries.append({
+                    label_counts[0] += 1
+                    yield {
                         'query_text': query_text,
                         'query_difficulty': query.get('query_difficulty', 2),
                         'doc_id': neg_doc_id,
@@ -218,7 +230,7 @@ def create_hard_negatives(queries: List[Dict], documents: List[Dict]) -> List[Di
                         'doc_difficulty': doc_lookup[neg_doc_id].get('difficulty_level', 2),
                         'label': 0,  # NEGATIVE
                         'pair_type': 'hard_negative_person_to_theory'
-                    })
+                    }
                     hard_neg_stats['person_query_theory_negative'] += 1
 
         # Rule 3: Material-specific queries → other material docs as negatives
@@ -236,7 +248,8 @@ def create_hard_negatives(queries: List[Dict], documents: List[Dict]) -> List[Di
                 negative_docs = random.sample(list(available_other_material), num_negatives)
 
                 for neg_doc_id in negative_docs:
-                    new_queries.append({
+                    label_counts[0] += 1
+                    yield {
                         'query_text': query_text,
                         'query_difficulty': query.get('query_difficulty', 2),
                         'doc_id': neg_doc_id,
@@ -244,7 +257,7 @@ def create_hard_negatives(queries: List[Dict], documents: List[Dict]) -> List[Di
                         'doc_difficulty': doc_lookup[neg_doc_id].get('difficulty_level', 2),
                         'label': 0,  # NEGATIVE
                         'pair_type': 'hard_negative_material_mismatch'
-                    })
+                    }
                     hard_neg_stats['material_query_other_material'] += 1
 
     # Statistics
@@ -253,28 +266,23 @@ def create_hard_negatives(queries: List[Dict], documents: List[Dict]) -> List[Di
     print(f"   - Person query → Theory doc: {hard_neg_stats['person_query_theory_negative']:,}")
     print(f"   - Material query → Other material: {hard_neg_stats['material_query_other_material']:,}")
     print(f"\n📊 Dataset statistics:")
-    print(f"   - Original queries: {len(queries):,}")
-    print(f"   - Total pairs (with negatives): {len(new_queries):,}")
-    print(f"   - Positive pairs: {sum(1 for q in new_queries if q['label'] == 1):,}")
-    print(f"   - Negative pairs: {sum(1 for q in new_queries if q['label'] == 0):,}")
-
-    positive_count = sum(1 for q in new_queries if q['label'] == 1)
-    negative_count = sum(1 for q in new_queries if q['label'] == 0)
-    pos_ratio = positive_count / len(new_queries) * 100
-    print(f"   - Positive ratio: {pos_ratio:.1f}%")
+    total_pairs = sum(label_counts.values())
+    print(f"   - Original queries: {query_count:,}")
+    print(f"   - Total pairs (with negatives): {total_pairs:,}")
+    print(f"   - Positive pairs: {label_counts[1]:,}")
+    print(f"   - Negative pairs: {label_counts[0]:,}")
 
-    return new_queries
+    pos_ratio = label_counts[1] / total_pairs * 100
+    print(f"   - Positive ratio: {pos_ratio:.1f}%")
 
-def remove_bad_pairings(queries: List[Dict], documents: List[Dict]) -> List[Dict]:
+def remove_bad_pairings(queries: Iterable[Dict], documents: List[Dict]) -> Iterator[Dict]:
     """
     Remove positive pairs that don't make sense.
     E.g., biographical docs with generic queries.
     """
-    print("\n3️⃣ Removing bad positive pairings...")
-
     biographical_docs = identify_biographical_docs(documents)
 
-    filtered_queries = []
+    kept_count = 0
     removed_count = 0
 
     for query in queries:
@@ -287,12 +295,12 @@ def remove_bad_pairings(queries: List[Dict], documents: List[Dict]) -> List[Dict
             removed_count += 1
             continue
 
-        filtered_queries.append(query)
+        kept_count += 1
+        yield query
 
+    print("\n3️⃣ Removing bad positive pairings...")
     print(f"   ❌ Removed {removed_count} bad positive pairs")
-    print(f"   ✅ Kept {len(filtered_queries):,} pairs")
-
-    return filtered_queries
+    print(f"   ✅ Kept {kept_count:,} pairs")
 
 def main():
     print("="*70)
@@ -301,26 +309,20 @@ def main():
 
     # Load data
     print("\n📂 Loading data...")
-    with open(DOCUMENTS_FILE, 'r', encoding='utf-8') as f:
-        doc_data = json.load(f)
-        documents = doc_data['documents']
-
-    with open(QUERIES_FILE, 'r', encoding='utf-8') as f:
-        queries = json.load(f)
-
+    documents = load_records(DOCUMENTS_FILE, key='documents')
     print(f"   ✅ Loaded {len(documents):,} documents")
-    print(f"   ✅ Loaded {len(queries):,} queries")
-
-    # Create hard negatives
-    queries_with_negatives = create_hard_negatives(queries, documents)
+    print(f"   ✅ Streaming queries from {QUERIES_FILE}")
 
-    # Remove bad pairings
+    # Create hard negatives, remove bad pairings and save, one pair at a time
+    queries_with_negatives = create_hard_negatives(iter_records(QUERIES_FILE), documents)
     final_queries = remove_bad_pairings(queries_with_negatives, documents)
 
-    # Save
     print(f"\n💾 Saving to {OUTPUT_FILE}...")
-    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-        json.dump(final_queries, f, indent=2, ensure_ascii=False)
+    label_counts = {0: 0, 1: 0}
+    with RecordWriter(OUTPUT_FILE) as writer:
+        for query in final_queries:
+            label_counts[query['label']] = label_counts.get(query['label'], 0) + 1
+            writer.write(query)
 
     # Final statistics
     sep = "="*70
@@ -328,14 +330,13 @@ def main():
     print("✅ HARD NEGATIVE CREATION COMPLETE!")
     print(sep)
     print(f"📊 Final Dataset:")
-    print(f"   - Total pairs: {len(final_queries):,}")
-    print(f"   - Positive pairs: {sum(1 for q in final_queries if q['label'] == 1):,}")
-    print(f"   - Negative pairs: {sum(1 for q in final_queries if q['label'] == 0):,}")
-
-    pos_count = sum(1 for q in final_queries if q['label'] == 1)
-    neg_count = sum(1 for q in final_queries if q['label'] == 0)
+    pos_count = label_counts[1]
+    neg_count = label_counts[0]
+    print(f"   - Total pairs: {writer.count:,}")
+    print(f"   - Positive pairs: {pos_count:,}")
+    print(f"   - Negative pairs: {neg_count:,}")
     print(f"   - Ratio: {pos_count:,} positive : {neg_count:,} negative")
-    print(f"   - Positive %: {pos_count/len(final_queries)*100:.1f}%")
+    print(f"   - Positive %: {pos_count/writer.count*100:.1f}%")
 
     print(f"\n🎯 Next steps:")
     print(f"   1. Review sample hard negatives")
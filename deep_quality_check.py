@@ -13,16 +13,17 @@ Quality Metrics:
 5. Semantic coherence (query and document are semantically aligned)
 """
 
-import json
 import re
 from typing import Dict, List, Tuple
 from collections import Counter
 from datetime import datetime
 
+from json_stream import load_records, write_records
+
 # Configuration
 INPUT_FILE = 'data/processed/queries_strong_positives_20251104_225742.json'
 DOCUMENTS_FILE = 'data/processed/FINAL_ALL_IMPROVED_documents_20251104_223630.json'
-OUTPUT_FILE = f'data/processed/queries_highest_quality_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
+OUTPUT_FILE = f'data/processed/queries_highest_quality_{datetime.now().strftime("%Y%m%d_%H%M%S")}.jsonl'
 
 # Stricter thresholds for ultra-high quality
 MIN_RELEVANCE_SCORE = 0.6  # Up from 0.5
@@ -364,12 +365,8 @@ def main():
 
     # Load data
     print("\n📂 Loading data...")
-    with open(INPUT_FILE, 'r', encoding='utf-8') as f:
-        queries = json.load(f)
-
-    with open(DOCUMENTS_FILE, 'r', encoding='utf-8') as f:
-        doc_data = json.load(f)
-        documents = doc_data['documents']
+    queries = load_records(INPUT_FILE)
+    documents = load_records(DOCUMENTS_FILE, key='documents')
 
     print(f"   ✅ Loaded {len(queries):,} query pairs")
     print(f"   ✅ Loaded {len(documents):,} documents")
@@ -382,8 +379,7 @@ def main():
 
     # Save
     print(f"\n💾 Saving ultra-high quality dataset to {OUTPUT_FILE}...")
-    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-        json.dump(final_queries, f, indent=2, ensure_ascii=False)
+    write_records(OUTPUT_FILE, final_queries)
 
     # Final summary
     sep = "="*70
@@ -0,0 +1,214 @@
+"""
+Embedding Cache - Superconductor Search
+========================================
+
+Persistent, content-addressed embedding cache shared by every script that
+encodes documents or benchmark queries (build_search_index.py, the test
+scripts), so the same texts are never encoded twice with the same model.
+
+Entries are keyed by a 16-byte BLAKE2b digest of the text, inside a
+namespace per (model fingerprint, encode settings such as max_seq_length
+truncation). A new model or setting gets a fresh namespace; nothing stale
+is ever returned.
+
+Storage (compact binary, append-only, one directory per namespace):
+    <cache_dir>/<namespace>/meta.json    model fingerprint, settings, dimension
+    <cache_dir>/<namespace>/keys.bin     16-byte digest per row
+    <cache_dir>/<namespace>/vectors.f32  float32 rows, in key order
+
+Appends take an exclusive file lock, so concurrent scripts can share one
+cache; a row only counts once its key is written (after its vector).
+
+Usage:
+    embeddings = cached_encode(model, texts, model_path, batch_size=32)
+
+Set EMBEDDING_CACHE=0 to bypass it, EMBEDDING_CACHE_DIR to move it.
+"""
+
+import hashlib
+import json
+import os
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking
+    fcntl = None
+
+# Configuration
+EMBEDDING_CACHE_DIR = '.embedding_cache'
+KEY_BYTES = 16
+
+def text_key(text: str) -> bytes:
+    """Content address of one text."""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=KEY_BYTES).digest()
+
+class EmbeddingCache:
+    """On-disk text -> embedding cache for one (model, settings) namespace."""
+
+    def __init__(self, model_fingerprint: str, settings: Dict,
+                 cache_dir: str = EMBEDDING_CACHE_DIR):
+        """
+        Args:
+            model_fingerprint: compute_model_fingerprint() of the encoder
+            settings: Everything else the embeddings depend on (truncation, normalization)
+        """
+        namespace = hashlib.sha256(
+            (model_fingerprint + json.dumps(settings, sort_keys=True)).encode('utf-8')).hexdigest()[:24]
+        self.directory = os.path.join(cache_dir, namespace)
+        self.keys_path = os.path.join(self.directory, 'keys.bin')
+        self.vectors_path = os.path.join(self.directory, 'vectors.f32')
+        self.meta_path = os.path.join(self.directory, 'meta.json')
+        self.model_fingerprint = model_fingerprint
+        self.settings = settings
+        self.dimension = None
+        self.rows = {}   # digest -> row
+        self.hits = 0
+        self.misses = 0
+
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                self.dimension = json.load(f)['dimension']
+        self._refresh()
+
+    def encode(self, model, texts: List[str],
+               encode_fn: Optional[Callable[[List[str]], np.ndarray]] = None,
+               **encode_kwargs) -> np.ndarray:
+        """
+        model.encode(texts) through the cache (only unseen texts are encoded).
+
+        Args:
+            encode_fn: Encodes the missing texts instead of model.encode
+                       (e.g. a worker pool); must match the model's output
+
+        Returns:
+            (len(texts), dim) float32 embeddings, in order
+        """
+        keys = [text_key(text) for text in texts]
+        self._refresh()
+
+        # Encode each distinct missing text once
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in self.rows and key not in missing:
+                missing[key] = text
+        self.misses += len(missing)
+        self.hits += len(texts) - len(missing)
+
+        if missing:
+            if encode_fn is not None:
+                vectors = encode_fn(list(missing.values()))
+            else:
+                vectors = model.encode(list(missing.values()), convert_to_numpy=True, **encode_kwargs)
+            self._append(list(missing), np.ascontiguousarray(vectors, dtype=np.float32))
+
+        if not texts:
+            return np.zeros((0, self.dimension or 0), dtype=np.float32)
+        stored = np.memmap(self.vectors_path, dtype=np.float32, mode='r',
+                           shape=(len(self.rows), self.dimension))
+        return np.asarray(stored[[self.rows[key] for key in keys]], dtype=np.float32)
+
+    def stats(self) -> Dict:
+        return {'entries': len(self.rows), 'hits': self.hits, 'misses': self.misses,
+                'directory': self.directory}
+
+    def _refresh(self):
+        """Pick up rows appended by other processes."""
+        if not os.path.exists(self.keys_path):
+            return
+        num_rows = os.path.getsize(self.keys_path) // KEY_BYTES
+        if num_rows <= len(self.rows):
+            return
+        with open(self.keys_path, 'rb') as f:
+            f.seek(len(self.rows) * KEY_BYTES)
+            data = f.read((num_rows - len(self.rows)) * KEY_BYTES)
+        for i in range(len(data) // KEY_BYTES):
+            self.rows.setdefault(data[i * KEY_BYTES:(i + 1) * KEY_BYTES], len(self.rows))
+
+    def _append(self, keys: List[bytes], vectors: np.ndarray):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, 'lock'), 'w') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            self._refresh()
+            if self.dimension is None:
+                self.dimension = vectors.shape[1]
+                with open(self.meta_path, 'w', encoding='utf-8') as f:
+                    json.dump({'model_fingerprint': self.model_fingerprint, 'settings': self.settings,
+                               'dimension': self.dimension}, f, indent=2)
+
+            # Another process may have added some of these meanwhile
+            new = [i for i, key in enumerate(keys) if key not in self.rows]
+            if not new:
+                return
+            start = len(self.rows)
+            # Vectors first, then keys: a row is only visible once both are on disk
+            with open(self.vectors_path, 'r+b' if os.path.exists(self.vectors_path) else 'wb') as f:
+                f.seek(start * self.dimension * 4)
+                f.write(vectors[new].tobytes())
+            with open(self.keys_path, 'ab') as f:
+                f.write(b''.join(keys[i] for i in new))
+            for offset, i in enumerate(new):
+                self.rows[keys[i]] = start + offset
+
+@lru_cache(maxsize=None)
+def _model_fingerprint(model_path: str) -> str:
+    from build_search_index import compute_model_fingerprint
+    return compute_model_fingerprint(model_path)
+
+@lru_cache(maxsize=None)
+def configured_max_seq_length(model_path: str) -> Optional[int]:
+    """max_seq_length from a sentence-transformers model directory, without loading the model."""
+    config_path = os.path.join(model_path, 'sentence_bert_config.json')
+    if not os.path.exists(config_path):
+        return None
+    with open(config_path, 'r', encoding='utf-8') as f:
+        return json.load(f).get('max_seq_length')
+
+_caches = {}
+
+def get_embedding_cache(model, model_path: str, normalize_embeddings: bool = False,
+                        cache_dir: Optional[str] = None) -> Optional[EmbeddingCache]:
+    """
+    Shared EmbeddingCache for a model (None if disabled with EMBEDDING_CACHE=0).
+
+    model may be None when only worker processes encode (its settings are
+    then read from model_path).
+    """
+    if os.environ.get('EMBEDDING_CACHE', '1') == '0':
+        return None
+    cache_dir = cache_dir or os.environ.get('EMBEDDING_CACHE_DIR', EMBEDDING_CACHE_DIR)
+    max_seq_length = (getattr(model, 'max_seq_length', None) if model is not None
+                      else configured_max_seq_length(model_path))
+    settings = {
+        'max_seq_length': max_seq_length,
+        'normalize_embeddings': normalize_embeddings,
+    }
+    key = (cache_dir, _model_fingerprint(model_path), json.dumps(settings, sort_keys=True))
+    if key not in _caches:
+        _caches[key] = EmbeddingCache(key[1], settings, cache_dir)
+    return _caches[key]
+
+def cached_encode(model, texts: List[str], model_path: str,
+                  encode_fn: Optional[Callable[[List[str]], np.ndarray]] = None,
+                  **encode_kwargs) -> np.ndarray:
+    """
+    Drop-in for model.encode(texts, convert_to_numpy=True, **encode_kwargs).
+
+    Args:
+        model_path: Directory the model was loaded from (its fingerprint keys the cache)
+        encode_fn: Encoder for cache misses (default: model.encode)
+
+    Returns:
+        (len(texts), dim) float32 embeddings
+    """
+    encode_kwargs.pop('convert_to_numpy', None)
+    cache = get_embedding_cache(model, model_path, encode_kwargs.get('normalize_embeddings', False))
+    if cache is None:
+        vectors = encode_fn(texts) if encode_fn is not None else \
+            model.encode(texts, convert_to_numpy=True, **encode_kwargs)
+        return np.asarray(vectors, dtype=np.float32)
+    return cache.encode(model, texts, encode_fn, **encode_kwargs)
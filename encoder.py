@@ -0,0 +1,73 @@
+"""
+Encoder - Superconductor Search
+================================
+
+Query encoder loading with a selectable CPU inference backend.
+
+Backends (ENCODER_BACKEND environment variable, default 'torch'):
+- torch:       SentenceTransformer in PyTorch eager mode (reference)
+- torch-int8:  PyTorch with dynamic int8 quantization of the Linear layers
+               (no export step needed)
+- onnx:        ONNX Runtime graph exported by export_onnx_encoder.py
+- onnx-int8:   ONNX Runtime graph with dynamic int8 quantization
+
+Document embeddings are always built with the reference backend; the
+faster backends are only used for queries, after export_onnx_encoder.py
+has checked that their embeddings match.
+"""
+
+import os
+from typing import Optional
+
+from sentence_transformers import SentenceTransformer
+
+# Configuration
+ENCODER_BACKENDS = ['torch', 'torch-int8', 'onnx', 'onnx-int8']
+ENCODER_BACKEND = 'torch'
+ONNX_SUBDIR = 'onnx'                    # Inside the model directory (sentence-transformers layout)
+ONNX_FILE = 'onnx/model.onnx'
+ONNX_QUANTIZATION_CONFIG = 'avx2'       # avx2 / avx512 / avx512_vnni / arm64
+ONNX_INT8_FILE = f'onnx/model_qint8_{ONNX_QUANTIZATION_CONFIG}.onnx'
+
+def resolve_backend(backend: Optional[str] = None) -> str:
+    """Backend to use: the argument, else ENCODER_BACKEND from the environment, else 'torch'."""
+    backend = backend or os.environ.get('ENCODER_BACKEND', ENCODER_BACKEND)
+    if backend not in ENCODER_BACKENDS:
+        raise ValueError(f"Unknown encoder backend '{backend}' (expected one of {ENCODER_BACKENDS})")
+    return backend
+
+def onnx_file(backend: str) -> str:
+    """ONNX graph (relative to the model directory) used by an ONNX backend."""
+    if backend == 'onnx-int8':
+        return os.environ.get('ENCODER_ONNX_INT8_FILE', ONNX_INT8_FILE)
+    return ONNX_FILE
+
+def load_encoder(model_path: str, backend: Optional[str] = None) -> SentenceTransformer:
+    """
+    Load the model for query encoding with the given backend.
+
+    Raises:
+        FileNotFoundError: ONNX backend requested but the graph was not exported
+    """
+    backend = resolve_backend(backend)
+
+    if backend in ('onnx', 'onnx-int8'):
+        file_name = onnx_file(backend)
+        if not os.path.exists(os.path.join(model_path, file_name)):
+            raise FileNotFoundError(
+                f"{os.path.join(model_path, file_name)} not found - run export_onnx_encoder.py first")
+        return SentenceTransformer(model_path, device='cpu', backend='onnx',
+                                   model_kwargs={'file_name': file_name,
+                                                 'provider': 'CPUExecutionProvider'})
+
+    if backend == 'torch-int8':
+        import torch
+
+        model = SentenceTransformer(model_path, device='cpu')
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    return SentenceTransformer(model_path)
+
+def encoder_version(model_fingerprint: str, backend: Optional[str] = None) -> str:
+    """Cache version tag: query embeddings differ (slightly) between backends."""
+    return f"{model_fingerprint}:{resolve_backend(backend)}"
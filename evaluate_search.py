@@ -0,0 +1,324 @@
+"""
+Evaluate Search - Superconductor Search
+========================================
+
+Offline retrieval evaluation over a qrels file (query -> relevant document
+ids), for comparing models and gating deploys.
+
+Qrels are derived from the training pairs (every positive pair is a
+relevant document for its query). Each query is scored against every
+document: one matrix multiply against the index's passage embeddings,
+folded into document scores (max over passages, as the dense search does),
+in blocks of queries. Metrics are computed for all queries at once with
+NumPy.
+
+Features:
+- MRR@k, nDCG@k (binary gains) and Recall@k, overall and per source of
+  the relevant documents
+- Document embeddings come from the index artifact, which is keyed by
+  model fingerprint and corpus hash (re-encoded only when either changes,
+  through the shared embedding cache); query embeddings use the same cache
+- --mode evaluates a served ranking (hnsw / quantized / hybrid, ...)
+  through the search engine instead of the exact matrix
+- --min-mrr / --min-ndcg / --min-recall: exit code 1 below a threshold
+
+Usage:
+    python evaluate_search.py                                  # Qrels from EVAL_PAIR_FILES
+    python evaluate_search.py --pairs data/processed/queries_final_clean.jsonl --write-qrels eval/qrels.jsonl
+    python evaluate_search.py --qrels eval/qrels.jsonl --k 10 --min-ndcg 0.45
+    python evaluate_search.py --mode hybrid                    # Served ranking instead of exact
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import faiss
+
+from embedding_cache import cached_encode
+from json_stream import iter_records, resolve_records_path, write_records
+from search_engine import (
+    DOCUMENTS_FILE,
+    INDEX_DIR,
+    MODEL_PATH,
+    SearchBundle,
+    load_search_engine,
+    search_modes,
+)
+
+# Configuration
+EVAL_PAIR_FILES = [
+    'training/targeted_wiki_pairs_v7.json',
+    'training/training_dataset_v7.json',
+]
+EVAL_K = 10
+EVAL_OUTPUT = 'search_eval.json'
+EVAL_BATCH_SIZE = 64         # Query encode batch size
+
+# ============================================================================
+# QRELS
+# ============================================================================
+
+def pair_fields(pair: Dict) -> Tuple[Optional[str], Optional[str]]:
+    """(query, relevant doc id) of a positive training pair, (None, None) otherwise."""
+    query = pair.get('query') or pair.get('query_text')
+    doc_id = pair.get('positive_document_id') or pair.get('positive_id')
+    if doc_id is None and pair.get('label', 1) == 1:
+        doc_id = pair.get('doc_id')
+    return (query.strip(), str(doc_id)) if query and query.strip() and doc_id else (None, None)
+
+def qrels_from_pairs(pair_files: List[str]) -> Dict[str, List[str]]:
+    """
+    Qrels from training pair files (JSON or JSON Lines, streamed).
+
+    Understands the pair formats of the pipeline: {query, positive_document_id},
+    {query, positive_id} and {query_text, doc_id, label}.
+
+    Returns:
+        {query: [relevant doc ids]}, in first-seen order
+    """
+    qrels = {}
+    for path in pair_files:
+        if not os.path.exists(resolve_records_path(path)):
+            print(f"   ⚠️  Skipping missing pair file: {path}")
+            continue
+        count = 0
+        for pair in iter_records(path):
+            query, doc_id = pair_fields(pair)
+            if query is None:
+                continue
+            relevant = qrels.setdefault(query, [])
+            if doc_id not in relevant:
+                relevant.append(doc_id)
+            count += 1
+        print(f"   ✅ {count:,} positive pairs from {path}")
+    return qrels
+
+def load_qrels(path: str) -> Dict[str, List[str]]:
+    """Qrels file: one {"query": ..., "relevant": [doc ids]} record per query."""
+    return {record['query']: [str(doc_id) for doc_id in record['relevant']]
+            for record in iter_records(path)}
+
+def save_qrels(path: str, qrels: Dict[str, List[str]]):
+    count = write_records(path, ({'query': query, 'relevant': relevant} for query, relevant in qrels.items()))
+    print(f"💾 Qrels saved: {path} ({count:,} queries)")
+
+# ============================================================================
+# METRICS
+# ============================================================================
+
+def hit_matrix(ranked: np.ndarray, qrel_queries: np.ndarray, qrel_docs: np.ndarray,
+               num_docs: int, k: int) -> np.ndarray:
+    """
+    Boolean (num_queries, k) matrix: is the document at each rank relevant?
+
+    Args:
+        ranked: (num_queries, <= k) document indices, best first (-1 = empty slot)
+        qrel_queries / qrel_docs: Parallel arrays of relevant (query row, doc index)
+    """
+    hits = np.zeros((len(ranked), k), dtype=bool)
+    if ranked.size:
+        keys = np.sort(qrel_queries.astype(np.int64) * num_docs + qrel_docs)
+        ranked_keys = np.arange(len(ranked), dtype=np.int64)[:, None] * num_docs + ranked
+        hits[:, :ranked.shape[1]] = np.isin(ranked_keys, keys) & (ranked >= 0)
+    return hits
+
+def ranking_metrics(hits: np.ndarray, num_relevant: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Per-query MRR@k, nDCG@k and Recall@k from a (num_queries, k) hit matrix.
+
+    Args:
+        num_relevant: (num_queries,) relevant documents per query (>= 1)
+    """
+    k = hits.shape[1]
+    discounts = 1.0 / np.log2(np.arange(2, k + 2))
+    first_hit = hits.argmax(axis=1)
+    ideal = np.cumsum(discounts)[np.minimum(num_relevant, k) - 1]
+    return {
+        'mrr': np.where(hits.any(axis=1), 1.0 / (first_hit + 1), 0.0),
+        'ndcg': (hits * discounts).sum(axis=1) / ideal,
+        'recall': hits.sum(axis=1) / num_relevant,
+    }
+
+def summarize(metrics: Dict[str, np.ndarray], rows: Optional[np.ndarray] = None) -> Dict:
+    """Mean of each metric (over the given query rows)."""
+    summary = {name: round(float(values[rows].mean() if rows is not None else values.mean()), 4)
+               for name, values in metrics.items()}
+    summary['queries'] = int(len(rows) if rows is not None else len(next(iter(metrics.values()))))
+    return summary
+
+# ============================================================================
+# EVALUATION
+# ============================================================================
+
+def encode_queries(engine: SearchBundle, queries: List[str]) -> np.ndarray:
+    """L2-normalized query embeddings (through the on-disk cache for the torch encoder)."""
+    if engine.encoder_backend == 'torch':
+        embeddings = cached_encode(engine.model, queries, engine.model_path, batch_size=EVAL_BATCH_SIZE)
+        faiss.normalize_L2(embeddings)
+        return embeddings
+    return engine.query_embedding_cache.encode_many(engine.model, queries)
+
+def exact_rankings(engine: SearchBundle, query_embeddings: np.ndarray, k: int) -> np.ndarray:
+    """Top-k document indices from the full query x document score matrix (scanned in query blocks)."""
+    if not len(query_embeddings):
+        return np.zeros((0, 0), dtype=np.int64)
+    return engine.exact_search(query_embeddings, k)[0]
+
+def served_rankings(engine: SearchBundle, queries: List[str], k: int, mode: str) -> np.ndarray:
+    """Top-k document indices as served by a search mode (one search batch)."""
+    ranked = np.full((len(queries), k), -1, dtype=np.int64)
+    if queries:
+        for row, (indices, _, _) in enumerate(engine.search_batch([(q, k, mode, None) for q in queries])):
+            ranked[row, :len(indices)] = indices
+    return ranked
+
+def evaluate(engine: SearchBundle, qrels: Dict[str, List[str]], k: int = EVAL_K,
+             mode: str = 'exact') -> Dict:
+    """
+    Evaluate a loaded engine on qrels.
+
+    Args:
+        mode: 'exact' (full score matrix) or a search mode served by the engine
+
+    Returns:
+        JSON-ready report: overall and per-source metrics, timings, skipped queries
+    """
+    # Map relevant ids to document rows (queries with none in the index are skipped)
+    doc_row, doc_source = {}, []
+    for row, doc in enumerate(engine.doc_store):
+        doc_row.setdefault(str(doc['id']), row)
+        doc_source.append(doc['source'] or 'unknown')
+    queries, qrel_queries, qrel_docs, first_relevant = [], [], [], []
+    missing_docs = 0
+    for query, relevant in qrels.items():
+        rows = [doc_row[doc_id] for doc_id in relevant if doc_id in doc_row]
+        missing_docs += len(relevant) - len(rows)
+        if not rows:
+            continue
+        qrel_queries.extend([len(queries)] * len(rows))
+        qrel_docs.extend(rows)
+        first_relevant.append(rows[0])
+        queries.append(query)
+    qrel_queries = np.asarray(qrel_queries, dtype=np.int64)
+    qrel_docs = np.asarray(qrel_docs, dtype=np.int64)
+    num_relevant = np.bincount(qrel_queries, minlength=len(queries))
+
+    print(f"\n📊 Evaluating {len(queries):,} queries @ {k} (mode: {mode})")
+    if len(queries) < len(qrels):
+        print(f"   ⚠️  {len(qrels) - len(queries):,} queries skipped "
+              f"(none of their documents are indexed; {missing_docs:,} unknown ids)")
+    if not queries:
+        raise ValueError("No qrels query has a relevant document in the index")
+
+    start = time.perf_counter()
+    if mode == 'exact':
+        query_embeddings = encode_queries(engine, queries)
+        encode_seconds = time.perf_counter() - start
+        ranked = exact_rankings(engine, query_embeddings, k)
+    else:
+        encode_seconds = None
+        ranked = served_rankings(engine, queries, k, mode)
+    search_seconds = time.perf_counter() - start - (encode_seconds or 0.0)
+
+    hits = hit_matrix(ranked, qrel_queries, qrel_docs, len(engine.doc_store), k)
+    metrics = ranking_metrics(hits, num_relevant)
+
+    # Per source of each query's (first) relevant document
+    sources = np.array([doc_source[row] for row in first_relevant])
+    by_source = {source: summarize(metrics, np.flatnonzero(sources == source))
+                 for source in sorted(set(sources.tolist()))}
+
+    return {
+        'created_at': datetime.now().isoformat(),
+        'model_path': engine.model_path,
+        'model_fingerprint': engine.index_info['model_fingerprint'],
+        'corpus_hash': engine.index_info['corpus_hash'],
+        'index_type': engine.index_info['index_type'],
+        'encoder_backend': engine.encoder_backend,
+        'mode': mode,
+        'k': k,
+        'overall': summarize(metrics),
+        'by_source': by_source,
+        'skipped_queries': len(qrels) - len(queries),
+        'encode_seconds': round(encode_seconds, 3) if encode_seconds is not None else None,
+        'search_seconds': round(search_seconds, 3),
+    }
+
+def print_report(report: Dict):
+    k = report['k']
+    print(f"\n{'=' * 70}")
+    print(f"📈 RETRIEVAL QUALITY @ {k} ({report['mode']}, {report['index_type']} index)")
+    print('=' * 70)
+    print(f"{'':<22} {'queries':>8} {'MRR':>8} {'nDCG':>8} {'Recall':>8}")
+    rows = [('OVERALL', report['overall'])] + list(report['by_source'].items())
+    for name, summary in rows:
+        print(f"{name:<22} {summary['queries']:>8,} {summary['mrr']:>8.4f} "
+              f"{summary['ndcg']:>8.4f} {summary['recall']:>8.4f}")
+    timing = f"search: {report['search_seconds']:.2f}s"
+    if report['encode_seconds'] is not None:
+        timing = f"encode: {report['encode_seconds']:.2f}s, " + timing
+    print(f"\n⏱️  {timing}")
+
+def check_thresholds(report: Dict, thresholds: Dict[str, Optional[float]]) -> bool:
+    """Print and return whether every given minimum is met by the overall metrics."""
+    passed = True
+    for name, minimum in thresholds.items():
+        if minimum is None:
+            continue
+        value = report['overall'][name]
+        ok = value >= minimum
+        passed &= ok
+        print(f"{'✅' if ok else '❌'} {name}@{report['k']}: {value:.4f} (minimum: {minimum})")
+    return passed
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline retrieval evaluation (MRR / nDCG / Recall @ k)')
+    parser.add_argument('--model', default=MODEL_PATH, help=f'Model directory (default: {MODEL_PATH})')
+    parser.add_argument('--index', default=INDEX_DIR, help=f'Index artifact directory (default: {INDEX_DIR})')
+    parser.add_argument('--documents', default=DOCUMENTS_FILE,
+                        help=f'Corpus the index is built from (default: {DOCUMENTS_FILE})')
+    parser.add_argument('--qrels', help='Qrels file (JSON Lines: {"query", "relevant"})')
+    parser.add_argument('--pairs', nargs='+', default=EVAL_PAIR_FILES,
+                        help='Training pair files to derive qrels from (when --qrels is not given)')
+    parser.add_argument('--write-qrels', help='Save the derived qrels to this file')
+    parser.add_argument('--k', type=int, default=EVAL_K, help=f'Cutoff (default: {EVAL_K})')
+    parser.add_argument('--mode', default='exact',
+                        help=f"'exact' (full score matrix) or a served mode: {search_modes()}")
+    parser.add_argument('--output', default=EVAL_OUTPUT, help=f'JSON report (default: {EVAL_OUTPUT})')
+    parser.add_argument('--min-mrr', type=float, help='Fail (exit 1) below this MRR@k')
+    parser.add_argument('--min-ndcg', type=float, help='Fail (exit 1) below this nDCG@k')
+    parser.add_argument('--min-recall', type=float, help='Fail (exit 1) below this Recall@k')
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("🎯 SEARCH EVALUATION")
+    print("=" * 70)
+
+    if args.qrels:
+        qrels = load_qrels(args.qrels)
+        print(f"\n📂 Loaded qrels: {args.qrels} ({len(qrels):,} queries)")
+    else:
+        print("\n📂 Deriving qrels from training pairs...")
+        qrels = qrels_from_pairs(args.pairs)
+    if args.write_qrels:
+        save_qrels(args.write_qrels, qrels)
+
+    engine = load_search_engine(args.model, args.index, args.documents)
+    report = evaluate(engine, qrels, args.k, args.mode)
+    print_report(report)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Report saved: {args.output}")
+
+    if not check_thresholds(report, {'mrr': args.min_mrr, 'ndcg': args.min_ndcg, 'recall': args.min_recall}):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
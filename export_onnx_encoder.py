@@ -0,0 +1,222 @@
+"""
+Export ONNX Encoder - Superconductor Search
+============================================
+
+Exports the search model to ONNX for CPU query encoding and checks that
+the exported encoders still produce the same embeddings and rankings.
+
+Features:
+- Exports models/superconductor-search-v7 to onnx/model.onnx
+- Adds a dynamically int8-quantized graph (onnx/model_qint8_<config>.onnx)
+- Parity check of each backend against the PyTorch model on the benchmark
+  queries: cosine similarity of query embeddings, recall@k of the search
+  results against the current index, and single-query encode latency
+- Writes the report to encoder_parity.json; exits non-zero if a backend
+  falls below the parity thresholds
+
+Only the onnx/ directory is added to the model directory, so the model
+fingerprint (and therefore the saved search index) stays valid.
+
+Usage:
+    python export_onnx_encoder.py                           # Export + parity check
+    python export_onnx_encoder.py --quantization avx512_vnni
+    python export_onnx_encoder.py --check-only              # Re-run the parity check
+    python export_onnx_encoder.py --check-only --index idx_v8 --documents data/corpus_v8.jsonl
+
+Then start the app with ENCODER_BACKEND=onnx-int8 (or onnx / torch-int8).
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List
+
+import numpy as np
+import faiss
+from sentence_transformers import SentenceTransformer
+
+from build_search_index import (
+    BENCHMARK_K,
+    DOCUMENTS_FILE,
+    INDEX_OUTPUT,
+    MODEL_PATH,
+    compute_corpus_hash,
+    compute_model_fingerprint,
+    exact_top_k,
+    load_benchmark_queries,
+    load_index_artifact,
+    recall_at_k,
+)
+from encoder import ENCODER_BACKENDS, ONNX_QUANTIZATION_CONFIG, ONNX_SUBDIR, load_encoder
+
+# Configuration
+PARITY_OUTPUT = 'encoder_parity.json'
+PARITY_MIN_COSINE = 0.98       # Worst query embedding cosine vs PyTorch
+PARITY_MIN_RECALL = 0.90       # Mean recall@k of search results vs PyTorch
+LATENCY_QUERIES = 200          # Queries timed one at a time
+
+def export_onnx(model_path: str = MODEL_PATH,
+                quantization_config: str = ONNX_QUANTIZATION_CONFIG):
+    """Export model.onnx and the int8 graph into <model_path>/onnx/."""
+    from sentence_transformers import export_dynamic_quantized_onnx_model
+
+    print("\n📦 Exporting ONNX Encoder...")
+    print(f"   Model: {model_path}")
+
+    # Export into a scratch copy, then move only onnx/ into the model directory
+    # (save_pretrained would rewrite the config files and change the fingerprint)
+    with tempfile.TemporaryDirectory() as tmp:
+        model = SentenceTransformer(model_path, device='cpu', backend='onnx')
+        model.save_pretrained(tmp)
+        print(f"   ✅ Exported {ONNX_SUBDIR}/model.onnx")
+
+        export_dynamic_quantized_onnx_model(model, quantization_config, tmp)
+        print(f"   ✅ Quantized {ONNX_SUBDIR}/model_qint8_{quantization_config}.onnx (dynamic int8)")
+
+        target = os.path.join(model_path, ONNX_SUBDIR)
+        os.makedirs(target, exist_ok=True)
+        for name in os.listdir(os.path.join(tmp, ONNX_SUBDIR)):
+            shutil.copy2(os.path.join(tmp, ONNX_SUBDIR, name), os.path.join(target, name))
+
+    print(f"✅ ONNX graphs saved: {target}/")
+
+def encode(model: SentenceTransformer, queries: List[str]) -> np.ndarray:
+    """Normalized float32 query embeddings."""
+    embeddings = np.ascontiguousarray(model.encode(queries, convert_to_numpy=True), dtype=np.float32)
+    faiss.normalize_L2(embeddings)
+    return embeddings
+
+def encode_latency_ms(model: SentenceTransformer, queries: List[str]) -> Dict:
+    """Single-query encode latency (the app's cache-miss path), in milliseconds."""
+    model.encode(queries[:1])  # Warm up
+    latencies = []
+    for query in queries[:LATENCY_QUERIES]:
+        start = time.perf_counter()
+        model.encode([query], convert_to_numpy=True)
+        latencies.append((time.perf_counter() - start) * 1000)
+    p50, p95 = np.percentile(latencies, [50, 95])
+    return {'p50': float(p50), 'p95': float(p95), 'mean': float(np.mean(latencies))}
+
+def parity_check(model_path: str = MODEL_PATH, index_dir: str = INDEX_OUTPUT,
+                 backends: List[str] = None, k: int = BENCHMARK_K,
+                 documents_file: str = DOCUMENTS_FILE) -> Dict:
+    """
+    Compare each backend with the PyTorch reference.
+
+    Args:
+        documents_file: Corpus the index in index_dir was built from
+
+    Returns:
+        Report dict with per-backend cosine, recall@k, latency and pass flag
+    """
+    print("\n🔬 Encoder Parity Check...")
+    queries = load_benchmark_queries()
+    print(f"   Queries: {len(queries):,}")
+
+    reference_model = load_encoder(model_path, 'torch')
+    reference = encode(reference_model, queries)
+    reference_latency = encode_latency_ms(reference_model, queries)
+
+    # Rankings are compared on the current index (if it matches this model)
+    artifact = load_index_artifact(index_dir, compute_model_fingerprint(model_path),
+                                   compute_corpus_hash(documents_file))
+    if artifact is not None:
+        embeddings = np.ascontiguousarray(artifact['embeddings'], dtype=np.float32)
+        k = min(k, embeddings.shape[0])
+        reference_ids = exact_top_k(embeddings, reference, k)
+    else:
+        print(f"   ⚠️  No current index in {index_dir}/ - skipping recall@{k}")
+
+    results = {}
+    for backend in backends or [b for b in ENCODER_BACKENDS if b != 'torch']:
+        try:
+            model = load_encoder(model_path, backend)
+        except FileNotFoundError as e:
+            print(f"   ⚠️  {backend}: {e}")
+            continue
+
+        candidate = encode(model, queries)
+        cosine = np.sum(reference * candidate, axis=1)
+        result = {
+            'cosine_min': float(cosine.min()),
+            'cosine_mean': float(cosine.mean()),
+            'latency_ms': encode_latency_ms(model, queries),
+        }
+        result['speedup_p50'] = reference_latency['p50'] / result['latency_ms']['p50']
+        if artifact is not None:
+            result[f'recall@{k}'] = recall_at_k(exact_top_k(embeddings, candidate, k), reference_ids)
+        result['passed'] = (result['cosine_min'] >= PARITY_MIN_COSINE
+                            and result.get(f'recall@{k}', 1.0) >= PARITY_MIN_RECALL)
+        results[backend] = result
+
+    return {
+        'created_at': datetime.now().isoformat(),
+        'model_path': model_path,
+        'documents_file': documents_file,
+        'num_queries': len(queries),
+        'k': k,
+        'thresholds': {'cosine_min': PARITY_MIN_COSINE, 'recall': PARITY_MIN_RECALL},
+        'torch_latency_ms': reference_latency,
+        'backends': results,
+    }
+
+def print_parity_report(report: Dict):
+    """Print the parity check as a table."""
+    k = report['k']
+    print("\n" + "=" * 78)
+    print(f"📊 ENCODER PARITY vs torch ({report['num_queries']:,} queries)")
+    print("=" * 78)
+    print(f"\n{'Backend':12s} {'cos min':>8s} {'cos mean':>9s} {f'R@{k}':>7s} {'p50 ms':>8s} "
+          f"{'p95 ms':>8s} {'speedup':>8s}  Status")
+    print("─" * 78)
+    torch_latency = report['torch_latency_ms']
+    print(f"{'torch':12s} {1:8.4f} {1:9.4f} {'-':>7s} {torch_latency['p50']:8.2f} "
+          f"{torch_latency['p95']:8.2f} {1:7.2f}x  reference")
+    for backend, r in report['backends'].items():
+        recall = f"{r[f'recall@{k}']:7.3f}" if f'recall@{k}' in r else f"{'-':>7s}"
+        status = '✅ pass' if r['passed'] else '❌ FAIL'
+        print(f"{backend:12s} {r['cosine_min']:8.4f} {r['cosine_mean']:9.4f} {recall} "
+              f"{r['latency_ms']['p50']:8.2f} {r['latency_ms']['p95']:8.2f} {r['speedup_p50']:7.2f}x  {status}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Export the ONNX query encoder and check parity')
+    parser.add_argument('--model', default=MODEL_PATH, help='Model directory')
+    parser.add_argument('--index', default=INDEX_OUTPUT, help='Index directory used for recall@k')
+    parser.add_argument('--documents', default=DOCUMENTS_FILE,
+                        help=f'Corpus the index is built from (default: {DOCUMENTS_FILE})')
+    parser.add_argument('--quantization', default=ONNX_QUANTIZATION_CONFIG,
+                        choices=['avx2', 'avx512', 'avx512_vnni', 'arm64'],
+                        help=f'int8 quantization target (default: {ONNX_QUANTIZATION_CONFIG})')
+    parser.add_argument('--check-only', action='store_true', help='Skip the export')
+    parser.add_argument('--backend', action='append', choices=ENCODER_BACKENDS[1:],
+                        help='Backend(s) to check (default: all)')
+    parser.add_argument('--output', default=PARITY_OUTPUT, help='Parity report JSON')
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("⚡ EXPORT ONNX ENCODER - SUPERCONDUCTOR SEARCH V7")
+    print("=" * 70)
+
+    if not args.check_only:
+        export_onnx(args.model, args.quantization)
+    if args.quantization != ONNX_QUANTIZATION_CONFIG:
+        os.environ.setdefault('ENCODER_ONNX_INT8_FILE', f'{ONNX_SUBDIR}/model_qint8_{args.quantization}.onnx')
+
+    report = parity_check(args.model, args.index, args.backend, documents_file=args.documents)
+    print_parity_report(report)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Parity report saved: {args.output}")
+
+    if not all(r['passed'] for r in report['backends'].values()):
+        print("\n❌ Some backends do not match the PyTorch encoder - do not deploy them")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
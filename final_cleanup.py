@@ -6,14 +6,17 @@ Quick fixes:
 1. Remove 1,700 duplicate pairs
 2. Remove off-topic content (904 pairs with 'magnet' but not 'superconductor')
 3. Keep data as-is otherwise (query diversity is expected for generic queries)
+
+Pairs are streamed from INPUT_FILE to OUTPUT_FILE in a single pass.
 """
 
-import json
 from datetime import datetime
 from collections import Counter
 
+from json_stream import RecordWriter, iter_records
+
 INPUT_FILE = 'data/processed/queries_highest_quality_20251104_230133.json'
-OUTPUT_FILE = f'data/processed/queries_final_clean_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
+OUTPUT_FILE = f'data/processed/queries_final_clean_{datetime.now().strftime("%Y%m%d_%H%M%S")}.jsonl'
 
 def is_off_topic(query_text: str, doc_text: str) -> bool:
     """
@@ -59,83 +62,73 @@ def main():
     print("🧹 Final Dataset Cleanup")
     print("="*70)
 
-    # Load data
-    print("\n📂 Loading data...")
-    with open(INPUT_FILE, 'r') as f:
-        queries = json.load(f)
-
-    print(f"   ✅ Loaded {len(queries):,} pairs")
-
-    original_positive = sum(1 for q in queries if q['label'] == 1)
-    original_negative = sum(1 for q in queries if q['label'] == 0)
-
-    # 1. Remove duplicates
-    print("\n1️⃣ Removing duplicate pairs...")
+    # Dedupe and drop off-topic pairs while streaming them to OUTPUT_FILE
+    print(f"\n📂 Streaming pairs from {INPUT_FILE}...")
+    print(f"💾 Saving cleaned dataset to {OUTPUT_FILE}...")
     seen = set()
-    deduplicated = []
+    total = 0
+    original_positive = original_negative = 0
+    final_positive = final_negative = 0
     duplicates_removed = 0
+    off_topic_removed = 0
+    off_topic_examples = []
 
-    for q in queries:
-        pair_id = (q['query_text'], q['doc_id'], q['label'])
-        if pair_id not in seen:
+    with RecordWriter(OUTPUT_FILE) as writer:
+        for q in iter_records(INPUT_FILE):
+            total += 1
+            original_positive += q['label'] == 1
+            original_negative += q['label'] == 0
+
+            # 1. Remove duplicates
+            pair_id = (q['query_text'], q['doc_id'], q['label'])
+            if pair_id in seen:
+                duplicates_removed += 1
+                continue
             seen.add(pair_id)
-            deduplicated.append(q)
-        else:
-            duplicates_removed += 1
-
-    print(f"   ❌ Removed {duplicates_removed:,} duplicate pairs")
-    print(f"   ✅ Kept {len(deduplicated):,} unique pairs")
 
-    # 2. Remove off-topic content
-    print("\n2️⃣ Removing off-topic content...")
-    cleaned = []
-    off_topic_removed = 0
-    off_topic_examples = []
+            # 2. Remove off-topic content
+            query_text = q['query_text']
+            doc_text = q.get('doc_text', '')
+            if is_off_topic(query_text, doc_text):
+                off_topic_removed += 1
+                if len(off_topic_examples) < 10:
+                    off_topic_examples.append((query_text, q['doc_id']))
+                continue
 
-    for q in deduplicated:
-        query_text = q['query_text']
-        doc_text = q.get('doc_text', '')
+            final_positive += q['label'] == 1
+            final_negative += q['label'] == 0
+            writer.write(q)
 
-        if is_off_topic(query_text, doc_text):
-            off_topic_removed += 1
-            if len(off_topic_examples) < 10:
-                off_topic_examples.append((query_text, q['doc_id']))
-        else:
-            cleaned.append(q)
+    print(f"\n1️⃣ Removing duplicate pairs...")
+    print(f"   ❌ Removed {duplicates_removed:,} duplicate pairs")
+    print(f"   ✅ Kept {total - duplicates_removed:,} unique pairs")
 
+    print("\n2️⃣ Removing off-topic content...")
     print(f"   ❌ Removed {off_topic_removed:,} off-topic pairs")
-    print(f"   ✅ Kept {len(cleaned):,} on-topic pairs")
+    print(f"   ✅ Kept {writer.count:,} on-topic pairs")
 
     if off_topic_examples:
         print(f"\n   Sample removed off-topic pairs:")
         for query, doc_id in off_topic_examples[:5]:
             print(f"      - \"{query[:50]}\" → {doc_id}")
 
-    # Save
-    print(f"\n💾 Saving cleaned dataset to {OUTPUT_FILE}...")
-    with open(OUTPUT_FILE, 'w') as f:
-        json.dump(cleaned, f, indent=2, ensure_ascii=False)
-
     # Final stats
-    final_positive = sum(1 for q in cleaned if q['label'] == 1)
-    final_negative = sum(1 for q in cleaned if q['label'] == 0)
-
     sep = "="*70
     print(f"\n{sep}")
     print("✅ FINAL CLEANUP COMPLETE!")
     print(sep)
     print(f"📊 Before Cleanup:")
-    print(f"   Total: {len(queries):,}")
+    print(f"   Total: {total:,}")
     print(f"   Positive: {original_positive:,}")
     print(f"   Negative: {original_negative:,}")
     print(f"\n📊 After Cleanup:")
-    print(f"   Total: {len(cleaned):,}")
+    print(f"   Total: {writer.count:,}")
     print(f"   Positive: {final_positive:,}")
     print(f"   Negative: {final_negative:,}")
     print(f"\n📉 Removed:")
     print(f"   Duplicates: {duplicates_removed:,}")
     print(f"   Off-topic: {off_topic_removed:,}")
-    print(f"   Total removed: {len(queries) - len(cleaned):,}")
+    print(f"   Total removed: {total - writer.count:,}")
     print(f"\n✨ Dataset is now CLEAN and ready for training!")
     print(f"{sep}\n")
 
@@ -9,18 +9,23 @@ Criteria for STRONG positive pairing:
 1. Material-specific query → Document must be PRIMARILY about that material
 2. Keyword query → Keyword must appear multiple times OR be in title
 3. Topic query → Topic must be a main focus, not just mentioned
+
+Query pairs are streamed from INPUT_FILE to OUTPUT_FILE one at a time;
+only the documents and the (query, doc id) keys of positive pairs are
+kept in memory.
 """
 
-import json
 import re
-from typing import Dict, List, Set
+from typing import Dict, Iterable, Iterator, List, Optional, Set
 from datetime import datetime
 from collections import Counter
 
+from json_stream import RecordWriter, iter_records, load_records
+
 # Configuration
 INPUT_FILE = 'data/processed/queries_with_hard_negatives_20251104_224640.json'
 DOCUMENTS_FILE = 'data/processed/FINAL_ALL_IMPROVED_documents_20251104_223630.json'
-OUTPUT_FILE = f'data/processed/queries_strong_positives_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
+OUTPUT_FILE = f'data/processed/queries_strong_positives_{datetime.now().strftime("%Y%m%d_%H%M%S")}.jsonl'
 
 def count_keyword_occurrences(text: str, keyword: str) -> int:
     """Count how many times a keyword appears in text."""
@@ -220,10 +225,19 @@ def calculate_relevance_score(query: str, doc: Dict) -> float:
 
     return score
 
-def filter_weak_positive_pairings(queries: List[Dict], documents: List[Dict]) -> List[Dict]:
+def filter_weak_positive_pairings(queries: Iterable[Dict], documents: List[Dict],
+                                  stats: Optional[Dict] = None) -> Iterator[Dict]:
     """
     Remove weak positive pairings from dataset.
     Keep only STRONG positive matches.
+
+    Args:
+        stats: Filled in once the queries are exhausted: 'positives' and
+               'negatives' before filtering, 'kept_positives' and 'removed'
+               (set of (query_text, doc_id) of removed positive pairs)
+
+    Yields:
+        The pairs that are kept, in order
     """
     print("="*70)
     print("🔍 Filtering Weak Positive Pairings")
@@ -232,21 +246,27 @@ def filter_weak_positive_pairings(queries: List[Dict], documents: List[Dict]) ->
     # Create document lookup
     doc_lookup = {doc['id']: doc for doc in documents}
 
-    filtered_queries = []
     weak_pairings_removed = 0
     relevance_stats = []
+    before_pos = set()
+    after_pos = set()
+    positives = 0
+    negatives = 0
 
     print("\n1️⃣ Analyzing positive pairs...")
 
     for query in queries:
         # Keep all negative pairs as-is
         if query['label'] == 0:
-            filtered_queries.append(query)
+            negatives += 1
+            yield query
             continue
 
         # For positive pairs, check relevance
         doc_id = query['doc_id']
         doc = doc_lookup.get(doc_id)
+        positives += 1
+        before_pos.add((query['query_text'], doc_id))
 
         if not doc:
             weak_pairings_removed += 1
@@ -260,15 +280,16 @@ def filter_weak_positive_pairings(queries: List[Dict], documents: List[Dict]) ->
 
         # STRICT THRESHOLD: Only keep if relevance >= 0.5
         if relevance_score >= 0.5:
-            filtered_queries.append(query)
+            after_pos.add((query_text, doc_id))
+            yield query
         else:
             weak_pairings_removed += 1
 
     # Statistics
     print(f"\n✅ Filtering complete:")
     print(f"   - Weak positive pairings removed: {weak_pairings_removed:,}")
-    print(f"   - Strong positive pairings kept: {sum(1 for q in filtered_queries if q['label'] == 1):,}")
-    print(f"   - Negative pairings kept: {sum(1 for q in filtered_queries if q['label'] == 0):,}")
+    print(f"   - Strong positive pairings kept: {positives - weak_pairings_removed:,}")
+    print(f"   - Negative pairings kept: {negatives:,}")
 
     if relevance_stats:
         avg_relevance = sum(relevance_stats) / len(relevance_stats)
@@ -280,18 +301,18 @@ def filter_weak_positive_pairings(queries: List[Dict], documents: List[Dict]) ->
         print(f"   - 0.7-0.9 (strong): {sum(1 for s in relevance_stats if 0.7 <= s < 0.9):,}")
         print(f"   - >= 0.9 (very strong): {sum(1 for s in relevance_stats if s >= 0.9):,}")
 
-    return filtered_queries
+    if stats is not None:
+        stats.update({
+            'positives': positives,
+            'negatives': negatives,
+            'kept_positives': positives - weak_pairings_removed,
+            'removed': before_pos - after_pos,
+        })
 
-def show_sample_removed_pairs(queries_before: List[Dict], queries_after: List[Dict],
-                              documents: List[Dict], num_samples: int = 5):
-    """Show examples of removed weak pairings."""
+def show_sample_removed_pairs(removed: Set, documents: List[Dict], num_samples: int = 5):
+    """Show examples of removed weak pairings ((query_text, doc_id) keys)."""
     doc_lookup = {doc['id']: doc for doc in documents}
 
-    # Find removed positive pairs
-    before_pos = {(q['query_text'], q['doc_id']) for q in queries_before if q['label'] == 1}
-    after_pos = {(q['query_text'], q['doc_id']) for q in queries_after if q['label'] == 1}
-    removed = before_pos - after_pos
-
     print("\n2️⃣ Sample removed weak pairings:")
     print("="*70)
 
@@ -320,48 +341,38 @@ def main():
 
     # Load data
     print("\n📂 Loading data...")
-    with open(INPUT_FILE, 'r', encoding='utf-8') as f:
-        queries = json.load(f)
-
-    with open(DOCUMENTS_FILE, 'r', encoding='utf-8') as f:
-        doc_data = json.load(f)
-        documents = doc_data['documents']
-
-    print(f"   ✅ Loaded {len(queries):,} query pairs")
+    documents = load_records(DOCUMENTS_FILE, key='documents')
     print(f"   ✅ Loaded {len(documents):,} documents")
+    print(f"   ✅ Streaming query pairs from {INPUT_FILE}")
 
-    original_positives = sum(1 for q in queries if q['label'] == 1)
-    original_negatives = sum(1 for q in queries if q['label'] == 0)
+    # Filter weak pairings and save, one pair at a time
+    stats = {}
+    print(f"\n💾 Saving to {OUTPUT_FILE}...")
+    with RecordWriter(OUTPUT_FILE) as writer:
+        writer.write_all(filter_weak_positive_pairings(iter_records(INPUT_FILE), documents, stats))
+
+    original_positives = stats['positives']
+    final_positives = stats['kept_positives']
+    final_negatives = stats['negatives']
 
     print(f"\n📊 Original dataset:")
     print(f"   - Positive pairs: {original_positives:,}")
-    print(f"   - Negative pairs: {original_negatives:,}")
-
-    # Filter weak pairings
-    filtered_queries = filter_weak_positive_pairings(queries, documents)
+    print(f"   - Negative pairs: {stats['negatives']:,}")
 
     # Show samples
-    show_sample_removed_pairs(queries, filtered_queries, documents, num_samples=10)
-
-    # Save
-    print(f"\n💾 Saving to {OUTPUT_FILE}...")
-    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-        json.dump(filtered_queries, f, indent=2, ensure_ascii=False)
+    show_sample_removed_pairs(stats['removed'], documents, num_samples=10)
 
     # Final statistics
-    final_positives = sum(1 for q in filtered_queries if q['label'] == 1)
-    final_negatives = sum(1 for q in filtered_queries if q['label'] == 0)
-
     sep = "="*70
     print(f"\n{sep}")
     print("✅ WEAK PAIRING REMOVAL COMPLETE!")
     print(sep)
     print(f"📊 Final Dataset:")
-    print(f"   - Total pairs: {len(filtered_queries):,}")
+    print(f"   - Total pairs: {writer.count:,}")
     print(f"   - Positive pairs: {final_positives:,} (was {original_positives:,})")
     print(f"   - Negative pairs: {final_negatives:,} (unchanged)")
     print(f"   - Removed: {original_positives - final_positives:,} weak positive pairs")
-    print(f"   - Positive ratio: {final_positives/len(filtered_queries)*100:.1f}%")
+    print(f"   - Positive ratio: {final_positives/writer.count*100:.1f}%")
 
     print(f"\n🎯 Next steps:")
     print(f"   1. Review sample removed pairs above")
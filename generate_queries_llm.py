@@ -20,11 +20,13 @@ import json
 import os
 import time
 from pathlib import Path
-from typing import List, Dict
+from typing import Dict, Iterable, List
 import argparse
 from anthropic import Anthropic
 from tqdm import tqdm
 
+from json_stream import RecordWriter, iter_records, load_records
+
 # ============================================================================
 # CONFIGURATION
 # ============================================================================
@@ -34,7 +36,7 @@ class Config:
 
     # Paths
     DOCUMENTS_PATH = "data/processed/merged_all_20251103_124240.json"
-    OUTPUT_PATH = "data/processed/training_pairs_llm_generated.json"
+    OUTPUT_PATH = "data/processed/training_pairs_llm_generated.jsonl"
     OUTPUT_DIR = "data/processed"
 
     # API
@@ -254,17 +256,20 @@ def generate_all_queries(
     documents: List[Dict],
     output_path: str,
     sample_size: int = None
-) -> List[Dict]:
+) -> int:
     """
     Generate queries for all documents (or sample).
 
+    Pairs are written to output_path as they are generated. The file is
+    closed on any exit, so an interrupted run keeps the pairs so far.
+
     Args:
         documents: List of document dictionaries
-        output_path: Where to save results
+        output_path: Where to save results (JSON Lines)
         sample_size: If set, only process this many documents (for testing)
 
     Returns:
-        List of training pairs
+        Number of training pairs written
     """
 
     # Check API key
@@ -282,61 +287,59 @@ def generate_all_queries(
     print(f"💰 Estimated cost: ${len(documents) * 0.003:.2f}")
     print(f"⏱️  Estimated time: {len(documents) * 1.5 / 60:.1f} minutes\n")
 
-    training_pairs = []
     total_queries = 0
     errors = 0
 
-    # Progress bar
-    for i, doc in enumerate(tqdm(documents, desc="Generating queries")):
-
-        # Determine number of queries based on difficulty/source
-        source = doc.get('source', '')
-        difficulty = doc.get('difficulty_level', 3)
-
-        # More queries for expert/arXiv papers
-        if source == 'arxiv' or difficulty >= 4:
-            num_queries = config.QUERIES_PER_DOC_EXPERT
-        else:
-            num_queries = config.QUERIES_PER_DOC_BASIC
-
-        # Generate queries
-        queries = generate_queries_for_document(doc, client, num_queries)
-
-        if not queries:
-            errors += 1
-            continue
-
-        # Create training pairs (positive only for now)
-        doc_id = doc.get('id', f'doc_{i}')
-        doc_text = doc.get('text', doc.get('content', ''))
-        doc_difficulty = doc.get('difficulty_level', 3)
-
-        for query in queries:
-            training_pairs.append({
-                "query_text": query,
-                "query_difficulty": doc_difficulty,  # Inherit from doc
-                "doc_id": doc_id,
-                "doc_text": doc_text,
-                "doc_difficulty": doc_difficulty,
-                "label": 1,
-                "pair_type": "llm_generated_positive"
-            })
-            total_queries += 1
-
-        # Rate limiting
-        if i < len(documents) - 1:  # Don't wait after last request
-            time.sleep(config.DELAY_BETWEEN_REQUESTS)
-
-        # Save checkpoint every 50 documents
-        if (i + 1) % 50 == 0:
-            checkpoint_path = output_path.replace('.json', f'_checkpoint_{i+1}.json')
-            with open(checkpoint_path, 'w', encoding='utf-8') as f:
-                json.dump(training_pairs, f, indent=2, ensure_ascii=False)
-            print(f"\n💾 Checkpoint saved: {checkpoint_path}")
-
-    # Save final results
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(training_pairs, f, indent=2, ensure_ascii=False)
+    writer = RecordWriter(output_path)
+    try:
+        # Progress bar
+        for i, doc in enumerate(tqdm(documents, desc="Generating queries")):
+
+            # Determine number of queries based on difficulty/source
+            source = doc.get('source', '')
+            difficulty = doc.get('difficulty_level', 3)
+
+            # More queries for expert/arXiv papers
+            if source == 'arxiv' or difficulty >= 4:
+                num_queries = config.QUERIES_PER_DOC_EXPERT
+            else:
+                num_queries = config.QUERIES_PER_DOC_BASIC
+
+            # Generate queries
+            queries = generate_queries_for_document(doc, client, num_queries)
+
+            if not queries:
+                errors += 1
+                continue
+
+            # Create training pairs (positive only for now)
+            doc_id = doc.get('id', f'doc_{i}')
+            doc_text = doc.get('text', doc.get('content', ''))
+            doc_difficulty = doc.get('difficulty_level', 3)
+
+            for query in queries:
+                writer.write({
+                    "query_text": query,
+                    "query_difficulty": doc_difficulty,  # Inherit from doc
+                    "doc_id": doc_id,
+                    "doc_text": doc_text,
+                    "doc_difficulty": doc_difficulty,
+                    "label": 1,
+                    "pair_type": "llm_generated_positive"
+                })
+                total_queries += 1
+
+            # Rate limiting
+            if i < len(documents) - 1:  # Don't wait after last request
+                time.sleep(config.DELAY_BETWEEN_REQUESTS)
+
+            # Checkpoint every 50 documents
+            if (i + 1) % 50 == 0:
+                writer.flush()
+                print(f"\n💾 Checkpoint: {writer.count:,} pairs flushed")
+    finally:
+        # Keep the pairs generated so far, even if the run was interrupted
+        writer.close()
 
     # Statistics
     sep = '='*70
@@ -350,22 +353,26 @@ def generate_all_queries(
     print(f"💾 Saved to: {output_path}")
     print(f"{'='*70}\n")
 
-    return training_pairs
+    return total_queries
 
 
 # ============================================================================
 # ANALYSIS & PREVIEW
 # ============================================================================
 
-def analyze_generated_queries(training_pairs: List[Dict]):
-    """Analyze quality of generated queries"""
+def analyze_generated_queries(training_pairs: Iterable[Dict]):
+    """Analyze quality of generated queries (pairs are read in one pass)"""
 
     print("\n📊 QUERY ANALYSIS\n")
 
     # Count unique queries
-    unique_queries = set([p['query_text'] for p in training_pairs])
+    unique_queries = set()
+    total_pairs = 0
+    for pair in training_pairs:
+        unique_queries.add(pair['query_text'])
+        total_pairs += 1
     print(f"Unique queries: {len(unique_queries)}")
-    print(f"Total pairs: {len(training_pairs)}")
+    print(f"Total pairs: {total_pairs}")
 
     # Check superconductor relevance
     super_keywords = ['superconductor', 'superconduct', 'meissner', 'cooper',
@@ -409,9 +416,7 @@ def main():
 
     # Analyze mode
     if args.analyze:
-        with open(args.analyze, 'r') as f:
-            pairs = json.load(f)
-        analyze_generated_queries(pairs)
+        analyze_generated_queries(iter_records(args.analyze))
         return
 
     # Check mode
@@ -424,9 +429,7 @@ def main():
 
     # Load documents
     print(f"📂 Loading documents from {config.DOCUMENTS_PATH}")
-    with open(config.DOCUMENTS_PATH, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-        documents = data['documents'] if 'documents' in data else data
+    documents = load_records(config.DOCUMENTS_PATH, key='documents')
 
     print(f"✅ Loaded {len(documents)} documents\n")
 
@@ -438,12 +441,13 @@ def main():
     output_path = config.OUTPUT_PATH
 
     if sample_size:
-        output_path = output_path.replace('.json', f'_sample_{sample_size}.json')
+        root, extension = os.path.splitext(output_path)
+        output_path = f'{root}_sample_{sample_size}{extension}'
 
-    training_pairs = generate_all_queries(documents, output_path, sample_size)
+    generate_all_queries(documents, output_path, sample_size)
 
     # Analyze results
-    analyze_generated_queries(training_pairs)
+    analyze_generated_queries(iter_records(output_path))
 
     sep = '='*70
     print(f"\n{sep}")
@@ -0,0 +1,215 @@
+"""
+Incremental Index - Superconductor Search
+==========================================
+
+Embedding manifest that lets build_search_index.py encode only new or
+changed documents instead of the whole corpus.
+
+Every document is keyed by its id and hashed over the exact texts that
+are embedded (title + passages, so a chunking change invalidates it). The
+manifest maps each live (doc key, content hash) to its rows in an
+append-only vector file:
+
+- new or changed documents are encoded and appended
+- the old rows of changed and deleted documents become tombstones
+- unchanged documents reuse their rows
+- compaction rewrites the vector file with only the live rows, in corpus
+  order, once tombstones pass COMPACT_TOMBSTONE_RATIO (or on --compact)
+
+A different model fingerprint or chunking resets the manifest, since no
+stored vector would be valid.
+
+Files (in <index_output>/incremental/):
+    manifest.json   model fingerprint, settings, row count and
+                    doc key -> {hash, start, count} of the live documents
+    vectors.f32     float32 rows (L2-normalized), row-major, append-only
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Callable, Dict, List
+
+import numpy as np
+import faiss
+
+# Configuration
+INCREMENTAL_SUBDIR = 'incremental'
+COMPACT_TOMBSTONE_RATIO = 0.25   # Compact when this fraction of stored rows is dead
+
+def document_keys(metadata: List[Dict]) -> List[str]:
+    """Stable key per document: its id (documents without one, or repeats, get a suffix)."""
+    keys = []
+    seen = {}
+    for i, doc in enumerate(metadata):
+        key = str(doc.get('id') or f'#{i}')
+        seen[key] = seen.get(key, 0) + 1
+        keys.append(key if seen[key] == 1 else f'{key}#{seen[key]}')
+    return keys
+
+def content_hash(texts: List[str]) -> str:
+    """Hash of the texts embedded for one document."""
+    sha = hashlib.sha256()
+    for text in texts:
+        sha.update(text.encode('utf-8') + b'\0')
+    return sha.hexdigest()
+
+class EmbeddingManifest:
+    """(doc key, content hash, model fingerprint) -> vector rows, for delta encoding."""
+
+    def __init__(self, directory: str, model_fingerprint: str, settings: Dict):
+        """
+        Args:
+            directory: Manifest directory (created if missing)
+            model_fingerprint: compute_model_fingerprint() of the encoder
+            settings: Anything else the vectors depend on (chunking, truncation)
+        """
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, 'manifest.json')
+        self.vectors_path = os.path.join(directory, 'vectors.f32')
+        self.model_fingerprint = model_fingerprint
+        self.settings = settings
+        self.documents = {}
+        self.rows = 0
+        self.dimension = None
+        self.stats = {}
+
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if (manifest.get('model_fingerprint') == model_fingerprint
+                    and manifest.get('settings') == settings):
+                self.documents = manifest['documents']
+                self.rows = manifest['rows']
+                self.dimension = manifest['dimension']
+            else:
+                print("   ⚠️  Embedding manifest is for another model / chunking - re-encoding everything")
+
+    @property
+    def live_rows(self) -> int:
+        return sum(doc['count'] for doc in self.documents.values())
+
+    @property
+    def tombstones(self) -> int:
+        """Stored rows no longer referenced by any document."""
+        return self.rows - self.live_rows
+
+    def vectors(self) -> np.ndarray:
+        """Stored rows (memory-mapped, read-only)."""
+        if not self.rows:
+            return np.zeros((0, self.dimension or 0), dtype=np.float32)
+        return np.memmap(self.vectors_path, dtype=np.float32, mode='r', shape=(self.rows, self.dimension))
+
+    def update(self, keys: List[str], texts: List[List[str]],
+               encode: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """
+        Bring the manifest up to date with the corpus and return its embeddings.
+
+        Args:
+            keys: document_keys() of the corpus, in order
+            texts: Embedded texts of each document (its passages), same order
+            encode: Called once with the texts of all new / changed documents
+
+        Returns:
+            (n_passages, dim) float32 normalized embeddings in corpus order
+        """
+        hashes = [content_hash(doc_texts) for doc_texts in texts]
+        stale = [i for i, (key, h) in enumerate(zip(keys, hashes))
+                 if self.documents.get(key, {}).get('hash') != h]
+        current = set(keys)
+        deleted = [key for key in self.documents if key not in current]
+
+        self.stats = {
+            'documents': len(keys),
+            'new': sum(1 for i in stale if keys[i] not in self.documents),
+            'changed': sum(1 for i in stale if keys[i] in self.documents),
+            'deleted': len(deleted),
+            'reused': len(keys) - len(stale),
+        }
+        print(f"   Incremental: {self.stats['reused']:,} unchanged, {self.stats['new']:,} new, "
+              f"{self.stats['changed']:,} changed, {self.stats['deleted']:,} deleted documents")
+
+        # Tombstone deleted documents (their rows stay in the file until compaction)
+        for key in deleted:
+            del self.documents[key]
+
+        if stale:
+            stale_texts = [text for i in stale for text in texts[i]]
+            new_vectors = np.ascontiguousarray(encode(stale_texts), dtype=np.float32)
+            faiss.normalize_L2(new_vectors)
+            start = self._append(new_vectors)
+            for i in stale:
+                self.documents[keys[i]] = {'hash': hashes[i], 'start': start, 'count': len(texts[i])}
+                start += len(texts[i])
+
+        self.save()
+        return self.gather(keys)
+
+    def gather(self, keys: List[str]) -> np.ndarray:
+        """Rows of the given documents, concatenated in order (an in-memory copy)."""
+        spans = [self.documents[key] for key in keys]
+        rows = np.concatenate([np.arange(s['start'], s['start'] + s['count']) for s in spans]) \
+            if spans else np.zeros(0, dtype=np.int64)
+        return np.asarray(self.vectors()[rows], dtype=np.float32)
+
+    def needs_compaction(self, ratio: float = COMPACT_TOMBSTONE_RATIO) -> bool:
+        return self.rows > 0 and self.tombstones / self.rows > ratio
+
+    def compact(self, keys: List[str]):
+        """Rewrite the vector file with only the live rows, in the order of keys."""
+        vectors = self.gather(keys)
+        tmp_path = self.vectors_path + '.tmp'
+        vectors.tofile(tmp_path)
+        os.replace(tmp_path, self.vectors_path)
+
+        start = 0
+        for key in keys:
+            self.documents[key]['start'] = start
+            start += self.documents[key]['count']
+        removed = self.rows - start
+        self.rows = start
+        self.save()
+        print(f"   ✅ Compacted embedding store: {removed:,} tombstoned rows removed")
+
+    def save(self):
+        """Write manifest.json (after the vectors it points to are on disk)."""
+        manifest = {
+            'updated_at': datetime.now().isoformat(),
+            'model_fingerprint': self.model_fingerprint,
+            'settings': self.settings,
+            'dimension': self.dimension,
+            'rows': self.rows,
+            'documents': self.documents,
+        }
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, self.manifest_path)
+
+    def _append(self, vectors: np.ndarray) -> int:
+        """Write rows after the last manifest row; returns the first new row."""
+        os.makedirs(self.directory, exist_ok=True)
+        if self.dimension is None or not self.rows:
+            self.dimension = vectors.shape[1]
+            self.rows = 0
+        start = self.rows
+        # Anything past the manifest's row count is from an interrupted build: overwrite it
+        with open(self.vectors_path, 'r+b' if os.path.exists(self.vectors_path) else 'wb') as f:
+            f.seek(start * self.dimension * 4)
+            f.write(vectors.tobytes())
+            f.truncate()
+        self.rows += len(vectors)
+        return start
+
+def open_manifest(index_output: str, model_fingerprint: str, settings: Dict,
+                  reset: bool = False) -> EmbeddingManifest:
+    """EmbeddingManifest of an index directory (reset=True discards stored vectors)."""
+    directory = os.path.join(index_output, INCREMENTAL_SUBDIR)
+    if reset:
+        for name in ('manifest.json', 'vectors.f32'):
+            path = os.path.join(directory, name)
+            if os.path.exists(path):
+                os.remove(path)
+    return EmbeddingManifest(directory, model_fingerprint, settings)
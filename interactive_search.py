@@ -3,70 +3,44 @@ Interactive Search - Superconductor Search v2
 ==============================================
 
 Interactive command-line search interface for testing queries.
+
+Searches through the shared search engine (search_engine.py), like the
+app. Set ENCODER_BACKEND (torch / torch-int8 / onnx / onnx-int8) to choose
+the query encoder backend and SEARCH_MODE (dense / lexical / hybrid) the
+default ranking, as in app.py.
 """
 
-import json
-import numpy as np
-import faiss
-from sentence_transformers import SentenceTransformer
-from typing import List, Dict
-import os
+from typing import List, Dict, Optional
+
+from search_engine import DOCUMENTS_FILE, load_search_engine, search_modes
 
 # Configuration
-MODEL_PATH = 'models/superconductor-search-v2'
+MODEL_PATH = 'models/superconductor-search-v7'
 INDEX_DIR = 'search_index'
 TOP_K = 10  # Number of results to return
 
 class InteractiveSearch:
     """Interactive search interface."""
 
-    def __init__(self, model_path: str, index_dir: str):
+    def __init__(self, model_path: str, index_dir: str, backend: Optional[str] = None,
+                 docs_path: str = DOCUMENTS_FILE):
         print("=" * 70)
         print("🔍 SUPERCONDUCTOR SEARCH ENGINE V2 - INTERACTIVE MODE")
         print("=" * 70)
-        print("\n🔧 Initializing search engine...")
-
-        # Load model
-        print(f"   Loading model: {model_path}")
-        self.model = SentenceTransformer(model_path)
-
-        # Load FAISS index
-        index_path = os.path.join(index_dir, 'faiss_index.bin')
-        print(f"   Loading index: {index_path}")
-        self.index = faiss.read_index(index_path)
-
-        # Load metadata
-        metadata_path = os.path.join(index_dir, 'document_metadata.json')
-        print(f"   Loading metadata: {metadata_path}")
-        with open(metadata_path, 'r', encoding='utf-8') as f:
-            self.metadata = json.load(f)
-
-        print(f"\n✅ Search engine ready!")
-        print(f"   📚 {len(self.metadata):,} documents indexed")
-        print(f"   🧠 {self.index.d}-dimensional embeddings")
+        print()
+
+        self.engine = load_search_engine(model_path, index_dir, docs_path, backend)
+        self.mode = self.engine.default_search_mode
+        print(f"   Backend: {self.engine.encoder_backend} | Search mode: {self.mode}")
         print("=" * 70)
 
     def search(self, query: str, k: int = TOP_K) -> List[Dict]:
         """Search for documents matching the query."""
-        # Generate query embedding
-        query_embedding = self.model.encode([query], convert_to_numpy=True)
-
-        # Normalize for cosine similarity
-        faiss.normalize_L2(query_embedding)
-
-        # Search
-        scores, indices = self.index.search(query_embedding, k)
+        return self.engine.search(query, k, mode=self.mode)
 
-        # Prepare results
-        results = []
-        for i, (score, idx) in enumerate(zip(scores[0], indices[0])):
-            if idx < len(self.metadata):
-                result = self.metadata[idx].copy()
-                result['score'] = float(score)
-                result['rank'] = i + 1
-                results.append(result)
-
-        return results
+    def search_many(self, queries: List[str], k: int = TOP_K) -> List[List[Dict]]:
+        """Search several queries at once (one encode and one index search)."""
+        return self.engine.search_many(queries, k, mode=self.mode)
 
     def print_results(self, query: str, results: List[Dict], num_to_show: int = 10):
         """Print search results in a readable format."""
@@ -81,12 +55,7 @@ class InteractiveSearch:
             score = result['score']
             title = result['title']
             source = result['source']
-            difficulty = result['difficulty']
-            doc_id = result['id']
-
-            # Difficulty labels
-            diff_labels = ['Unspecified', 'Beginner', 'Intermediate', 'Advanced', 'Expert', 'Cutting-edge']
-            diff_label = diff_labels[difficulty] if difficulty < len(diff_labels) else 'Unknown'
+            diff_label = result['difficulty']
 
             # Format source
             source_emoji = {
@@ -103,15 +72,15 @@ class InteractiveSearch:
 
             # Show URL if available
             url = result.get('url', '')
-            if url:
+            if url and url != '#':
                 if source == 'youtube':
                     full_url = f"https://youtube.com/watch?v={url}" if not url.startswith('http') else url
                     print(f"   URL: {full_url}")
                 elif url.startswith('http'):
                     print(f"   URL: {url}")
 
-            # Show preview
-            preview = result.get('text_preview', '')[:150]
+            # Show preview (best-matching passage)
+            preview = result.get('snippet', '')[:150]
             if preview:
                 print(f"   Preview: {preview}...")
 
@@ -123,6 +92,8 @@ class InteractiveSearch:
         print("   Commands:")
         print("   - Type 'quit' or 'exit' to exit")
         print("   - Type 'help' for suggestions")
+        print("   - Type 'stats' for query cache statistics")
+        print(f"   - Type 'mode <name>' to switch ranking ({', '.join(search_modes())})")
         print("   - Type a number (e.g., '5') to change number of results shown")
         print()
 
@@ -163,6 +134,22 @@ class InteractiveSearch:
                     print()
                     continue
 
+                if query.lower().startswith('mode '):
+                    mode = query.split(None, 1)[1].strip()
+                    if mode in search_modes():
+                        self.mode = mode
+                        print(f"✅ Search mode: {mode}")
+                    else:
+                        print(f"❌ Unknown mode (one of {', '.join(search_modes())})")
+                    continue
+
+                if query.lower() == 'stats':
+                    stats = self.engine.query_embedding_cache.stats()
+                    print(f"\n📊 Query cache: {stats['size']}/{stats['max_size']} entries, "
+                          f"{stats['hits']} hits, {stats['misses']} misses "
+                          f"({stats['hit_rate']:.0%} hit rate)\n")
+                    continue
+
                 # Check if it's a number (change results count)
                 if query.isdigit():
                     num_results = int(query)
@@ -180,7 +167,8 @@ class InteractiveSearch:
                 print(f"📊 Quick stats:")
                 print(f"   YouTube videos: {youtube_count}/{num_results}")
                 print(f"   arXiv papers: {arxiv_count}/{num_results}")
-                print(f"   Top score: {results[0]['score']:.4f}")
+                if results:
+                    print(f"   Top score: {results[0]['score']:.4f}")
                 print()
 
             except KeyboardInterrupt:
@@ -0,0 +1,242 @@
+"""
+JSON Stream - Superconductor Search
+====================================
+
+Streaming reader / writer for the pipeline's record files (documents,
+query pairs, training pairs), so peak memory stays bounded by one record
+instead of the whole file.
+
+Formats:
+- JSON Lines (.jsonl / .ndjson): one record per line - the default for
+  new outputs
+- Legacy JSON arrays (.json): parsed incrementally, one element at a time,
+  either a top-level array or an array under a key of a top-level object
+  (e.g. {"documents": [...], "metadata": {...}})
+
+Readers accept either format whatever the extension, and a missing
+'x.json' is read from 'x.jsonl' (and vice versa), so scripts keep working
+while files are converted.
+
+Usage:
+    for pair in iter_records('data/processed/queries.jsonl'):
+        ...
+    documents = load_records(DOCUMENTS_FILE, key='documents')
+
+    with RecordWriter('data/processed/out.jsonl') as writer:
+        for pair in pairs:
+            writer.write(pair)
+"""
+
+import json
+import os
+from typing import Dict, Iterable, Iterator, List, Optional
+
+# Configuration
+JSONL_EXTENSIONS = ('.jsonl', '.ndjson')
+READ_CHUNK_CHARS = 1 << 16   # Characters read per refill (doubles for records larger than the buffer)
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+
+def is_jsonl(path: str) -> bool:
+    return path.endswith(JSONL_EXTENSIONS)
+
+def jsonl_path(path: str) -> str:
+    """'x.json' -> 'x.jsonl' (paths already in JSON Lines are returned as-is)."""
+    return path if is_jsonl(path) else os.path.splitext(path)[0] + '.jsonl'
+
+def resolve_records_path(path: str) -> str:
+    """path, or its JSON / JSON Lines sibling if only that one exists."""
+    if os.path.exists(path):
+        return path
+    root, _ = os.path.splitext(path)
+    for candidate in (root + '.jsonl', root + '.ndjson', root + '.json'):
+        if os.path.exists(candidate):
+            return candidate
+    return path
+
+class _Buffer:
+    """Text buffer over a file, refilled on demand for incremental decoding."""
+
+    def __init__(self, f):
+        self.f = f
+        self.text = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """Read more text (dropping consumed text); False at end of file."""
+        if self.eof:
+            return False
+        chunk = self.f.read(max(READ_CHUNK_CHARS, len(self.text) - self.pos))
+        self.text = self.text[self.pos:] + chunk
+        self.pos = 0
+        self.eof = not chunk
+        return bool(chunk)
+
+    def peek(self) -> str:
+        """Next non-whitespace character ('' at end of file)."""
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text) or not self.fill():
+                return self.text[self.pos:self.pos + 1]
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise ValueError(f"Malformed JSON: expected {char!r}, got {self.peek()!r}")
+        self.pos += 1
+
+    def value(self):
+        """Decode the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.text, self.pos)
+                # A number at the end of the buffer may continue in the next chunk
+                if end < len(self.text) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self.fill()
+
+def _iter_array(buffer: _Buffer) -> Iterator:
+    buffer.expect('[')
+    if buffer.peek() == ']':
+        buffer.pos += 1
+        return
+    while True:
+        yield buffer.value()
+        if buffer.peek() == ',':
+            buffer.pos += 1
+            continue
+        buffer.expect(']')
+        return
+
+def _iter_json(f, key: Optional[str]) -> Iterator[Dict]:
+    buffer = _Buffer(f)
+    if buffer.peek() == '[':
+        yield from _iter_array(buffer)
+        return
+
+    # Top-level object: a legacy wrapper (stream the array under key, keep
+    # the other members), or the first record of JSON Lines in a .json file
+    buffer.expect('{')
+    members = {}
+    while buffer.peek() != '}':
+        name = buffer.value()
+        buffer.expect(':')
+        if name == key and buffer.peek() == '[':
+            yield from _iter_array(buffer)
+            return
+        members[name] = buffer.value()
+        if buffer.peek() == ',':
+            buffer.pos += 1
+    buffer.pos += 1
+
+    # A lone object is a wrapper missing its key array, unless no key was
+    # asked for and it has no arrays (a one-record JSON Lines file)
+    if not buffer.peek():
+        name = getattr(f, 'name', 'JSON object')
+        if key is not None:
+            raise KeyError(f"No '{key}' array in {name}")
+        if any(isinstance(value, list) for value in members.values()):
+            raise ValueError(f"{name} holds a single object with arrays, not records: pass key=")
+    yield members
+    while buffer.peek():
+        yield buffer.value()
+
+def iter_records(path: str, key: Optional[str] = None) -> Iterator[Dict]:
+    """
+    Yield the records of a JSON Lines or JSON array file one at a time.
+
+    Args:
+        path: Record file (see resolve_records_path for extension fallback)
+        key: For JSON files holding an object, the key of the record array
+             (ignored for JSON Lines and top-level arrays)
+    """
+    path = resolve_records_path(path)
+    with open(path, 'r', encoding='utf-8') as f:
+        first = ''
+        while not first:
+            char = f.read(1)
+            if not char:
+                return
+            first = char.strip()
+        f.seek(0)
+
+        if first == '[' or not is_jsonl(path):
+            yield from _iter_json(f, key)
+            return
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+def load_records(path: str, key: Optional[str] = None) -> List[Dict]:
+    """All records of a file as a list (for consumers that need random access)."""
+    return list(iter_records(path, key))
+
+class RecordWriter:
+    """
+    Write records one at a time: JSON Lines, or a JSON array for '.json'
+    paths (legacy consumers that still call json.load).
+
+    Written to a temporary file and renamed on close, so readers never see
+    a partial file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.jsonl = not path.endswith('.json')
+        self.count = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._tmp_path = path + '.tmp'
+        self._f = open(self._tmp_path, 'w', encoding='utf-8')
+        if not self.jsonl:
+            self._f.write('[')
+
+    def write(self, record: Dict):
+        line = json.dumps(record, ensure_ascii=False)
+        if self.jsonl:
+            self._f.write(line + '\n')
+        else:
+            self._f.write(('\n' if not self.count else ',\n') + line)
+        self.count += 1
+
+    def write_all(self, records: Iterable[Dict]) -> int:
+        for record in records:
+            self.write(record)
+        return self.count
+
+    def flush(self):
+        """Push written records to the temporary file (a checkpoint for long runs)."""
+        self._f.flush()
+
+    def close(self):
+        if not self.jsonl:
+            self._f.write('\n]\n' if self.count else ']\n')
+        self._f.close()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        self._f.close()
+        os.remove(self._tmp_path)
+
+    def __enter__(self) -> 'RecordWriter':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+def write_records(path: str, records: Iterable[Dict]) -> int:
+    """Write records to path (format from the extension); returns the count."""
+    with RecordWriter(path) as writer:
+        return writer.write_all(records)
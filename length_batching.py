@@ -0,0 +1,159 @@
+"""
+Length Batching - Superconductor Search
+========================================
+
+Token-budgeted, length-bucketed batching for corpus encoding.
+
+model.encode pads every batch to its longest member, and the corpus mixes
+one-line Simple Wikipedia stubs with 2,000-word arXiv sections. Instead of
+a fixed number of texts per batch, texts are sorted by token length and
+grouped so that each batch holds at most TOKEN_BUDGET padded tokens:
+batches of short texts are large, batches of long texts are small, and
+members of a batch are close in length. Results are put back in input
+order.
+
+Features:
+- Token lengths from the model's own tokenizer (truncated at max_seq_length)
+- Padding waste report: fixed-size batches vs token-budgeted buckets
+- Same embeddings as model.encode (padding is masked out)
+
+Usage:
+    embeddings = encode_length_bucketed(model, texts, token_budget=8192)
+"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Defaults
+BATCH_SIZE = 32           # Fixed model.encode batch size (corpus encoding without a token budget)
+TOKEN_BUDGET = 8192       # Padded tokens per batch (batch size x longest member)
+MAX_BATCH_SIZE = 256      # Cap on texts per batch, however short they are
+TOKENIZE_CHUNK = 1024     # Texts tokenized per tokenizer call
+PROGRESS_STEPS = 10       # Progress lines per encode
+
+def token_lengths(model, texts: List[str]) -> np.ndarray:
+    """
+    Tokens per text as the model sees them (special tokens included, truncated).
+
+    Falls back to a whitespace word count when the model has no tokenizer.
+    """
+    max_length = getattr(model, 'max_seq_length', None)
+    tokenizer = getattr(model, 'tokenizer', None)
+    lengths = np.zeros(len(texts), dtype=np.int64)
+    if tokenizer is None:
+        for i, text in enumerate(texts):
+            lengths[i] = len(text.split()) + 2
+        return np.minimum(lengths, max_length) if max_length else lengths
+
+    for start in range(0, len(texts), TOKENIZE_CHUNK):
+        chunk = texts[start:start + TOKENIZE_CHUNK]
+        input_ids = tokenizer(chunk, truncation=max_length is not None, max_length=max_length,
+                              return_attention_mask=False, return_token_type_ids=False)['input_ids']
+        lengths[start:start + len(chunk)] = [len(ids) for ids in input_ids]
+    return lengths
+
+def plan_batches(lengths: np.ndarray, token_budget: int = TOKEN_BUDGET,
+                 max_batch_size: int = MAX_BATCH_SIZE) -> List[np.ndarray]:
+    """
+    Group text indices into token-budgeted batches, longest texts first.
+
+    Returns:
+        Index arrays; each batch's size x its longest length <= token_budget
+        (a single text longer than the budget gets a batch of its own)
+    """
+    order = np.argsort(-lengths, kind='stable')
+    batches = []
+    start = 0
+    while start < len(order):
+        # Sorted descending: the first member is the longest, so it sets the padding
+        size = max(1, min(max_batch_size, token_budget // max(1, int(lengths[order[start]]))))
+        batches.append(order[start:start + size])
+        start += size
+    return batches
+
+def fixed_batches(order: np.ndarray, batch_size: int) -> List[np.ndarray]:
+    """Consecutive batch_size slices of an order."""
+    return [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+
+def padding_stats(lengths: np.ndarray, batches: List[np.ndarray]) -> Dict:
+    """Real vs padded tokens of a batching plan."""
+    real = int(lengths.sum())
+    padded = sum(int(lengths[batch].max()) * len(batch) for batch in batches if len(batch))
+    return {
+        'batches': len(batches),
+        'real_tokens': real,
+        'padded_tokens': padded,
+        'padding_waste': round(1 - real / padded, 4) if padded else 0.0,
+    }
+
+def padding_report(texts: List[str], lengths: np.ndarray, batches: List[np.ndarray],
+                   batch_size: int) -> Dict:
+    """
+    Padding waste of the bucketed plan next to fixed batch_size batches.
+
+    'fixed' batches in input order; 'fixed_sorted' batches sorted by
+    character length, which is what sentence-transformers does inside one
+    model.encode call.
+    """
+    char_order = np.argsort([-len(text) for text in texts], kind='stable')
+    return {
+        'fixed': padding_stats(lengths, fixed_batches(np.arange(len(texts)), batch_size)),
+        'fixed_sorted': padding_stats(lengths, fixed_batches(char_order, batch_size)),
+        'bucketed': padding_stats(lengths, batches),
+    }
+
+def print_padding_report(report: Dict, batch_size: int, token_budget: int):
+    labels = {
+        'fixed': f'Fixed batches of {batch_size}',
+        'fixed_sorted': f'Fixed batches of {batch_size}, char-sorted',
+        'bucketed': f'Token buckets ({token_budget:,} tokens)',
+    }
+    print("   Padding waste:")
+    for name, label in labels.items():
+        stats = report[name]
+        print(f"     {label:<38} {stats['batches']:>6,} batches, "
+              f"{stats['padded_tokens']:>12,} padded tokens ({stats['padding_waste']:.1%} padding)")
+
+def encode_length_bucketed(model, texts: List[str], token_budget: int = TOKEN_BUDGET,
+                           max_batch_size: int = MAX_BATCH_SIZE, batch_size: int = BATCH_SIZE,
+                           report: bool = True, lengths: Optional[np.ndarray] = None,
+                           **encode_kwargs) -> np.ndarray:
+    """
+    model.encode(texts) in token-budgeted, length-sorted batches.
+
+    Args:
+        token_budget: Max padded tokens per batch
+        max_batch_size: Max texts per batch
+        batch_size: Fixed batch size the padding report compares against
+        report: Print the padding waste report and progress
+        lengths: Precomputed token_lengths(model, texts)
+
+    Returns:
+        (len(texts), dim) float32 embeddings, in input order
+    """
+    encode_kwargs.pop('convert_to_numpy', None)
+    encode_kwargs.pop('show_progress_bar', None)
+    encode_kwargs.pop('batch_size', None)
+    if not texts:
+        return np.asarray(model.encode([], convert_to_numpy=True, **encode_kwargs), dtype=np.float32)
+
+    if lengths is None:
+        lengths = token_lengths(model, texts)
+    batches = plan_batches(lengths, token_budget, max_batch_size)
+    if report:
+        print_padding_report(padding_report(texts, lengths, batches, batch_size), batch_size, token_budget)
+
+    embeddings = None
+    done = 0
+    step = max(1, len(texts) // PROGRESS_STEPS)
+    for batch in batches:
+        vectors = model.encode([texts[i] for i in batch], batch_size=len(batch),
+                               convert_to_numpy=True, show_progress_bar=False, **encode_kwargs)
+        if embeddings is None:
+            embeddings = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+        embeddings[batch] = vectors
+        if report and (done + len(batch)) // step > done // step:
+            print(f"   Encoded {done + len(batch):,}/{len(texts):,}")
+        done += len(batch)
+    return embeddings
@@ -0,0 +1,119 @@
+"""
+Parallel Encode - Superconductor Search
+========================================
+
+Multi-process, sharded corpus encoding for build_search_index.py.
+
+A single model.encode call keeps a handful of cores busy at best; on a
+many-core build box the corpus is instead split into fixed-size shards
+that a pool of CPU worker processes encodes side by side, each worker
+with its own copy of the model and a capped number of intra-op threads
+(workers x threads <= cores, so they do not oversubscribe each other).
+
+Features:
+- Shards are contiguous, fixed-size slices of the input, so the merged
+  result does not depend on the worker count or on completion order
+- Each shard is written to disk as it finishes (.npy, atomic rename) and
+  named by its content hash: an interrupted build resumes where it stopped
+- Shards are merged in order and the shard directory is removed
+- Each worker encodes its shard in token-budgeted, length-sorted batches
+  (see length_batching)
+
+Usage:
+    embeddings = encode_sharded(texts, model_path, workers=8, shard_dir='search_index/shards')
+"""
+
+import hashlib
+import multiprocessing
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Optional
+
+import numpy as np
+
+from length_batching import BATCH_SIZE, TOKEN_BUDGET, encode_length_bucketed
+
+# Defaults
+ENCODE_WORKERS = 1          # Worker processes (1 = encode in the calling process)
+SHARD_SIZE = 2048           # Texts per shard
+
+# Per-worker state (set by the pool initializer)
+_worker_model = None
+
+def default_threads_per_worker(workers: int) -> int:
+    """Split the machine's cores evenly between workers."""
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+def _init_worker(model_path: str, threads: int):
+    """Load the model once per worker, with a capped intra-op thread pool."""
+    global _worker_model
+    for var in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+        os.environ[var] = str(threads)
+    import torch
+    torch.set_num_threads(threads)
+    from sentence_transformers import SentenceTransformer
+    _worker_model = SentenceTransformer(model_path, device='cpu')
+
+def _encode_shard(texts: List[str], shard_path: str, batch_size: int, token_budget: int) -> str:
+    if token_budget:
+        embeddings = encode_length_bucketed(_worker_model, texts, token_budget, report=False)
+    else:
+        embeddings = _worker_model.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+    tmp_path = shard_path + '.tmp.npy'
+    np.save(tmp_path, np.asarray(embeddings, dtype=np.float32))
+    os.replace(tmp_path, shard_path)
+    return shard_path
+
+def shard_name(index: int, texts: List[str]) -> str:
+    """File name of a shard: position plus a hash of its texts (stale shards never match)."""
+    sha = hashlib.sha256()
+    for text in texts:
+        sha.update(text.encode('utf-8') + b'\0')
+    return f'shard_{index:05d}_{sha.hexdigest()[:16]}.npy'
+
+def encode_sharded(texts: List[str], model_path: str, workers: int = ENCODE_WORKERS,
+                   threads_per_worker: Optional[int] = None, shard_dir: str = 'shards',
+                   shard_size: int = SHARD_SIZE, batch_size: int = BATCH_SIZE,
+                   token_budget: int = TOKEN_BUDGET) -> np.ndarray:
+    """
+    Encode texts with a pool of worker processes.
+
+    Args:
+        workers: Worker processes
+        threads_per_worker: Intra-op threads per worker (default: cores / workers)
+        shard_dir: Where shards are written (removed after the merge)
+        token_budget: Padded tokens per batch (0: fixed batches of batch_size)
+
+    Returns:
+        (len(texts), dim) float32 embeddings, in input order
+    """
+    threads = threads_per_worker or default_threads_per_worker(workers)
+    os.makedirs(shard_dir, exist_ok=True)
+
+    shards = []
+    for i, start in enumerate(range(0, len(texts), shard_size)):
+        shard_texts = texts[start:start + shard_size]
+        shards.append((shard_texts, os.path.join(shard_dir, shard_name(i, shard_texts))))
+    pending = [(shard_texts, path) for shard_texts, path in shards if not os.path.exists(path)]
+
+    print(f"   Parallel encoding: {len(shards)} shards of {shard_size} "
+          f"({len(shards) - len(pending)} already on disk), "
+          f"{workers} workers x {threads} threads")
+
+    if pending:
+        # spawn: workers must not inherit the parent's thread pools / model
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=min(workers, len(pending)), mp_context=context,
+                                 initializer=_init_worker, initargs=(model_path, threads)) as pool:
+            futures = [pool.submit(_encode_shard, shard_texts, path, batch_size, token_budget)
+                       for shard_texts, path in pending]
+            for done, future in enumerate(as_completed(futures), 1):
+                future.result()
+                print(f"   Shard {done}/{len(pending)} encoded")
+
+    # Merge in shard order (independent of which worker finished first)
+    embeddings = np.concatenate([np.load(path) for _, path in shards]) if shards \
+        else np.zeros((0, 0), dtype=np.float32)
+    shutil.rmtree(shard_dir, ignore_errors=True)
+    return embeddings
@@ -0,0 +1,202 @@
+"""
+Passages - Superconductor Search
+=================================
+
+Passage (chunk) level indexing helpers.
+
+Long Wikipedia articles, arXiv papers and lecture transcripts are split
+into overlapping word windows, each passage gets its own embedding, and
+passage hits are folded back into document results at query time.
+
+Features:
+- split_passages: overlapping word windows over the full text
+  (the index builder embeds "title + passage" for every window)
+- aggregate_passage_scores: exact max-over-passages document scores for a
+  full similarity matrix (np.maximum.reduceat, no Python loop)
+- aggregate_passage_hits: groups top passage hits (e.g. from FAISS) into
+  documents with max or top-m mean scoring, vectorized over the whole batch
+- The best-matching passage of each document is returned for the snippet
+"""
+
+from typing import Dict, List
+
+import numpy as np
+
+# Defaults
+CHUNK_WORDS = 200               # Words per passage (0 = one passage per document)
+CHUNK_OVERLAP = 50              # Words shared by consecutive passages
+AGGREGATIONS = ['max', 'mean']  # Document score: best passage, or mean of its top-m passages
+AGGREGATION = 'max'
+TOP_M = 3                       # Passages averaged by the 'mean' aggregation
+PASSAGE_CANDIDATE_FACTOR = 8    # Passage hits fetched per requested document result
+SNIPPET_CHARS = 300             # Characters of the best passage shown as the snippet
+
+def check_chunking(chunk_words: int, overlap: int):
+    """
+    Reject an overlap that is negative or not smaller than the window.
+
+    Raises:
+        ValueError: overlap < 0, or overlap >= chunk_words > 0 (windows would
+                    advance by one word, one passage per word of the corpus)
+    """
+    if overlap < 0:
+        raise ValueError(f"chunk overlap must be >= 0 (got {overlap})")
+    if 0 < chunk_words <= overlap:
+        raise ValueError(f"chunk overlap ({overlap}) must be smaller than chunk words ({chunk_words})")
+
+def split_passages(text: str, chunk_words: int = CHUNK_WORDS,
+                   overlap: int = CHUNK_OVERLAP) -> List[str]:
+    """
+    Split text into overlapping windows of chunk_words words.
+
+    Always returns at least one passage (possibly empty), so every
+    document owns at least one row of the index.
+
+    Raises:
+        ValueError: Invalid overlap (see check_chunking)
+    """
+    check_chunking(chunk_words, overlap)
+    if chunk_words <= 0:
+        return [text]
+    words = text.split()
+    if len(words) <= chunk_words:
+        return [' '.join(words)]
+
+    step = chunk_words - overlap
+    passages = []
+    for start in range(0, len(words), step):
+        passages.append(' '.join(words[start:start + chunk_words]))
+        if start + chunk_words >= len(words):
+            break
+    return passages
+
+def passage_offsets(passage_doc: np.ndarray) -> np.ndarray:
+    """
+    First passage row of each document, plus the total (n_docs + 1 offsets).
+
+    Passages of a document are contiguous and every document has at least one.
+    """
+    num_docs = int(passage_doc[-1]) + 1 if len(passage_doc) else 0
+    return np.searchsorted(passage_doc, np.arange(num_docs + 1)).astype(np.int64)
+
+def aggregate_passage_scores(similarities: np.ndarray, doc_offsets: np.ndarray) -> np.ndarray:
+    """
+    Exact document scores (max over each document's passages).
+
+    Args:
+        similarities: (n_passages,) or (b, n_passages) scores
+        doc_offsets: passage_offsets() of the index
+
+    Returns:
+        (n_docs,) or (b, n_docs) scores
+    """
+    if len(doc_offsets) - 1 == similarities.shape[-1]:
+        return similarities  # One passage per document
+    return np.maximum.reduceat(similarities, doc_offsets[:-1], axis=-1)
+
+def best_passages(similarities: np.ndarray, doc_ids: np.ndarray,
+                  doc_offsets: np.ndarray) -> np.ndarray:
+    """
+    Best-scoring passage row of each selected document.
+
+    Only the passages of the selected documents are gathered, padded to
+    the longest one, so the cost is O(b * k * passages per document).
+
+    Args:
+        similarities: (b, n_passages) scores
+        doc_ids: (b, k) selected documents
+
+    Returns:
+        (b, k) passage rows
+    """
+    starts = doc_offsets[doc_ids]
+    lengths = doc_offsets[doc_ids + 1] - starts
+    width = max(1, int(lengths.max())) if lengths.size else 1
+
+    steps = np.arange(width)
+    rows = starts[..., np.newaxis] + np.minimum(steps, np.maximum(lengths, 1)[..., np.newaxis] - 1)
+    gathered = np.take_along_axis(similarities, rows.reshape(rows.shape[0], -1), axis=-1)
+    gathered = gathered.reshape(rows.shape)
+    best = np.argmax(gathered, axis=-1)
+    return np.take_along_axis(rows, best[..., np.newaxis], axis=-1)[..., 0]
+
+def aggregate_passage_hits(passage_ids: np.ndarray, scores: np.ndarray,
+                           passage_doc: np.ndarray, k: int,
+                           aggregation: str = AGGREGATION, top_m: int = TOP_M) -> tuple:
+    """
+    Group ranked passage hits into the top-k documents of each query.
+
+    All queries of the batch are grouped in one pass: hits are keyed by
+    (query, document), stably sorted, and reduced with reduceat.
+
+    Args:
+        passage_ids: (b, c) passage rows, best first per query (-1 = empty slot)
+        scores: (b, c) passage scores
+        passage_doc: Document index of each passage row
+        aggregation: 'max' (best passage) or 'mean' (mean of the document's
+                     top_m retrieved passages)
+
+    Returns:
+        (doc_ids, doc_scores, best_passage_ids), each (b, k), best first;
+        empty slots have id -1 and score -inf
+    """
+    if aggregation not in AGGREGATIONS:
+        raise ValueError(f"Unknown aggregation '{aggregation}' (expected one of {AGGREGATIONS})")
+
+    num_queries = passage_ids.shape[0]
+    doc_ids = np.full((num_queries, k), -1, dtype=np.int64)
+    doc_scores = np.full((num_queries, k), -np.inf, dtype=np.float32)
+    best_ids = np.full((num_queries, k), -1, dtype=np.int64)
+
+    rows, cols = np.nonzero(passage_ids >= 0)
+    if rows.size == 0 or k <= 0:
+        return doc_ids, doc_scores, best_ids
+    hit_passages = passage_ids[rows, cols]
+    hit_scores = scores[rows, cols].astype(np.float32, copy=False)
+    hit_docs = passage_doc[hit_passages].astype(np.int64)
+
+    # Stable sort by (query, document): within a group hits stay best first
+    keys = rows.astype(np.int64) * (int(passage_doc.max()) + 1) + hit_docs
+    order = np.argsort(keys, kind='stable')
+    keys = keys[order]
+    group_starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+
+    group_rows = rows[order][group_starts]
+    group_docs = hit_docs[order][group_starts]
+    group_best = hit_passages[order][group_starts]
+    sorted_scores = hit_scores[order]
+    if aggregation == 'max':
+        group_scores = sorted_scores[group_starts]
+    else:
+        group_sizes = np.diff(np.r_[group_starts, len(keys)])
+        rank_in_group = np.arange(len(keys)) - np.repeat(group_starts, group_sizes)
+        kept = np.where(rank_in_group < top_m, sorted_scores, 0.0)
+        group_scores = np.add.reduceat(kept, group_starts) / np.minimum(group_sizes, top_m)
+
+    # Lay the groups out per query (groups are already ordered by query) and rank them
+    row_counts = np.bincount(group_rows, minlength=num_queries)
+    row_starts = np.r_[0, np.cumsum(row_counts)[:-1]]
+    slots = np.arange(len(group_rows)) - row_starts[group_rows]
+    table = np.full((num_queries, int(row_counts.max())), -np.inf, dtype=np.float32)
+    table[group_rows, slots] = group_scores
+
+    top = np.argsort(-table, axis=1, kind='stable')[:, :k]
+    top_scores = np.take_along_axis(table, top, axis=1)
+    found = np.isfinite(top_scores)
+    group_index = np.minimum(row_starts[:, np.newaxis] + top, len(group_rows) - 1)
+
+    width = top.shape[1]
+    doc_ids[:, :width] = np.where(found, group_docs[group_index], -1)
+    doc_scores[:, :width] = top_scores
+    best_ids[:, :width] = np.where(found, group_best[group_index], -1)
+    return doc_ids, doc_scores, best_ids
+
+def make_snippet(text: str, max_chars: int = SNIPPET_CHARS) -> str:
+    """Shorten a passage for display, cutting at a word boundary."""
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rsplit(' ', 1)[0] + '…'
+
+def chunking_info(chunk_words: int = CHUNK_WORDS, overlap: int = CHUNK_OVERLAP) -> Dict:
+    """Chunking parameters as recorded in index_info.json."""
+    return {'chunk_words': chunk_words, 'chunk_overlap': overlap if chunk_words > 0 else 0}
@@ -17,11 +17,14 @@ import os
 from datetime import datetime
 from collections import Counter
 
-# Input files
-FINAL_QUERIES_FILE = 'data/processed/queries_final_clean_20251104_230506.json'
+from json_stream import load_records, write_records
+
+# Input files (final_cleanup.py writes JSON Lines; a legacy .json sibling is read if present)
+FINAL_QUERIES_FILE = 'data/processed/queries_final_clean_20251104_230506.jsonl'
 FINAL_DOCUMENTS_FILE = 'data/processed/FINAL_ALL_IMPROVED_documents_20251104_223630.json'
 
-# Output directory
+# Output directory (written record by record; .json paths keep a JSON array,
+# one record per line, for the consumers that still call json.load)
 OUTPUT_DIR = 'training'
 OUTPUT_FILE = os.path.join(OUTPUT_DIR, 'training_dataset.json')
 DOCS_FILE = os.path.join(OUTPUT_DIR, 'documents.json')
@@ -195,16 +198,14 @@ def save_training_data(training_examples, documents, queries):
 
     # Save training examples
     print(f"\n1️⃣ Saving training examples to {OUTPUT_FILE}")
-    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-        json.dump(training_examples, f, indent=2, ensure_ascii=False)
+    write_records(OUTPUT_FILE, training_examples)
 
     size_mb = os.path.getsize(OUTPUT_FILE) / (1024 * 1024)
     print(f"   ✅ Saved {len(training_examples):,} examples ({size_mb:.2f} MB)")
 
     # Save complete document collection
     print(f"\n2️⃣ Saving document collection to {DOCS_FILE}")
-    with open(DOCS_FILE, 'w', encoding='utf-8') as f:
-        json.dump(documents, f, indent=2, ensure_ascii=False)
+    write_records(DOCS_FILE, documents)
 
     size_mb = os.path.getsize(DOCS_FILE) / (1024 * 1024)
     print(f"   ✅ Saved {len(documents):,} documents ({size_mb:.2f} MB)")
@@ -250,14 +251,11 @@ def main():
     print("\n📂 Loading data...")
 
     print(f"   Loading queries...")
-    with open(FINAL_QUERIES_FILE, 'r', encoding='utf-8') as f:
-        queries = json.load(f)
+    queries = load_records(FINAL_QUERIES_FILE)
     print(f"   ✅ Loaded {len(queries):,} query pairs")
 
     print(f"   Loading documents...")
-    with open(FINAL_DOCUMENTS_FILE, 'r', encoding='utf-8') as f:
-        doc_data = json.load(f)
-        documents = doc_data['documents'] if isinstance(doc_data, dict) else doc_data
+    documents = load_records(FINAL_DOCUMENTS_FILE, key='documents')
     print(f"   ✅ Loaded {len(documents):,} documents")
 
     # Verify integrity
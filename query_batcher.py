@@ -0,0 +1,141 @@
+"""
+Query Batcher - Superconductor Search
+======================================
+
+Micro-batching scheduler for concurrent search requests.
+
+Requests submitted from many threads (e.g. concurrent Gradio events) are
+coalesced into batches, processed by a single batch function call (one
+model forward pass + one matrix / FAISS search), and the per-request
+results are fanned back out to the callers.
+
+A batch is dispatched when it reaches max_batch_size or when max_wait_ms
+has passed since its first request arrived. Requests that queue up while
+a batch is running are picked up together by the next batch. If a batch
+fails, its requests are retried one by one, so an error only reaches the
+request that caused it.
+
+Stage spans (search_metrics) recorded while a batch runs are observed
+once per batch and attributed to the trace of every request in it.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List
+
+from search_metrics import batch_spans, current_trace
+
+# Defaults
+BATCH_MAX_SIZE = 16     # Requests per batch
+BATCH_MAX_WAIT_MS = 2   # Max extra latency spent waiting for a batch to fill
+
+class QueryBatcher:
+    """Coalesce concurrent requests into batched calls of batch_fn."""
+
+    def __init__(self, batch_fn: Callable[[List[Any]], List[Any]],
+                 max_batch_size: int = BATCH_MAX_SIZE,
+                 max_wait_ms: float = BATCH_MAX_WAIT_MS,
+                 name: str = 'query-batcher'):
+        """
+        Args:
+            batch_fn: Takes a list of request items, returns a list of
+                      results in the same order
+            max_batch_size: Dispatch as soon as this many requests are waiting
+            max_wait_ms: Dispatch at most this long after the first request
+        """
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self._queue = queue.Queue()
+        self._closed = False
+        self.batches = 0
+        self.requests = 0
+        self._worker = threading.Thread(target=self._run, name=name, daemon=True)
+        self._worker.start()
+
+    def submit(self, item: Any) -> Future:
+        """Queue one request; the Future resolves to its result."""
+        if self._closed:
+            raise RuntimeError("QueryBatcher is closed")
+        future = Future()
+        # The caller's trace travels with the request to the worker thread
+        self._queue.put((item, future, current_trace()))
+        return future
+
+    def __call__(self, item: Any, timeout: float = None) -> Any:
+        """Submit one request and block until its result is ready."""
+        return self.submit(item).result(timeout)
+
+    def close(self):
+        """Stop the worker after the requests already queued are processed."""
+        self._closed = True
+        self._queue.put(None)
+        self._worker.join()
+
+    def stats(self) -> dict:
+        """Batch counters (mean batch size shows how much coalescing happens)."""
+        return {
+            'batches': self.batches,
+            'requests': self.requests,
+            'mean_batch_size': self.requests / self.batches if self.batches else 0.0,
+        }
+
+    def _collect_batch(self, first) -> list:
+        """Gather requests until the batch is full or the wait window closes."""
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                entry = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is None:  # close() sentinel: finish this batch, then stop
+                self._queue.put(None)
+                break
+            batch.append(entry)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                break
+
+            batch = self._collect_batch(first)
+            items = [item for item, _, _ in batch]
+            futures = [future for _, future, _ in batch]
+
+            try:
+                with batch_spans([trace for _, _, trace in batch]):
+                    results = self._call(items)
+            except Exception as e:
+                if len(batch) == 1:
+                    futures[0].set_exception(e)
+                else:
+                    # Retry one request at a time, so only the failing ones get the error
+                    for entry in batch:
+                        self._run_single(*entry)
+            else:
+                for future, result in zip(futures, results):
+                    future.set_result(result)
+
+            self.batches += 1
+            self.requests += len(batch)
+
+    def _call(self, items: List[Any]) -> List[Any]:
+        results = self.batch_fn(items)
+        if len(results) != len(items):
+            raise RuntimeError(f"batch_fn returned {len(results)} results for {len(items)} requests")
+        return results
+
+    def _run_single(self, item: Any, future: Future, trace):
+        try:
+            with batch_spans([trace]):
+                result = self._call([item])[0]
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
@@ -0,0 +1,155 @@
+"""
+Query Cache - Superconductor Search
+====================================
+
+Bounded LRU caches for the query path.
+
+Features:
+- QueryEmbeddingCache: caches normalized query embeddings in front of
+  SentenceTransformer.encode (the dominant cost of a warm query on CPU)
+- LRUCache: generic cache, used by app.py for final top-k result lists
+- Case / whitespace folding of query keys ("Meissner  Effect" == "meissner effect")
+- Size and TTL eviction, hit / miss / eviction counters
+- Versioned: changing the version (model or index fingerprint) clears the cache
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional
+
+import numpy as np
+import faiss
+
+# Defaults
+QUERY_CACHE_SIZE = 2048     # Cached query embeddings
+RESULT_CACHE_SIZE = 1024    # Cached result lists
+CACHE_TTL_SECONDS = None    # None = entries never expire (size eviction only)
+
+def normalize_query(query: str) -> str:
+    """
+    Fold case and whitespace so equivalent queries share one cache entry.
+
+    The v7 model (all-MiniLM-L6-v2 base) uses an uncased tokenizer, so this
+    does not change the embedding.
+    """
+    return ' '.join(query.lower().split())
+
+class LRUCache:
+    """Thread-safe LRU cache with optional TTL and a version tag."""
+
+    def __init__(self, max_size: int = RESULT_CACHE_SIZE,
+                 ttl_seconds: Optional[float] = CACHE_TTL_SECONDS,
+                 version: Optional[str] = None):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.version = version
+        self._entries = OrderedDict()  # key -> (inserted_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value (marking it recently used), or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl_seconds is not None \
+                    and time.monotonic() - entry[0] > self.ttl_seconds:
+                del self._entries[key]
+                self.evictions += 1
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: Any):
+        """Insert a value, evicting the least recently used entries if full."""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def set_version(self, version: Optional[str]):
+        """Clear the cache if the model / index version changed."""
+        with self._lock:
+            if version != self.version:
+                self._entries.clear()
+                self.version = version
+
+    def clear(self):
+        """Drop all entries (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict:
+        """Hit / miss counters and current size."""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'version': self.version,
+        }
+
+class QueryEmbeddingCache(LRUCache):
+    """LRU cache of L2-normalized query embeddings keyed by normalized query text."""
+
+    def __init__(self, max_size: int = QUERY_CACHE_SIZE,
+                 ttl_seconds: Optional[float] = CACHE_TTL_SECONDS,
+                 version: Optional[str] = None):
+        super().__init__(max_size, ttl_seconds, version)
+
+    def encode(self, model, query: str) -> np.ndarray:
+        """
+        Encode a query through the cache.
+
+        Returns:
+            (1, dim) float32 L2-normalized embedding. The array is shared
+            with the cache and read-only; copy it before modifying.
+        """
+        return self.encode_many(model, [query])
+
+    def encode_many(self, model, queries: List[str]) -> np.ndarray:
+        """
+        Encode several queries through the cache in one forward pass.
+
+        Only cache misses are sent to the model (as a single batch).
+
+        Returns:
+            (len(queries), dim) float32 L2-normalized embeddings. Rows of a
+            single-query call are shared with the cache and read-only.
+        """
+        keys = [normalize_query(q) for q in queries]
+        cached = [self.get(key) for key in keys]
+
+        missing = list(dict.fromkeys(key for key, emb in zip(keys, cached) if emb is None))
+        if missing:
+            encoded = model.encode(missing, convert_to_numpy=True).astype(np.float32, copy=False)
+            faiss.normalize_L2(encoded)
+            fresh = {}
+            for key, row in zip(missing, encoded):
+                embedding = row[np.newaxis].copy()
+                embedding.flags.writeable = False
+                self.put(key, embedding)
+                fresh[key] = embedding
+            cached = [emb if emb is not None else fresh[key] for key, emb in zip(keys, cached)]
+
+        if len(cached) == 1:
+            return cached[0]
+        return np.vstack(cached)
@@ -16,78 +16,109 @@ V7 Solution:
 - Decreased YouTube from 26.6% → 23.1%
 
 This test will verify if V7 fixed these 3 queries.
+
+Queries go through the shared search engine (search_engine.py), over the
+same index artifact as the app (built or refreshed on first use), ranked
+by embeddings only. Run from the repository root.
 """
 
-import json
-from sentence_transformers import SentenceTransformer
-import numpy as np
-import faiss
+import os
+import sys
+import time
+
+# Repo root on the path for the shared search engine
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from search_engine import load_search_engine
 
 # Configuration
 MODEL_PATH = 'models/superconductor-search-v7'
 DOCUMENTS_FILE = 'training/documents.json'
+INDEX_DIR = 'search_index'
 TOP_K = 10
-
-def load_model_and_documents():
-    """Load trained model and documents."""
+SEARCH_MODE = 'dense'  # The model is under test: no BM25 / fusion
+
+# The 3 problem queries + variations
+PROBLEM_QUERIES = {
+    "JOSEPHSON JUNCTION (V6: 0% Wikipedia)": [
+        "josephson junction",
+        "what is a josephson junction",
+        "josephson effect",
+        "explain josephson junction"
+    ],
+    "CUPRATE SUPERCONDUCTORS (V6: 0% Wikipedia)": [
+        "cuprate superconductors",
+        "what are cuprate superconductors",
+        "ybco superconductor",
+        "high temperature cuprates"
+    ],
+    "MEISSNER EFFECT (V6: 60% YouTube)": [
+        "meissner effect",
+        "what is the meissner effect",
+        "meissner effect levitation",
+        "magnetic field expulsion superconductor"
+    ]
+}
+
+# Test queries - grouped by difficulty
+TEST_QUERIES = {
+    'BEGINNER': [
+        "what is a superconductor",
+        "what is superconductivity",
+        "explain superconductivity",
+        "define superconductor"
+    ],
+    'INTERMEDIATE': [
+        "flux pinning",
+        "josephson junction",
+        "cuprate superconductors",
+        "properties of iron-based superconductors",
+        "squid applications",
+        "how do cooper pairs work",
+        "type ii superconductor",
+        "meissner effect",
+        "critical temperature"
+    ],
+    'ADVANCED': [
+        "iron-based superconductors mechanism",
+        "cuprate superconductors mechanism",
+        "topological superconductivity",
+        "bcs theory derivation",
+        "high temperature superconductor phonon coupling"
+    ]
+}
+
+def load_engine():
+    """Load the trained model and its index through the shared search engine."""
     print("="*70)
     print("🔍 Testing Model V7 - Validating 3 Problem Query Fixes")
     print("="*70)
 
-    print(f"\nLoading model from: {MODEL_PATH}")
-    model = SentenceTransformer(MODEL_PATH)
-    print("✅ Model loaded")
-
-    print(f"\nLoading documents from: {DOCUMENTS_FILE}")
-    with open(DOCUMENTS_FILE, 'r', encoding='utf-8') as f:
-        documents = json.load(f)
-    print(f"✅ Loaded {len(documents):,} documents")
-
-    return model, documents
-
-def create_faiss_index(model, documents):
-    """Create FAISS index for documents."""
-    print("\n📊 Creating FAISS index...")
-
-    # Encode all documents
-    doc_texts = [doc.get('content', doc.get('text', '')) for doc in documents]
-    doc_embeddings = model.encode(doc_texts, show_progress_bar=True, convert_to_numpy=True)
-
-    # Normalize embeddings for cosine similarity
-    faiss.normalize_L2(doc_embeddings)
-
-    # Create FAISS index
-    dimension = doc_embeddings.shape[1]
-    index = faiss.IndexFlatIP(dimension)  # Inner product (cosine similarity)
-    index.add(doc_embeddings)
-
-    print(f"✅ FAISS index created with {index.ntotal:,} documents")
-
-    return index
-
-def search(query, model, index, documents, top_k=TOP_K):
+    print(f"\nModel: {MODEL_PATH}")
+    print(f"Documents: {DOCUMENTS_FILE}")
+    print(f"Index: {INDEX_DIR}")
+    return load_search_engine(MODEL_PATH, INDEX_DIR, DOCUMENTS_FILE)
+
+def search_many(queries, engine, top_k=TOP_K):
+    """
+    Search several queries in one batch (one encode call, one index search).
+
+    Returns:
+        {query: top-k results}
+    """
+    start = time.perf_counter()
+    all_results = engine.search_many(list(queries), top_k, mode=SEARCH_MODE)
+    print(f"\n⚡ Searched {len(all_results)} queries in {(time.perf_counter() - start) * 1000:.0f} ms (one batch)")
+    return {query: [{
+        'score': result['score'],
+        'id': result['id'],
+        'title': result['title'],
+        'source': result['source'],
+        'content_preview': result['snippet'][:200] + '...',
+    } for result in results] for query, results in zip(queries, all_results)}
+
+def search(query, engine, top_k=TOP_K):
     """Search for query and return top-k results."""
-    # Encode query
-    query_embedding = model.encode([query], convert_to_numpy=True)
-    faiss.normalize_L2(query_embedding)
-
-    # Search
-    scores, indices = index.search(query_embedding, top_k)
-
-    # Get results
-    results = []
-    for score, idx in zip(scores[0], indices[0]):
-        if idx < len(documents):
-            doc = documents[idx]
-            results.append({
-                'score': float(score),
-                'id': doc.get('id', 'unknown'),
-                'title': doc.get('title', 'No title'),
-                'source': doc.get('source', 'unknown'),
-                'content_preview': doc.get('content', '')[:200] + '...'
-            })
-
-    return results
+    return search_many([query], engine, top_k)[query]
 
 def analyze_results(results):
     """Analyze search results distribution."""
@@ -152,11 +183,8 @@ def print_results(query, results, v6_stats=None):
 
 def run_tests():
     """Run test queries focused on the 3 problem queries."""
-    # Load model and documents
-    model, documents = load_model_and_documents()
-
-    # Create FAISS index
-    index = create_faiss_index(model, documents)
+    # Load model and index
+    engine = load_engine()
 
     # V6 Results for the 3 problem queries (from V6_TEST_RESULTS.md)
     v6_results = {
@@ -177,27 +205,7 @@ def run_tests():
         }
     }
 
-    # The 3 problem queries + variations
-    problem_queries = {
-        "JOSEPHSON JUNCTION (V6: 0% Wikipedia)": [
-            "josephson junction",
-            "what is a josephson junction",
-            "josephson effect",
-            "explain josephson junction"
-        ],
-        "CUPRATE SUPERCONDUCTORS (V6: 0% Wikipedia)": [
-            "cuprate superconductors",
-            "what are cuprate superconductors",
-            "ybco superconductor",
-            "high temperature cuprates"
-        ],
-        "MEISSNER EFFECT (V6: 60% YouTube)": [
-            "meissner effect",
-            "what is the meissner effect",
-            "meissner effect levitation",
-            "magnetic field expulsion superconductor"
-        ]
-    }
+    problem_queries = PROBLEM_QUERIES
 
     print("\n" + "="*70)
     print("🧪 TESTING V7 ON THE 3 PROBLEM QUERIES")
@@ -205,6 +213,7 @@ def run_tests():
 
     # Track overall statistics
     overall_stats = {}
+    problem_results = search_many([q for queries in problem_queries.values() for q in queries], engine)
 
     for problem_type, queries in problem_queries.items():
         print(f"\n{'='*70}")
@@ -217,7 +226,7 @@ def run_tests():
             # Get V6 stats for main query if available
             v6_stats = v6_results.get(query, None)
 
-            results = search(query, model, index, documents)
+            results = problem_results[query]
             print_results(query, results, v6_stats)
 
             # Aggregate source stats
@@ -305,35 +314,10 @@ def run_tests():
     print("🧪 FULL TEST SUITE - ALL DIFFICULTY LEVELS")
     print("="*70)
 
-    # Test queries - grouped by difficulty
-    test_queries = {
-        'BEGINNER': [
-            "what is a superconductor",
-            "what is superconductivity",
-            "explain superconductivity",
-            "define superconductor"
-        ],
-        'INTERMEDIATE': [
-            "flux pinning",
-            "josephson junction",
-            "cuprate superconductors",
-            "properties of iron-based superconductors",
-            "squid applications",
-            "how do cooper pairs work",
-            "type ii superconductor",
-            "meissner effect",
-            "critical temperature"
-        ],
-        'ADVANCED': [
-            "iron-based superconductors mechanism",
-            "cuprate superconductors mechanism",
-            "topological superconductivity",
-            "bcs theory derivation",
-            "high temperature superconductor phonon coupling"
-        ]
-    }
+    test_queries = TEST_QUERIES
 
     stats_by_difficulty = {}
+    suite_results = search_many([q for queries in test_queries.values() for q in queries], engine)
 
     for difficulty, queries in test_queries.items():
         print(f"\n{'='*70}")
@@ -343,7 +327,7 @@ def run_tests():
         difficulty_sources = {}
 
         for query in queries:
-            results = search(query, model, index, documents)
+            results = suite_results[query]
 
             # Aggregate source stats
             sources = analyze_results(results)
@@ -13,14 +13,18 @@ Strategy:
 - Add heavy weighting to these pairs in training
 """
 
-import json
+import os
 import random
+import sys
 from pathlib import Path
 
+# Repo root on the path for the shared record reader
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from json_stream import load_records, write_records
+
 # Load documents
 print("Loading documents...")
-with open('training/documents.json', 'r', encoding='utf-8') as f:
-    documents = json.load(f)
+documents = load_records('training/documents.json', key='documents')
 
 # Find Wikipedia articles for each topic
 wikipedia_docs = [doc for doc in documents if doc['source'] in ['wikipedia', 'simple_wikipedia']]
@@ -294,8 +298,7 @@ print(f"\nTotal new training pairs: {len(training_pairs)}")
 # ============================================================================
 
 output_file = 'training/targeted_wiki_pairs_v7.json'
-with open(output_file, 'w', encoding='utf-8') as f:
-    json.dump(training_pairs, f, indent=2, ensure_ascii=False)
+write_records(output_file, training_pairs)
 
 print(f"\n✅ Saved {len(training_pairs)} targeted Wikipedia pairs to {output_file}")
 
@@ -15,26 +15,29 @@ The new 560 pairs will teach the model to associate:
 This should fix the 3 problem queries while keeping everything else working!
 """
 
-import json
+import os
+import sys
+from itertools import chain
+
+# Repo root on the path for the shared record reader
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from json_stream import load_records, write_records
 
 # Load V6 training data
 print("Loading V6 training data...")
-with open('training/training_dataset_v6.json', 'r', encoding='utf-8') as f:
-    v6_data = json.load(f)
+v6_data = load_records('training/training_dataset_v6.json')
 
 print(f"✅ V6 data loaded: {len(v6_data)} training pairs")
 
 # Load new targeted Wikipedia pairs
 print("\nLoading targeted Wikipedia pairs...")
-with open('training/targeted_wiki_pairs_v7.json', 'r', encoding='utf-8') as f:
-    targeted_pairs_raw = json.load(f)
+targeted_pairs_raw = load_records('training/targeted_wiki_pairs_v7.json')
 
 print(f"✅ Targeted pairs loaded: {len(targeted_pairs_raw)} pairs")
 
 # Load documents to get content for positive examples
 print("\nLoading documents...")
-with open('training/documents.json', 'r', encoding='utf-8') as f:
-    documents = json.load(f)
+documents = load_records('training/documents.json', key='documents')
 
 # Create a lookup dict
 doc_lookup = {doc['id']: doc for doc in documents}
@@ -78,13 +81,13 @@ print("\n" + "="*70)
 print("CREATING V7 DATASET")
 print("="*70)
 
-# Combine V6 + new targeted pairs
-v7_data = v6_data + converted_pairs
+# Combine V6 + new targeted pairs (chained when read, not copied into a third list)
+v7_total = len(v6_data) + len(converted_pairs)
 
 print(f"\nV7 Dataset Summary:")
 print(f"  V6 pairs: {len(v6_data)}")
 print(f"  New targeted pairs: {len(converted_pairs)}")
-print(f"  Total V7 pairs: {len(v7_data)}")
+print(f"  Total V7 pairs: {v7_total}")
 
 # ============================================================================
 # ANALYZE SOURCE DISTRIBUTION
@@ -104,7 +107,7 @@ for pair in v6_data:
         v6_sources.append(doc_lookup[pos_id]['source'])
 
 v7_sources = []
-for pair in v7_data:
+for pair in chain(v6_data, converted_pairs):
     pos_id = pair['positive_id']
     if pos_id in doc_lookup:
         v7_sources.append(doc_lookup[pos_id]['source'])
@@ -141,12 +144,11 @@ for source in ['wikipedia', 'simple_wikipedia', 'youtube', 'arxiv', 'mit_ocw', '
 # ============================================================================
 
 output_file = 'training/training_dataset_v7.json'
-with open(output_file, 'w', encoding='utf-8') as f:
-    json.dump(v7_data, f, indent=2, ensure_ascii=False)
+write_records(output_file, chain(v6_data, converted_pairs))
 
 print("\n" + "="*70)
 print(f"✅ SAVED V7 DATASET: {output_file}")
 print("="*70)
-print(f"Total pairs: {len(v7_data)}")
+print(f"Total pairs: {v7_total}")
 print(f"\nV7 is ready for training!")
 print("="*70)
@@ -13,11 +13,15 @@ We'll compare:
 5. OnlineContrastiveLoss
 """
 
-import json
+import os
+import sys
+
+# Repo root on the path for the shared record reader
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from json_stream import load_records
 
 # Load your data
-with open('training/training_dataset_v7.json', 'r', encoding='utf-8') as f:
-    training_data = json.load(f)
+training_data = load_records('training/training_dataset_v7.json')
 
 print("="*80)
 print("TRAINING TECHNIQUE EVALUATION")
@@ -24,6 +24,12 @@ import torch
 from sentence_transformers import SentenceTransformer, InputExample, losses
 from torch.utils.data import DataLoader
 from datetime import datetime
+import os
+import sys
+
+# Repo root on the path for the shared record reader
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from json_stream import load_records
 
 # ============================================================================
 # CONFIGURATION
@@ -46,8 +52,7 @@ print("TRAINING MODEL V7")
 print("="*70)
 
 print(f"\nLoading training data from {TRAINING_DATA}...")
-with open(TRAINING_DATA, 'r', encoding='utf-8') as f:
-    training_data = json.load(f)
+training_data = load_records(TRAINING_DATA)
 
 print(f"✅ Loaded {len(training_data)} training examples")
 
@@ -11,16 +11,20 @@ It will:
 4. Compare with V6 settings
 """
 
-import json
 import math
+import os
+import sys
+
+# Repo root on the path for the shared record reader
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from json_stream import load_records
 
 # Load V7 training data
 print("="*70)
 print("HYPERPARAMETER VALIDATION FOR MODEL V7")
 print("="*70)
 
-with open('training/training_dataset_v7.json', 'r', encoding='utf-8') as f:
-    training_data = json.load(f)
+training_data = load_records('training/training_dataset_v7.json')
 
 dataset_size = len(training_data)
 print(f"\nDataset size: {dataset_size} training pairs")
@@ -0,0 +1,686 @@
+"""
+Search Bundle - Superconductor Search
+======================================
+
+Everything a running search service needs, loaded as one unit: the query
+encoder, the index artifact (embeddings, document / passage stores), the
+BM25 and filter indexes, the FAISS index, the query caches and the
+request batcher, plus the batched search over them.
+
+Loading is split into named stages (SearchBundle.stages()) so the app can
+run them in a background thread and report progress and timings while
+the HTTP server is already answering health checks. Requests hold a
+reference to one bundle for their whole lifetime, so a new bundle can be
+swapped in without disturbing searches in flight on the old one.
+
+Besides the built-in modes (dense, lexical, hybrid), extra ranking modes
+can be plugged in with register_ranker(); they are searched in the same
+batches and through the same caches. 'exact' (an exact float32 scan, even
+over an approximate or quantized index) is registered here, as the
+reference ranking for offline evaluation.
+
+The query path stages (tokenize, forward, scan, top_k, bm25, label) are
+timed with search_metrics spans.
+
+Usage:
+    bundle = SearchBundle(model_path, docs_path, index_dir)
+    bundle.load()                          # or run bundle.stages() one by one
+    results = bundle.search("meissner effect", 10)
+"""
+
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from build_search_index import (
+    build_index,
+    compute_corpus_hash,
+    compute_model_fingerprint,
+    DIFFICULTY_LABELS,
+    INDEX_TYPES,
+    RESCORE_FACTOR,
+    is_quantized,
+    load_index_artifact,
+    open_faiss_index,
+    read_index_info,
+    search_faiss_index,
+)
+from query_cache import (
+    CACHE_TTL_SECONDS,
+    QUERY_CACHE_SIZE,
+    RESULT_CACHE_SIZE,
+    LRUCache,
+    QueryEmbeddingCache,
+    normalize_query,
+)
+from bm25_index import HYBRID_DEPTH, reciprocal_rank_fusion
+from encoder import encoder_version, load_encoder, resolve_backend
+from passages import (
+    AGGREGATION,
+    AGGREGATIONS,
+    CHUNK_OVERLAP,
+    CHUNK_WORDS,
+    PASSAGE_CANDIDATE_FACTOR,
+    TOP_M,
+    aggregate_passage_hits,
+    aggregate_passage_scores,
+    best_passages,
+    make_snippet,
+)
+from query_batcher import BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS, QueryBatcher
+from search_metrics import annotate, instrument_encoder, span
+from search_filters import (
+    FILTER_EXACT_MAX_ROWS,
+    FilterIndex,
+    Partition,
+    faiss_search_parameters,
+    normalize_filters,
+)
+
+SEARCH_MODES = ['dense', 'lexical', 'hybrid']
+EXACT_SCAN_BLOCK = 1 << 26   # Similarity matrix elements per exact-scan GEMM (256 MB float32)
+
+class Ranker(ABC):
+    """
+    A pluggable search mode: ranks a batch of queries over a loaded bundle.
+
+    Subclasses implement rank() (a ranker without it cannot be instantiated);
+    uses_embeddings=False rankers get query_embeddings=None (no encode call
+    is made for them).
+    """
+
+    uses_embeddings = True
+
+    @abstractmethod
+    def rank(self, bundle: 'SearchBundle', queries: List[str], query_embeddings: Optional[np.ndarray],
+             k: int, partition: Optional[Partition] = None) -> tuple:
+        """
+        Returns:
+            (indices, scores, passage_ids), each (b, <= k), best first (-1 = empty slot)
+        """
+
+class ExactRanker(Ranker):
+    """Exact float32 scan over every passage, whatever the index type."""
+
+    def rank(self, bundle, queries, query_embeddings, k, partition=None):
+        return bundle.exact_search(query_embeddings, k, partition)
+
+# Extra search modes (name -> Ranker), searched alongside SEARCH_MODES
+RANKERS: Dict[str, Ranker] = {}
+
+def register_ranker(name: str, ranker: Ranker):
+    """Make a Ranker available as search mode `name` in every bundle."""
+    if name in SEARCH_MODES:
+        raise ValueError(f"'{name}' is a built-in search mode")
+    RANKERS[name] = ranker
+
+def search_modes() -> List[str]:
+    """Built-in and registered search modes."""
+    return SEARCH_MODES + list(RANKERS)
+
+register_ranker('exact', ExactRanker())
+
+def select_top_k(similarities: np.ndarray, top_k: int) -> tuple:
+    """
+    Select the top-k indices along the last axis, best first.
+
+    Uses argpartition (O(n)) to select the top-k, then sorts only those k.
+    Works on a single score vector (n,) or a batch of them (b, n).
+
+    Returns:
+        (indices, scores) with last dimension min(top_k, n)
+    """
+    top_k = min(top_k, similarities.shape[-1])
+    if top_k <= 0:
+        empty = similarities[..., :0]
+        return empty.astype(np.int64), empty
+
+    # Select top-k without sorting the whole corpus, then order those k
+    top_indices = np.argpartition(-similarities, top_k - 1, axis=-1)[..., :top_k]
+    top_scores = np.take_along_axis(similarities, top_indices, axis=-1)
+    order = np.argsort(-top_scores, axis=-1)
+    return np.take_along_axis(top_indices, order, axis=-1), np.take_along_axis(top_scores, order, axis=-1)
+
+class SearchBundle:
+    """A loaded (model, index, metadata) version and the search path over it."""
+
+    def __init__(self, model_path: str, docs_path: str, index_dir: str,
+                 encoder_backend: Optional[str] = None, version: Optional[str] = None,
+                 allow_rebuild: bool = True):
+        """
+        Args:
+            model_path: Query encoder directory
+            docs_path: Raw corpus (only hashed, to check the index is up to date)
+            index_dir: Index artifact directory
+            encoder_backend: One of ENCODER_BACKENDS (default: ENCODER_BACKEND env)
+            version: Bundle version name (bundle_watcher), for status reporting
+            allow_rebuild: Re-encode the corpus into index_dir if the artifact is
+                           stale (otherwise loading fails)
+        """
+        self.model_path = model_path
+        self.docs_path = docs_path
+        self.index_dir = index_dir
+        self.encoder_backend = resolve_backend(encoder_backend)
+        self.version = version
+        self.allow_rebuild = allow_rebuild
+        self.search_batcher = None
+        # Requests using the batcher, so a retired bundle closes it only once they are done
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._retired = False
+
+    # ------------------------------------------------------------------------
+    # Loading stages
+    # ------------------------------------------------------------------------
+
+    def stages(self) -> List[Tuple[str, Callable[[], None]]]:
+        """Named loading steps, in order."""
+        return [
+            ('model', self.load_model),
+            ('index', self.load_index),
+            ('passages', self.load_passages),
+            ('bm25', self.load_bm25),
+            ('filters', self.load_filters),
+            ('ann', self.load_ann),
+            ('caches', self.load_caches),
+        ]
+
+    def load(self) -> 'SearchBundle':
+        """Run every stage in the calling thread."""
+        for _, stage in self.stages():
+            stage()
+        return self
+
+    def load_model(self):
+        """Query encoder, with the configured CPU backend."""
+        print("📥 Loading Model V7...")
+        self.model = instrument_encoder(load_encoder(self.model_path, self.encoder_backend))
+        print(f"✅ Model V7 loaded from: {self.model_path} (backend: {self.encoder_backend})")
+
+    def load_index(self):
+        """Prebuilt index artifact (re-encode only if model or corpus changed)."""
+        print("📥 Loading search index...")
+        artifact = load_index_artifact(
+            self.index_dir,
+            model_fingerprint=compute_model_fingerprint(self.model_path),
+            corpus_hash=compute_corpus_hash(self.docs_path),
+        )
+        if artifact is None and not self.allow_rebuild:
+            raise FileNotFoundError(f"No current index artifact in {self.index_dir}/ for "
+                                    f"{self.model_path} - build it with build_search_index.py first")
+        if artifact is None:
+            print("🔄 Encoding documents and saving index artifact...")
+            # Keep the index type / params of the stale artifact, if it had a known one
+            previous_info = read_index_info(self.index_dir) or {}
+            if previous_info.get('index_type') not in INDEX_TYPES:
+                previous_info = {'index_type': 'flat'}
+            previous_chunking = previous_info.get('chunking', {})
+            # Documents are always encoded with the reference (PyTorch) model
+            artifact = build_index(model=self.model if self.encoder_backend == 'torch' else None,
+                                   model_path=self.model_path,
+                                   documents_file=self.docs_path, index_output=self.index_dir,
+                                   index_type=previous_info['index_type'],
+                                   build_params=previous_info.get('index_params'),
+                                   search_params=previous_info.get('search_params'),
+                                   chunk_words=previous_chunking.get('chunk_words', CHUNK_WORDS),
+                                   chunk_overlap=previous_chunking.get('chunk_overlap', CHUNK_OVERLAP))
+        self.artifact = artifact
+        self.index_info = artifact['info']
+        self.doc_embeddings = artifact['embeddings']
+        self.doc_store = artifact['documents']
+        # Difficulty codes (index into DIFFICULTY_LABELS) are precomputed by the index
+        # builder, so the difficulty sort never has to decode a document
+        self.doc_difficulty = self.doc_store.difficulty
+        print(f"✅ Passage embeddings ready: {self.doc_embeddings.shape} (memory-mapped)")
+        print(f"✅ Document store ready: {len(self.doc_store)} documents")
+
+    def load_passages(self):
+        """Passage hits are folded into documents (max, or mean of the top-m passages)."""
+        self.passage_store = self.artifact['passages']
+        self.passage_doc = self.passage_store.doc
+        self.doc_offsets = self.passage_store.doc_offsets
+        self.passage_aggregation = os.environ.get('SEARCH_PASSAGE_AGGREGATION', AGGREGATION)
+        if self.passage_aggregation not in AGGREGATIONS:
+            raise ValueError(f"SEARCH_PASSAGE_AGGREGATION must be one of {AGGREGATIONS}")
+        self.passage_top_m = int(os.environ.get('SEARCH_PASSAGE_TOP_M', TOP_M))
+        print(f"✅ Passages ready: {len(self.passage_store)} passages "
+              f"({self.index_info.get('chunking', {})}, aggregation: {self.passage_aggregation})")
+
+    def load_bm25(self):
+        """Lexical side of hybrid search: BM25 over the same passages."""
+        self.bm25_index = self.artifact['bm25']
+        self.default_search_mode = os.environ.get('SEARCH_MODE', 'hybrid')
+        if self.default_search_mode not in search_modes():
+            raise ValueError(f"SEARCH_MODE must be one of {search_modes()}")
+        self.hybrid_depth = int(os.environ.get('SEARCH_HYBRID_DEPTH', HYBRID_DEPTH))
+        print(f"✅ BM25 index ready: {len(self.bm25_index.vocab):,} terms "
+              f"(default mode: {self.default_search_mode})")
+
+    def load_filters(self):
+        """Filters resolve to cached partitions (document mask, passage rows, FAISS selector)."""
+        self.filter_index = FilterIndex(self.index_dir, self.passage_doc)
+        self.filter_exact_max_rows = int(os.environ.get('SEARCH_FILTER_EXACT_MAX_ROWS',
+                                                        FILTER_EXACT_MAX_ROWS))
+
+    def load_ann(self):
+        """
+        Approximate (HNSW / IVF) and quantized indexes are searched through
+        FAISS; flat float32 uses the exact scan.
+        """
+        index_info = self.index_info
+        self.ann_index = None
+        self.rescore_embeddings = None
+        self.rescore_factor = RESCORE_FACTOR
+        if index_info['index_type'] == 'flat' and not is_quantized(index_info):
+            return
+
+        search_overrides = {
+            'efSearch': int(os.environ['SEARCH_EF_SEARCH']) if os.environ.get('SEARCH_EF_SEARCH') else None,
+            'nprobe': int(os.environ['SEARCH_NPROBE']) if os.environ.get('SEARCH_NPROBE') else None,
+        }
+        self.ann_index = open_faiss_index(self.index_dir, index_info, search_overrides)
+        print(f"✅ {index_info['index_type']} index loaded ({index_info['search_params']}, overrides: "
+              f"{ {k: v for k, v in search_overrides.items() if v} })")
+
+        if is_quantized(index_info):
+            # Quantized scores are re-ranked against the (memory-mapped) float32 rows
+            self.rescore_embeddings = self.doc_embeddings
+            self.rescore_factor = int(os.environ.get('SEARCH_RESCORE_FACTOR',
+                                                     index_info.get('rescore_factor', RESCORE_FACTOR)))
+            print(f"✅ Quantized vectors ({index_info['index_params'].get('quantization', 'pq')}), "
+                  f"rescoring {self.rescore_factor}x candidates in float32")
+
+    def load_caches(self):
+        """Query caches and the request batcher (started last: the bundle is usable after this)."""
+        # Embeddings depend only on the model, result lists also on the index
+        cache_ttl = float(os.environ['QUERY_CACHE_TTL']) if os.environ.get('QUERY_CACHE_TTL') else CACHE_TTL_SECONDS
+        model_version = encoder_version(self.index_info['model_fingerprint'], self.encoder_backend)
+        self.query_embedding_cache = QueryEmbeddingCache(
+            max_size=int(os.environ.get('QUERY_CACHE_SIZE', QUERY_CACHE_SIZE)),
+            ttl_seconds=cache_ttl,
+            version=model_version,
+        )
+        self.result_cache = LRUCache(
+            max_size=int(os.environ.get('RESULT_CACHE_SIZE', RESULT_CACHE_SIZE)),
+            ttl_seconds=cache_ttl,
+            version=f"{model_version}:{self.index_info['corpus_hash']}:{self.index_info['created_at']}",
+        )
+        print(f"✅ Query caches ready ({self.query_embedding_cache.max_size} embeddings, "
+              f"{self.result_cache.max_size} result lists)")
+
+        # Concurrent requests are coalesced into batches for search_batch
+        self.search_batcher = QueryBatcher(
+            self.search_batch,
+            max_batch_size=int(os.environ.get('SEARCH_BATCH_MAX_SIZE', BATCH_MAX_SIZE)),
+            max_wait_ms=float(os.environ.get('SEARCH_BATCH_MAX_WAIT_MS', BATCH_MAX_WAIT_MS)),
+        )
+
+    def close(self):
+        """Stop the batcher once the requests already queued are answered."""
+        if self.search_batcher is not None:
+            self.search_batcher.close()
+
+    def retire(self, poll_seconds: float = 0.05):
+        """
+        Close the bundle after a swap, once the requests running on it are done.
+
+        Requests that still reach a retired bundle are served unbatched.
+        """
+        with self._lock:
+            self._retired = True
+        while self._in_flight:
+            time.sleep(poll_seconds)
+        self.close()
+
+    def describe(self) -> Dict:
+        """Version summary of the loaded bundle (for status endpoints)."""
+        return {
+            'version': self.version,
+            'model_path': self.model_path,
+            'encoder_backend': self.encoder_backend,
+            'index_dir': self.index_dir,
+            'model_fingerprint': self.index_info['model_fingerprint'],
+            'corpus_hash': self.index_info['corpus_hash'],
+            'index_created_at': self.index_info['created_at'],
+            'index_type': self.index_info['index_type'],
+            'num_documents': len(self.doc_store),
+            'num_passages': len(self.passage_store),
+        }
+
+    # ------------------------------------------------------------------------
+    # Ranking helpers
+    # ------------------------------------------------------------------------
+
+    def top_documents(self, similarities: np.ndarray, top_k: int,
+                      doc_offsets: Optional[np.ndarray] = None,
+                      passage_doc: Optional[np.ndarray] = None) -> tuple:
+        """
+        Top-k documents from exact passage similarities.
+
+        Args:
+            similarities: (b, n_passages) similarity scores
+            doc_offsets / passage_doc: Grouping of the scored passages into
+                documents (default: the whole index; a partition passes its own)
+
+        Returns:
+            (doc_indices, scores, passage_indices), each (b, <= top_k), best first;
+            passage_indices is the best-matching passage of each document
+        """
+        doc_offsets = self.doc_offsets if doc_offsets is None else doc_offsets
+        passage_doc = self.passage_doc if passage_doc is None else passage_doc
+        if self.passage_aggregation == 'max':
+            # Exact: max over each document's passages, then top-k documents
+            doc_scores = aggregate_passage_scores(similarities, doc_offsets)
+            indices, scores = select_top_k(doc_scores, top_k)
+            return indices, scores, best_passages(similarities, indices, doc_offsets)
+
+        # Top-m mean: aggregate the best passages only
+        hit_ids, hit_scores = select_top_k(similarities, top_k * PASSAGE_CANDIDATE_FACTOR)
+        return aggregate_passage_hits(hit_ids, hit_scores, passage_doc, top_k,
+                                      self.passage_aggregation, self.passage_top_m)
+
+    def get_best_results(self, similarities: np.ndarray, top_k: int = 10,
+                         sort_by_difficulty: bool = False) -> list:
+        """
+        Get top-k results sorted by similarity score.
+
+        Args:
+            similarities: Similarity scores for all passages
+            top_k: Number of results to return
+            sort_by_difficulty: If True, sort results by difficulty (Beginner → Advanced)
+                              while preserving semantic relevance within each tier
+
+        Returns:
+            List of result dicts (see label_results)
+        """
+        indices, scores, passage_ids = self.top_documents(similarities[np.newaxis], top_k)
+        return self.label_results(indices[0], scores[0], sort_by_difficulty, passage_ids[0])
+
+    def label_results(self, indices: np.ndarray, scores: np.ndarray, sort_by_difficulty: bool = False,
+                      passage_ids: Optional[np.ndarray] = None) -> list:
+        """
+        Attach document fields and difficulty labels to ranked hits.
+
+        Args:
+            indices: Document indices, best first (-1 = empty FAISS slot, skipped)
+            scores: Similarity score for each index
+            passage_ids: Best-matching passage of each document (for the snippet)
+
+        Returns:
+            List of JSON-ready dicts: rank, id, title, source, difficulty, url, score, snippet
+        """
+        if passage_ids is None:
+            passage_ids = np.full(len(indices), -1)
+        valid = (indices >= 0) & (scores > -np.inf)
+        indices, scores, passage_ids = indices[valid], scores[valid], passage_ids[valid]
+
+        # Sort by difficulty first (ascending), then by similarity (descending) within each tier
+        if sort_by_difficulty:
+            order = np.lexsort((-scores, self.doc_difficulty[indices]))
+            indices, scores, passage_ids = indices[order], scores[order], passage_ids[order]
+
+        results = []
+        for rank, (idx, score, passage_id) in enumerate(zip(indices, scores, passage_ids), 1):
+            doc = self.doc_store[idx]
+            results.append({
+                'rank': rank,
+                'id': doc['id'],
+                'title': doc['title'] or 'Untitled',
+                'source': doc['source'] or 'unknown',
+                'difficulty': DIFFICULTY_LABELS[self.doc_difficulty[idx]],
+                'url': doc['url'] or '#',
+                'score': float(score),
+                'snippet': make_snippet(self.passage_store.text(passage_id)) if passage_id >= 0 else '',
+            })
+        return results
+
+    # ------------------------------------------------------------------------
+    # Batched search
+    # ------------------------------------------------------------------------
+
+    def exact_search(self, query_embeddings: np.ndarray, k: int,
+                     partition: Optional[Partition] = None) -> tuple:
+        """
+        Exact scan over all passages, or only over a filter partition's passages.
+
+        Large batches are scanned in blocks of queries, so the similarity
+        matrix stays under EXACT_SCAN_BLOCK elements. A partition scores
+        only its own rows, so its cost grows with the partition, not the corpus.
+
+        Returns:
+            (indices, scores, passage_ids), each (b, <= k), best first; slots
+            beyond the partition's documents have index -1
+        """
+        num_rows = len(self.passage_doc) if partition is None else len(partition.passage_rows)
+        block = max(1, EXACT_SCAN_BLOCK // max(1, num_rows))
+        if len(query_embeddings) > block:
+            parts = [self.exact_search(query_embeddings[start:start + block], k, partition)
+                     for start in range(0, len(query_embeddings), block)]
+            return tuple(np.concatenate(arrays) for arrays in zip(*parts))
+
+        # One matrix multiply (embeddings are L2-normalized: dot product = cosine)
+        if partition is None:
+            with span('scan'):
+                similarities = query_embeddings @ self.doc_embeddings.T
+            with span('top_k'):
+                return self.top_documents(similarities, k)
+
+        rows = partition.passage_rows
+        if not len(rows):
+            empty = np.full((len(query_embeddings), 0), -1, dtype=np.int64)
+            return empty, empty.astype(np.float32), empty
+        with span('scan'):
+            similarities = query_embeddings @ np.asarray(self.doc_embeddings[rows]).T
+        with span('top_k'):
+            # Positions within the partition, mapped back to document / passage rows
+            local_docs, scores, local_rows = self.top_documents(similarities, min(k, len(partition.doc_ids)),
+                                                                partition.doc_offsets, partition.row_doc)
+            found = local_docs >= 0
+            indices = np.where(found, partition.doc_ids[np.where(found, local_docs, 0)], -1)
+            passage_ids = np.where(found, rows[np.where(found, local_rows, 0)], -1)
+        return indices, scores, passage_ids
+
+    def dense_search(self, query_embeddings: np.ndarray, k: int,
+                     partition: Optional[Partition] = None) -> tuple:
+        """
+        Embedding search for a batch of queries (one search call).
+
+        Args:
+            query_embeddings: (b, dim) L2-normalized queries
+            partition: Restrict results to a filter partition
+
+        Returns:
+            (indices, scores, passage_ids), each (b, <= k), best first
+        """
+        if self.ann_index is None or (partition is not None
+                                      and len(partition.passage_rows) <= self.filter_exact_max_rows):
+            # Flat index, or a partition small enough to scan exactly
+            return self.exact_search(query_embeddings, k, partition)
+
+        # Approximate / quantized search: one FAISS call for the whole batch,
+        # fetching enough passages to fill k distinct documents
+        params = faiss_search_parameters(self.ann_index, partition.selector) if partition is not None else None
+        fetch = k * PASSAGE_CANDIDATE_FACTOR if len(self.passage_doc) > len(self.doc_store) else k
+        with span('scan'):
+            hit_scores, hit_ids = search_faiss_index(self.ann_index, query_embeddings, fetch,
+                                                     self.rescore_embeddings, self.rescore_factor, params)
+        with span('top_k'):
+            hits = aggregate_passage_hits(hit_ids, hit_scores, self.passage_doc, k,
+                                          self.passage_aggregation, self.passage_top_m)
+
+        # A selective filter can leave the graph / probed lists short of k: scan the partition
+        if partition is not None and ((hits[0] >= 0).sum(axis=1) < min(k, partition.num_docs)).any():
+            return self.exact_search(query_embeddings, k, partition)
+        return hits
+
+    def lexical_search(self, queries: list, k: int, partition: Optional[Partition] = None) -> tuple:
+        """
+        BM25 search for a batch of queries (best passage per document).
+
+        Returns:
+            (indices, scores, passage_ids), each (b, k), best first (-1 = no match)
+        """
+        fetch = k * PASSAGE_CANDIDATE_FACTOR if len(self.passage_doc) > len(self.doc_store) else k
+        row_mask = partition.passage_mask if partition is not None else None
+        with span('bm25'):
+            hit_ids, hit_scores = self.bm25_index.search_many(queries, fetch, row_mask)
+        with span('top_k'):
+            return aggregate_passage_hits(hit_ids, hit_scores, self.passage_doc, k)
+
+    @staticmethod
+    def fuse_results(dense: tuple, lexical: tuple, k: int) -> tuple:
+        """Reciprocal rank fusion of one query's dense and lexical (indices, scores, passage_ids)."""
+        indices, scores = reciprocal_rank_fusion([dense[0], lexical[0]], k)
+        # Snippet: the dense best passage, or the BM25 one for lexical-only hits
+        best_passage = {**dict(zip(lexical[0].tolist(), lexical[2].tolist())),
+                        **dict(zip(dense[0].tolist(), dense[2].tolist()))}
+        passage_ids = np.array([best_passage[i] for i in indices.tolist()], dtype=np.int64)
+        return indices, scores, passage_ids
+
+    def search_batch(self, requests: list) -> list:
+        """
+        Search a batch of (query, k, mode, filter_key) requests.
+
+        All queries that need an embedding share one encode call and, per
+        distinct filter, one search call per ranking; hybrid requests fuse
+        the top hybrid_depth documents of both rankings.
+
+        Returns:
+            List of (indices, scores, passage_ids) arrays per request, best first
+        """
+        max_k = max(k for _, k, _, _ in requests)
+        depth = max(max_k, self.hybrid_depth) if any(mode == 'hybrid' for _, _, mode, _ in requests) else max_k
+
+        embed_rows = [i for i, (_, _, mode, _) in enumerate(requests)
+                      if mode in ('dense', 'hybrid') or (mode in RANKERS and RANKERS[mode].uses_embeddings)]
+        dense_rows = [i for i, (_, _, mode, _) in enumerate(requests) if mode in ('dense', 'hybrid')]
+        lexical_rows = [i for i, (_, _, mode, _) in enumerate(requests) if mode in ('lexical', 'hybrid')]
+        ranker_rows = [i for i, (_, _, mode, _) in enumerate(requests) if mode in RANKERS]
+
+        # One forward pass for every uncached query in the batch (tokenization is its own span)
+        if embed_rows:
+            with span('forward'):
+                query_embeddings = self.query_embedding_cache.encode_many(
+                    self.model, [requests[i][0] for i in embed_rows])
+        embedding_row = {i: position for position, i in enumerate(embed_rows)}
+
+        dense_hits, lexical_hits = {}, {}
+        for rows, hits, search_fn in ((dense_rows, dense_hits, self.dense_search),
+                                      (lexical_rows, lexical_hits, self.lexical_search)):
+            groups = {}
+            for i in rows:
+                groups.setdefault(requests[i][3], []).append(i)
+            for filter_key, members in groups.items():
+                partition = self.filter_index.partition(filter_key) if filter_key else None
+                if search_fn == self.dense_search:
+                    inputs = query_embeddings[[embedding_row[i] for i in members]]
+                else:
+                    inputs = [requests[i][0] for i in members]
+                arrays = search_fn(inputs, depth, partition)
+                for j, i in enumerate(members):
+                    hits[i] = tuple(array[j] for array in arrays)
+
+        # Registered rankers: one rank call per (mode, filter)
+        ranker_hits = {}
+        groups = {}
+        for i in ranker_rows:
+            groups.setdefault((requests[i][2], requests[i][3]), []).append(i)
+        for (mode, filter_key), members in groups.items():
+            ranker = RANKERS[mode]
+            partition = self.filter_index.partition(filter_key) if filter_key else None
+            embeddings = query_embeddings[[embedding_row[i] for i in members]] if ranker.uses_embeddings else None
+            arrays = ranker.rank(self, [requests[i][0] for i in members], embeddings,
+                                 max(requests[i][1] for i in members), partition)
+            for j, i in enumerate(members):
+                ranker_hits[i] = tuple(array[j] for array in arrays)
+
+        results = []
+        for i, (_, k, mode, _) in enumerate(requests):
+            if mode == 'hybrid':
+                results.append(self.fuse_results(dense_hits[i], lexical_hits[i], k))
+            else:
+                hits = {'dense': dense_hits, 'lexical': lexical_hits}.get(mode, ranker_hits)[i]
+                results.append(tuple(array[:k] for array in hits))
+        return results
+
+    # ------------------------------------------------------------------------
+    # Search functions
+    # ------------------------------------------------------------------------
+
+    def resolve_mode(self, mode: Optional[str]) -> str:
+        """mode, or the default one (ValueError if it is not a known mode)."""
+        mode = mode or self.default_search_mode
+        if mode not in search_modes():
+            raise ValueError(f"mode must be one of {search_modes()}")
+        return mode
+
+    def search(self, query: str, num_results: int = 10, sort_by_difficulty: bool = False,
+               mode: Optional[str] = None, filters: Optional[Dict] = None) -> list:
+        """
+        Search for documents matching the query.
+
+        Args:
+            query: Search query string (non-empty)
+            num_results: Number of results to return
+            sort_by_difficulty: If True, sort results by difficulty (Beginner → Advanced)
+            mode: One of search_modes() (default: SEARCH_MODE)
+            filters: e.g. {'difficulty': ['Beginner'], 'source': ['arxiv']} (see search_filters)
+
+        Returns:
+            List of result dicts (see label_results)
+        """
+        mode = self.resolve_mode(mode)
+        filter_key = normalize_filters(filters)
+        cache_key = (normalize_query(query), num_results, bool(sort_by_difficulty), mode, filter_key)
+        results = self.result_cache.get(cache_key)
+        annotate(mode=mode, k=num_results, cache='hit' if results is not None else 'miss')
+
+        if results is None:
+            with self._lock:
+                batched = not self._retired
+                self._in_flight += batched
+            try:
+                # Encode + search, batched with any concurrent requests
+                request = (query, num_results, mode, filter_key)
+                indices, scores, passage_ids = (self.search_batcher(request) if batched
+                                                else self.search_batch([request])[0])
+            finally:
+                with self._lock:
+                    self._in_flight -= batched
+
+            # Label results (sorted by similarity or difficulty)
+            with span('label'):
+                results = self.label_results(indices, scores, sort_by_difficulty, passage_ids)
+
+            self.result_cache.put(cache_key, results)
+
+        return results
+
+    def search_many(self, queries: list, num_results: int = 10, sort_by_difficulty: bool = False,
+                    mode: Optional[str] = None, filters: Optional[Dict] = None) -> list:
+        """
+        Search several queries at once (cache misses go through one search_batch call).
+
+        Returns:
+            One result list per query, in order
+        """
+        mode = self.resolve_mode(mode)
+        filter_key = normalize_filters(filters)
+        cache_keys = [(normalize_query(q), num_results, bool(sort_by_difficulty), mode, filter_key)
+                      for q in queries]
+        all_results = [self.result_cache.get(key) for key in cache_keys]
+
+        missing = [i for i, results in enumerate(all_results) if results is None]
+        annotate(mode=mode, k=num_results, queries=len(queries), cache_misses=len(missing))
+        if missing:
+            hits = self.search_batch([(queries[i], num_results, mode, filter_key) for i in missing])
+            with span('label'):
+                for i, (indices, scores, passage_ids) in zip(missing, hits):
+                    all_results[i] = self.label_results(indices, scores, sort_by_difficulty, passage_ids)
+                    self.result_cache.put(cache_keys[i], all_results[i])
+
+        return all_results
@@ -0,0 +1,67 @@
+"""
+Search Engine - Superconductor Search
+======================================
+
+The shared search library behind every entry point: app.py,
+interactive_search.py, test_search_model.py and
+scripts/testing/test_model_v7.py all load and query the engine through
+this module, so they search the same index the same way.
+
+Features:
+- One loader: the query encoder plus the index artifact written by
+  build_search_index.py (passages over the full document text); a missing
+  or stale artifact is rebuilt
+- search(query, k) and batched search_many(queries, k): one encode call
+  and one index search per batch
+- Search modes: dense, lexical and hybrid, plus pluggable rankers
+  (subclass Ranker, register_ranker('name', ranker), then mode='name')
+
+Usage:
+    from search_engine import load_search_engine
+
+    engine = load_search_engine()
+    results = engine.search("meissner effect", 10)
+    batch = engine.search_many(["cooper pairs", "flux pinning"], 10, mode='dense')
+"""
+
+from typing import Optional
+
+# Public surface of the library (SearchBundle is the engine class)
+from search_bundle import (
+    RANKERS,
+    SEARCH_MODES,
+    ExactRanker,
+    Ranker,
+    SearchBundle,
+    register_ranker,
+    search_modes,
+    select_top_k,
+)
+
+# Defaults (relative to the repository root, as in app.py)
+MODEL_PATH = 'models/superconductor-search-v7'
+DOCUMENTS_FILE = 'training/documents.json'
+INDEX_DIR = 'search_index'
+
+def load_search_engine(model_path: str = MODEL_PATH, index_dir: str = INDEX_DIR,
+                       docs_path: str = DOCUMENTS_FILE, encoder_backend: Optional[str] = None,
+                       allow_rebuild: bool = True) -> SearchBundle:
+    """
+    Load the search engine (model, index artifact, caches) in the calling thread.
+
+    Args:
+        model_path: Query encoder directory
+        index_dir: Index artifact directory (build_search_index.py --output)
+        docs_path: Corpus the index is built from
+        encoder_backend: One of ENCODER_BACKENDS (default: ENCODER_BACKEND env)
+        allow_rebuild: Re-encode the corpus if the artifact is missing or stale
+
+    Returns:
+        Loaded SearchBundle
+    """
+    print("🔧 Initializing search engine...")
+    engine = SearchBundle(model_path, docs_path, index_dir, encoder_backend,
+                          allow_rebuild=allow_rebuild).load()
+    print(f"✅ Search engine ready: {len(engine.doc_store):,} documents, "
+          f"{len(engine.passage_store):,} passages, {engine.doc_embeddings.shape[1]}-dimensional embeddings")
+    return engine
@@ -0,0 +1,156 @@
+"""
+Search Filters - Superconductor Search
+=======================================
+
+Metadata filters (source, difficulty, type, focus_area) applied inside
+the search rather than to an already-truncated top-k list.
+
+Each distinct filter resolves to a partition: the document mask, the
+passage rows it covers and a FAISS ID selector. Partitions are cached, so
+repeated filters ("only beginner", "only arXiv") cost nothing to resolve.
+Small partitions are scanned exactly; larger ones are searched through the
+FAISS index with an ID selector, falling back to an exact scan of the
+partition if the approximate search comes back short of k.
+
+Usage:
+    search(query, k, filters={'difficulty': ['Beginner'], 'source': ['arxiv']})
+"""
+
+import json
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+import faiss
+
+from query_cache import LRUCache
+
+# Filterable fields -> document metadata key
+FILTER_FIELDS = {
+    'source': 'source',
+    'difficulty': 'difficulty_label',
+    'type': 'type',
+    'focus_area': 'focus_area',
+}
+FILTER_CACHE_SIZE = 256          # Cached partitions (distinct filters)
+FILTER_EXACT_MAX_ROWS = 50000    # Partitions up to this many passages are scanned exactly
+
+def write_document_facets(metadata: List[Dict], index_output: str):
+    """
+    Write per-document facet codes for filtering.
+
+    Files:
+        document_facets.json  {field: [value, ...]} (position = code)
+        document_facets.npy   int16 (n_docs, n_fields) codes, fields in FILTER_FIELDS order
+    """
+    values = {field: {} for field in FILTER_FIELDS}
+    codes = np.zeros((len(metadata), len(FILTER_FIELDS)), dtype=np.int16)
+    for i, doc in enumerate(metadata):
+        for j, (field, key) in enumerate(FILTER_FIELDS.items()):
+            value = str(doc.get(key) or '')
+            codes[i, j] = values[field].setdefault(value, len(values[field]))
+
+    with open(os.path.join(index_output, 'document_facets.json'), 'w', encoding='utf-8') as f:
+        json.dump({field: list(v) for field, v in values.items()}, f, ensure_ascii=False)
+    np.save(os.path.join(index_output, 'document_facets.npy'), codes)
+
+def normalize_filters(filters: Optional[Dict]) -> Optional[tuple]:
+    """
+    Canonical, hashable form of a filter dict (None = no filter).
+
+    Values may be a string or a list of strings; matching is case-insensitive.
+    A field with several values matches any of them; fields are combined with AND.
+
+    Raises:
+        ValueError: For a field not in FILTER_FIELDS
+    """
+    if not filters:
+        return None
+    key = []
+    for field, values in filters.items():
+        if field not in FILTER_FIELDS:
+            raise ValueError(f"Unknown filter '{field}' (expected one of {list(FILTER_FIELDS)})")
+        if not values:
+            continue  # None / empty list = field not filtered
+        if isinstance(values, str):
+            values = [values]
+        key.append((field, tuple(sorted({str(v).strip().lower() for v in values}))))
+    return tuple(sorted(key)) or None
+
+class Partition:
+    """
+    Documents and passage rows matching one filter.
+
+    A document's passages are contiguous rows, so the partition's rows
+    group into its documents: doc_ids[j] owns rows
+    passage_rows[doc_offsets[j]:doc_offsets[j + 1]] (row_doc maps each row
+    back to j). An exact scan of the partition only touches these rows.
+    """
+
+    def __init__(self, doc_mask: np.ndarray, passage_doc: np.ndarray):
+        self.doc_mask = doc_mask
+        self.passage_mask = doc_mask[passage_doc]
+        self.passage_rows = np.flatnonzero(self.passage_mask)
+        self.num_docs = int(doc_mask.sum())
+
+        docs = passage_doc[self.passage_rows]
+        starts = np.flatnonzero(np.diff(docs, prepend=-1))
+        self.doc_ids = docs[starts].astype(np.int64)
+        self.doc_offsets = np.append(starts, len(docs))
+        self.row_doc = np.repeat(np.arange(len(starts)), np.diff(self.doc_offsets))
+        self._selector = None
+
+    @property
+    def selector(self) -> faiss.IDSelector:
+        """FAISS selector over the partition's passage rows (built on first use)."""
+        if self._selector is None:
+            self._selector = faiss.IDSelectorBatch(self.passage_rows.astype(np.int64))
+        return self._selector
+
+class FilterIndex:
+    """Resolves filters to cached partitions using the facet codes of the index artifact."""
+
+    def __init__(self, index_dir: str, passage_doc: np.ndarray,
+                 cache_size: int = FILTER_CACHE_SIZE):
+        with open(os.path.join(index_dir, 'document_facets.json'), 'r', encoding='utf-8') as f:
+            self.values = json.load(f)
+        self.codes = np.load(os.path.join(index_dir, 'document_facets.npy'))
+        self.passage_doc = passage_doc
+        self._lookup = {field: {v.lower(): [] for v in values} for field, values in self.values.items()}
+        for field, values in self.values.items():
+            for code, value in enumerate(values):
+                self._lookup[field][value.lower()].append(code)
+        self._cache = LRUCache(max_size=cache_size)
+
+    def partition(self, filter_key: tuple) -> Partition:
+        """Partition for a normalize_filters() key."""
+        partition = self._cache.get(filter_key)
+        if partition is None:
+            doc_mask = np.ones(len(self.codes), dtype=bool)
+            for field, values in filter_key:
+                column = list(FILTER_FIELDS).index(field)
+                allowed = [code for v in values for code in self._lookup[field].get(v, [])]
+                doc_mask &= np.isin(self.codes[:, column], allowed)
+            partition = Partition(doc_mask, self.passage_doc)
+            self._cache.put(filter_key, partition)
+        return partition
+
+    def facet_values(self) -> Dict[str, List[str]]:
+        """Filterable values per field (non-empty ones only)."""
+        return {field: sorted(v for v in values if v) for field, values in self.values.items()}
+
+def faiss_search_parameters(index, selector: faiss.IDSelector) -> faiss.SearchParameters:
+    """
+    SearchParameters restricting a FAISS search to selector.
+
+    Passing parameters replaces the index-level efSearch / nprobe, so the
+    index's current values are carried over.
+    """
+    if isinstance(index, faiss.IndexBinary):
+        return faiss.SearchParameters(sel=selector)
+    if isinstance(index, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=index.hnsw.efSearch)
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        return faiss.SearchParametersIVF(sel=selector, nprobe=ivf.nprobe)
+    return faiss.SearchParameters(sel=selector)
@@ -0,0 +1,115 @@
+"""
+Search HTML - Superconductor Search
+====================================
+
+Presentation layer for the Gradio UI: turns search result dicts (as
+returned by the JSON API) into the HTML result cards shown in app.py.
+"""
+
+from html import escape
+from typing import Dict, List
+
+# Colors for different difficulty levels
+DIFFICULTY_COLORS = {
+    'Beginner': '#16a34a',       # Green
+    'Intermediate': '#0ea5e9',   # Blue
+    'Advanced': '#f59e0b'        # Orange
+}
+
+SOURCE_EMOJIS = {
+    'arxiv': '📄',
+    'youtube': '📺',
+    'wikipedia': '📖',
+    'simple_wikipedia': '📘',
+    'mit_ocw': '🎓',
+    'scholarpedia': '📚',
+    'hyperphysics': '🔬'
+}
+
+EMPTY_QUERY_HTML = "<p style='color: red;'>Please enter a search query.</p>"
+NO_RESULTS_HTML = "<p style='color: orange;'>No results found. Try a different query.</p>"
+
+def render_header(query: str, num_results: int, sort_by_difficulty: bool) -> str:
+    """Summary box shown above the results."""
+    sort_info = "📚 Sorted: Beginner → Advanced (preserving relevance within each level)" if sort_by_difficulty else "🎯 Sorted: Most semantically relevant first"
+    return f"""
+    <div style='margin-bottom: 20px; padding: 15px; background: #1e293b;
+                border-left: 4px solid #8b5cf6; border-radius: 10px; border: 1px solid #334155;'>
+        <h3 style='color:#f1f5f9; margin: 0 0 8px 0;'>🔍 Search Results for: "{escape(query)}"</h3>
+        <p style='margin: 0 0 5px 0; color: #94a3b8; font-size: 0.95em;'>
+            Found <strong>{num_results}</strong> relevant results
+        </p>
+        <p style='margin: 0; color: #a78bfa; font-size: 0.85em; font-style: italic;'>
+            {sort_info}
+        </p>
+    </div>
+    """
+
+def render_result_card(position: int, result: Dict) -> str:
+    """One result card (position is the 1-based display position)."""
+    source = result['source']
+    source_emoji = SOURCE_EMOJIS.get(source, '📋')
+    source_label = source.replace('_', ' ').title()
+    difficulty = result['difficulty']
+    difficulty_color = DIFFICULTY_COLORS.get(difficulty, '#0ea5e9')
+    snippet = result.get('snippet', '')
+    snippet_html = (f"<p style='color: #cbd5e1; font-size: 0.9em; margin: 0 0 10px 0; "
+                    f"line-height: 1.5;'>{escape(snippet)}</p>") if snippet else ''
+
+    return f"""
+        <div style='background: #1e293b; border-radius: 12px; padding: 16px; margin-bottom: 14px;
+                    border: 1px solid #334155; box-shadow: 0 2px 8px rgba(0,0,0,0.3);
+                    border-left: 4px solid {difficulty_color};'>
+            <div style='display: flex; align-items: center; gap: 10px; margin-bottom: 8px;'>
+                <span style='background: {difficulty_color}; color: white; font-weight: 700;
+                             border-radius: 50%; width: 28px; height: 28px; display: flex;
+                             align-items: center; justify-content: center; font-size: 0.9em;'>
+                    {position}
+                </span>
+                <a href='{escape(result['url'])}' target='_blank' style='font-size: 1.1em; font-weight: 600;
+                   color: #f1f5f9; text-decoration: none; flex: 1;'>
+                    {source_emoji} {escape(result['title'])}
+                </a>
+            </div>
+            {snippet_html}
+            <div style='display: flex; gap: 8px; flex-wrap: wrap;'>
+                <span style='background: {difficulty_color}; color: white; padding: 4px 12px;
+                             border-radius: 999px; font-size: 0.85em; font-weight: 600;'>
+                    {difficulty}
+                </span>
+                <span style='background: #312e81; color: #a5b4fc; padding: 4px 12px;
+                             border-radius: 999px; font-size: 0.85em; font-weight: 600;'>
+                    {escape(source_label)}
+                </span>
+                <span style='background: #0f172a; color: #94a3b8; padding: 4px 12px;
+                             border-radius: 999px; font-size: 0.85em;'>
+                    Score: {result['score']:.4f}
+                </span>
+            </div>
+        </div>
+        """
+
+def render_results_html(query: str, results: List[Dict], sort_by_difficulty: bool = False) -> str:
+    """
+    Render a full result list.
+
+    Args:
+        query: The query as typed by the user
+        results: Result dicts with title, source, url, difficulty, score and snippet
+        sort_by_difficulty: Only changes the "Sorted:" caption
+    """
+    if not results:
+        return NO_RESULTS_HTML
+
+    parts = [render_header(query, len(results), sort_by_difficulty)]
+    parts.extend(render_result_card(i, result) for i, result in enumerate(results, 1))
+    return ''.join(parts)
+
+def render_startup_html(status: Dict) -> str:
+    """Message shown instead of results while the search engine is loading (or failed to)."""
+    if status['status'] == 'failed':
+        return (f"<p style='color: red;'>❌ The search engine failed to start "
+                f"(stage: {escape(str(status['stage']))}). Please try again later.</p>")
+    return (f"<p style='color: orange;'>⏳ The search engine is still loading "
+            f"(stage: {escape(str(status['stage']))}, {status['elapsed_seconds']:.0f}s). "
+            f"Please try again in a few seconds.</p>")
@@ -0,0 +1,242 @@
+"""
+Search Metrics - Superconductor Search
+=======================================
+
+Per-stage latency spans for the query path, aggregated into histograms
+and rendered in the Prometheus text format (served at /metrics by app.py).
+
+Stages:
+- tokenize:  query tokenization (timed inside model.encode)
+- forward:   transformer forward pass (rest of the query encode)
+- scan:      similarity scan (matrix multiply or FAISS search)
+- top_k:     top-k selection and passage -> document aggregation
+- bm25:      BM25 scoring (lexical / hybrid modes)
+- label:     attaching document fields to the ranked hits
+- render:    HTML assembly of the Gradio results
+
+Spans record exclusive time: a span nested in another (tokenize inside
+forward) is not counted twice. Spans only record inside a trace (one per
+request) or a batch (the request batcher's worker), and are free otherwise.
+
+Batched stages run once for every request of a batch, so they are
+observed once per batch, and copied into each request's trace for its log
+line.
+
+Usage:
+    with trace('api_search', trace_id) as t:
+        with span('label'):
+            ...
+    REGISTRY.render()   # Prometheus text exposition
+
+Set SEARCH_TRACE_LOG=1 to print one JSON line per request with its trace
+id and stage timings.
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+
+# Configuration
+LATENCY_BUCKETS = [0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]   # Seconds
+STAGE_METRIC = 'search_stage_duration_seconds'
+REQUEST_METRIC = 'search_request_duration_seconds'
+TRACE_ID_HEADER = 'X-Trace-Id'
+
+class Histogram:
+    """Cumulative-bucket latency histogram (Prometheus semantics)."""
+
+    def __init__(self, buckets: List[float] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)   # Last slot: +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+class MetricsRegistry:
+    """Labelled histogram families, safe to observe from any thread."""
+
+    def __init__(self):
+        self._families = {}   # name -> (help, label, {label value: Histogram})
+        self._lock = threading.Lock()
+
+    def register(self, name: str, help_text: str, label: str):
+        self._families.setdefault(name, (help_text, label, {}))
+
+    def observe(self, name: str, label_value: str, seconds: float):
+        with self._lock:
+            histograms = self._families[name][2]
+            if label_value not in histograms:
+                histograms[label_value] = Histogram()
+            histograms[label_value].observe(seconds)
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        with self._lock:
+            for name, (help_text, label, histograms) in self._families.items():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} histogram")
+                for value, histogram in sorted(histograms.items()):
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets + [float('inf')], histogram.counts):
+                        cumulative += count
+                        le = '+Inf' if bound == float('inf') else repr(bound)
+                        lines.append(f'{name}_bucket{{{label}="{value}",le="{le}"}} {cumulative}')
+                    lines.append(f'{name}_sum{{{label}="{value}"}} {histogram.sum!r}')
+                    lines.append(f'{name}_count{{{label}="{value}"}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = MetricsRegistry()
+REGISTRY.register(STAGE_METRIC, 'Time spent in each query path stage (batched stages: per batch)', 'stage')
+REGISTRY.register(REQUEST_METRIC, 'End-to-end search request latency', 'endpoint')
+
+# ============================================================================
+# SPANS
+# ============================================================================
+
+class SpanRecorder:
+    """Exclusive seconds per stage, recorded by span() in one thread."""
+
+    def __init__(self):
+        self.stages = {}
+        self._children = []   # Time spent in nested spans, per open span
+
+    def record(self, stage: str, seconds: float):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+class Trace(SpanRecorder):
+    """One request: its own spans, the spans of the batch it ran in, and log fields."""
+
+    def __init__(self, endpoint: str, trace_id: Optional[str] = None, **fields):
+        super().__init__()
+        self.endpoint = endpoint
+        self.trace_id = trace_id or uuid.uuid4().hex[:16]
+        self.fields = fields
+        self.batch_stages = {}
+        self.batch_size = None
+
+    def add_batch(self, stages: Dict[str, float], batch_size: int):
+        for stage, seconds in stages.items():
+            self.batch_stages[stage] = self.batch_stages.get(stage, 0.0) + seconds
+        self.batch_size = max(self.batch_size or 0, batch_size)
+
+    def log_record(self, total_seconds: float) -> Dict:
+        milliseconds = lambda stages: {stage: round(s * 1000, 3) for stage, s in stages.items()}
+        record = {'trace_id': self.trace_id, 'endpoint': self.endpoint,
+                  'total_ms': round(total_seconds * 1000, 3), **self.fields,
+                  'stages_ms': milliseconds(self.stages)}
+        if self.batch_size is not None:
+            record['batch_stages_ms'] = milliseconds(self.batch_stages)
+            record['batch_size'] = self.batch_size
+        return record
+
+_recorder: ContextVar[Optional[SpanRecorder]] = ContextVar('search_span_recorder', default=None)
+
+def current_trace() -> Optional[Trace]:
+    """Trace of the request running in this thread (None outside a trace)."""
+    recorder = _recorder.get()
+    return recorder if isinstance(recorder, Trace) else None
+
+def annotate(**fields):
+    """Add fields to the current request's log line (no-op outside a trace)."""
+    trace = current_trace()
+    if trace is not None:
+        trace.fields.update(fields)
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Time a stage of the query path (exclusive of nested spans)."""
+    recorder = _recorder.get()
+    if recorder is None:
+        yield
+        return
+    recorder._children.append(0.0)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        recorder.record(stage, elapsed - recorder._children.pop())
+        if recorder._children:
+            recorder._children[-1] += elapsed
+
+def trace_log_enabled() -> bool:
+    return os.environ.get('SEARCH_TRACE_LOG', '0') == '1'
+
+@contextmanager
+def trace(endpoint: str, trace_id: Optional[str] = None, **fields) -> Iterator[Trace]:
+    """
+    Trace one request: its spans and total latency go to the histograms,
+    and to a JSON log line if SEARCH_TRACE_LOG=1.
+
+    Args:
+        endpoint: Request histogram label ('ui', 'api_search', ...)
+        trace_id: Incoming id (e.g. X-Request-ID header), else a new random one
+        fields: Extra log fields (mode, k, ...)
+    """
+    current = Trace(endpoint, trace_id, **fields)
+    token = _recorder.set(current)
+    start = time.perf_counter()
+    try:
+        yield current
+    finally:
+        total = time.perf_counter() - start
+        _recorder.reset(token)
+        for stage, seconds in current.stages.items():
+            REGISTRY.observe(STAGE_METRIC, stage, seconds)
+        REGISTRY.observe(REQUEST_METRIC, endpoint, total)
+        if trace_log_enabled():
+            print(json.dumps(current.log_record(total)), flush=True)
+
+@contextmanager
+def batch_spans(traces: List[Optional[Trace]]) -> Iterator[SpanRecorder]:
+    """
+    Record the spans of one batch (in the batcher's worker thread): observed
+    once, then copied into the trace of every request in the batch.
+    """
+    recorder = SpanRecorder()
+    token = _recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _recorder.reset(token)
+        for stage, seconds in recorder.stages.items():
+            REGISTRY.observe(STAGE_METRIC, stage, seconds)
+        for request_trace in traces:
+            if request_trace is not None:
+                request_trace.add_batch(recorder.stages, len(traces))
+
+def instrument_encoder(model):
+    """
+    Time tokenization inside model.encode (a 'tokenize' span around
+    model.tokenize, which SentenceTransformer.encode calls per batch).
+    """
+    tokenize = getattr(model, 'tokenize', None)
+    if tokenize is None or getattr(tokenize, 'timed', False):
+        return model
+
+    def timed_tokenize(*args, **kwargs):
+        with span('tokenize'):
+            return tokenize(*args, **kwargs)
+
+    timed_tokenize.timed = True
+    model.tokenize = timed_tokenize
+    return model
+
+def incoming_trace_id(headers) -> Optional[str]:
+    """Trace id from X-Request-ID, or the trace id part of a W3C traceparent header."""
+    if headers.get('x-request-id'):
+        return headers['x-request-id'][:64]
+    parts = headers.get('traceparent', '').split('-')
+    return parts[1] if len(parts) == 4 and len(parts[1]) == 32 else None
@@ -0,0 +1,137 @@
+"""
+Startup - Superconductor Search
+================================
+
+Staged initialization in a background thread, with liveness / readiness
+states for health checks.
+
+The HTTP server starts immediately and answers /healthz and /readyz while
+the model and index load; search requests wait (up to a configurable
+time) or are rejected with 503 and the current stage until the search
+bundle is ready.
+
+States:
+- starting:  stages are running (alive, not ready)
+- ready:     every stage finished (alive, ready)
+- failed:    a stage raised (not alive: the orchestrator should restart)
+
+Usage:
+    startup = StagedStartup(bundle.stages())
+    startup.start()
+    startup.wait(timeout=5.0)      # True once ready
+    startup.status()               # JSON-ready progress with per-stage timings
+"""
+
+import threading
+import time
+import traceback
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Defaults
+READY_WAIT_SECONDS = 0.0      # How long a request waits for startup before 503 (0 = reject at once)
+RETRY_AFTER_SECONDS = 5       # Retry-After sent with 503 responses
+
+class StagedStartup:
+    """Run named stages in order in a daemon thread and record their progress."""
+
+    def __init__(self, stages: List[Tuple[str, Callable[[], None]]],
+                 on_ready: Optional[Callable[[], None]] = None,
+                 name: str = 'startup'):
+        """
+        Args:
+            stages: (name, function) pairs, run in order
+            on_ready: Called (in the startup thread) after the last stage succeeds
+        """
+        self.stages = [{'name': stage_name, 'status': 'pending', 'seconds': None}
+                       for stage_name, _ in stages]
+        self._functions = [function for _, function in stages]
+        self.on_ready = on_ready
+        self.state = 'starting'
+        self.current_stage = None
+        self.error = None
+        self._started_at = None
+        self._finished_at = None
+        self._ready = threading.Event()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def start(self) -> 'StagedStartup':
+        """Start the stages in the background (returns immediately)."""
+        self._started_at = time.monotonic()
+        self._thread.start()
+        return self
+
+    def run(self) -> 'StagedStartup':
+        """Run the stages in the calling thread."""
+        self._started_at = time.monotonic()
+        self._run()
+        return self
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    @property
+    def alive(self) -> bool:
+        """Liveness: false only once a stage has failed."""
+        return self.state != 'failed'
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until ready or failed (or timeout); returns whether ready."""
+        if timeout is None or timeout > 0:
+            self._done.wait(timeout)
+        return self.ready
+
+    def status(self) -> Dict:
+        """JSON-ready startup progress."""
+        end = self._finished_at or time.monotonic()
+        return {
+            'status': self.state,
+            'stage': self.current_stage,
+            'elapsed_seconds': round(end - self._started_at, 3) if self._started_at else 0.0,
+            'stages': [dict(stage) for stage in self.stages],
+            'error': self.error,
+        }
+
+    def _run(self):
+        print("=" * 70)
+        print("🚀 Loading Superconductor Search V7...")
+        print("=" * 70)
+        for stage, function in zip(self.stages, self._functions):
+            self.current_stage = stage['name']
+            stage['status'] = 'running'
+            start = time.perf_counter()
+            try:
+                function()
+            except Exception as e:
+                stage['status'] = 'failed'
+                stage['seconds'] = round(time.perf_counter() - start, 3)
+                self._fail(e)
+                return
+            stage['seconds'] = round(time.perf_counter() - start, 3)
+            stage['status'] = 'done'
+            print(f"   ⏱️  {stage['name']}: {stage['seconds']:.2f}s")
+
+        try:
+            if self.on_ready is not None:
+                self.on_ready()
+        except Exception as e:
+            self._fail(e)
+            return
+
+        self.current_stage = None
+        self.state = 'ready'
+        self._finished_at = time.monotonic()
+        self._ready.set()
+        self._done.set()
+        print("=" * 70)
+        print(f"✅ Search system ready in {self._finished_at - self._started_at:.1f}s")
+        print("=" * 70)
+
+    def _fail(self, error: Exception):
+        self.error = f"{type(error).__name__}: {error}"
+        self.state = 'failed'
+        self._finished_at = time.monotonic()
+        print(f"❌ Startup failed in stage '{self.current_stage}': {self.error}")
+        traceback.print_exc()
+        self._done.set()
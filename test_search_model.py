@@ -10,89 +10,71 @@ Tests:
 3. YouTube video inclusion in results
 4. Material-specific queries
 5. Person-specific queries
+
+Queries go through the shared search engine (search_engine.py) over the
+same index artifact as the app, ranked by embeddings only (SEARCH_MODE).
 """
 
-import json
-import numpy as np
-import faiss
-from sentence_transformers import SentenceTransformer
-from typing import List, Dict, Tuple
-import os
+import time
+from typing import List, Dict
+
+from search_engine import load_search_engine
 
 # Configuration
-MODEL_PATH = 'models/superconductor-search-v2'
+MODEL_PATH = 'models/superconductor-search-v7'
 INDEX_DIR = 'search_index'
 TOP_K = 5  # Number of results to return
-
-class SearchEngine:
-    """Semantic search engine using trained model."""
-
-    def __init__(self, model_path: str, index_dir: str):
-        print("🔧 Initializing Search Engine...")
-
-        # Load model
-        print(f"   Loading model: {model_path}")
-        self.model = SentenceTransformer(model_path)
-
-        # Load FAISS index
-        index_path = os.path.join(index_dir, 'faiss_index.bin')
-        print(f"   Loading index: {index_path}")
-        self.index = faiss.read_index(index_path)
-
-        # Load metadata
-        metadata_path = os.path.join(index_dir, 'document_metadata.json')
-        print(f"   Loading metadata: {metadata_path}")
-        with open(metadata_path, 'r', encoding='utf-8') as f:
-            self.metadata = json.load(f)
-
-        print(f"✅ Search engine initialized ({len(self.metadata):,} documents)")
-
-    def search(self, query: str, k: int = TOP_K) -> List[Dict]:
-        """Search for documents matching the query."""
-        # Generate query embedding
-        query_embedding = self.model.encode([query], convert_to_numpy=True)
-
-        # Normalize for cosine similarity
-        faiss.normalize_L2(query_embedding)
-
-        # Search
-        scores, indices = self.index.search(query_embedding, k)
-
-        # Prepare results
-        results = []
-        for i, (score, idx) in enumerate(zip(scores[0], indices[0])):
-            if idx < len(self.metadata):
-                result = self.metadata[idx].copy()
-                result['score'] = float(score)
-                result['rank'] = i + 1
-                results.append(result)
-
-        return results
-
-    def print_results(self, query: str, results: List[Dict]):
-        """Print search results in a readable format."""
-        print(f"\n🔍 Query: \"{query}\"")
-        print("─" * 70)
-
-        for result in results:
-            rank = result['rank']
-            score = result['score']
-            title = result['title'][:60]
-            source = result['source']
-            difficulty = result['difficulty']
-            doc_id = result['id']
-
-            # Difficulty labels
-            diff_labels = ['Unspecified', 'Beginner', 'Intermediate', 'Advanced', 'Expert', 'Cutting-edge']
-            diff_label = diff_labels[difficulty] if difficulty < len(diff_labels) else 'Unknown'
-
-            print(f"\n{rank}. [{score:.4f}] {title}")
-            print(f"   Source: {source} | Difficulty: {diff_label} | ID: {doc_id}")
-
-            # Show preview
-            preview = result.get('text_preview', '')[:100]
-            if preview:
-                print(f"   Preview: {preview}...")
+SEARCH_MODE = 'dense'  # The model is under test: no BM25 / fusion
+
+# Test queries by category (also used by build_search_index.py --benchmark)
+TEST_CASES = {
+    "Previously Failing Queries": [
+        "what is superconductivity",
+        "iron-based superconductors",
+        "cooper pairs",
+    ],
+    "Generic vs Specific": [
+        "superconductivity basics",
+        "BCS theory derivation",
+        "high temperature superconductor mechanisms",
+    ],
+    "Material-Specific": [
+        "cuprate superconductors",
+        "MgB2 superconductor",
+        "iron pnictides",
+    ],
+    "Person-Specific": [
+        "Brian Josephson contributions",
+        "Leon Cooper research",
+        "who discovered BCS theory",
+    ],
+    "Phenomenon-Specific": [
+        "meissner effect",
+        "flux pinning",
+        "quantum levitation",
+    ],
+}
+
+def print_results(query: str, results: List[Dict]):
+    """Print search results in a readable format."""
+    print(f"\n🔍 Query: \"{query}\"")
+    print("─" * 70)
+
+    for result in results:
+        rank = result['rank']
+        score = result['score']
+        title = result['title'][:60]
+        source = result['source']
+        diff_label = result['difficulty']
+        doc_id = result['id']
+
+        print(f"\n{rank}. [{score:.4f}] {title}")
+        print(f"   Source: {source} | Difficulty: {diff_label} | ID: {doc_id}")
+
+        # Show preview (best-matching passage)
+        preview = result.get('snippet', '')[:100]
+        if preview:
+            print(f"   Preview: {preview}...")
 
 def run_test_suite():
     """Run comprehensive test suite."""
@@ -101,36 +83,15 @@ def run_test_suite():
     print("=" * 70)
 
     # Initialize search engine
-    search_engine = SearchEngine(MODEL_PATH, INDEX_DIR)
-
-    # Define test queries
-    test_cases = {
-        "Previously Failing Queries": [
-            "what is superconductivity",
-            "iron-based superconductors",
-            "cooper pairs",
-        ],
-        "Generic vs Specific": [
-            "superconductivity basics",
-            "BCS theory derivation",
-            "high temperature superconductor mechanisms",
-        ],
-        "Material-Specific": [
-            "cuprate superconductors",
-            "MgB2 superconductor",
-            "iron pnictides",
-        ],
-        "Person-Specific": [
-            "Brian Josephson contributions",
-            "Leon Cooper research",
-            "who discovered BCS theory",
-        ],
-        "Phenomenon-Specific": [
-            "meissner effect",
-            "flux pinning",
-            "quantum levitation",
-        ],
-    }
+    search_engine = load_search_engine(MODEL_PATH, INDEX_DIR)
+
+    test_cases = TEST_CASES
+
+    # Search every test query in one batch (one encode call, one index search)
+    all_queries = [q for queries in test_cases.values() for q in queries]
+    start = time.perf_counter()
+    all_results = dict(zip(all_queries, search_engine.search_many(all_queries, TOP_K, mode=SEARCH_MODE)))
+    print(f"\n⚡ Searched {len(all_queries)} queries in {(time.perf_counter() - start) * 1000:.0f} ms (one batch)")
 
     # Run tests
     for category, queries in test_cases.items():
@@ -139,15 +100,15 @@ def run_test_suite():
         print("=" * 70)
 
         for query in queries:
-            results = search_engine.search(query, k=5)
-            search_engine.print_results(query, results)
+            results = all_results[query]
+            print_results(query, results)
 
             # Check for issues
             print("\n   📊 Analysis:")
 
             # Check YouTube inclusion
             youtube_count = sum(1 for r in results if 'youtube' in r['source'])
-            print(f"      - YouTube videos: {youtube_count}/5")
+            print(f"      - YouTube videos: {youtube_count}/{TOP_K}")
 
             # Check for biographical content in generic queries
             if any(word in query.lower() for word in ['what is', 'basics', 'explain']):
@@ -177,7 +138,6 @@ def run_test_suite():
     print("📊 TEST SUMMARY")
     print("=" * 70)
 
-    all_queries = [q for queries in test_cases.values() for q in queries]
     print(f"\n✅ Tested {len(all_queries)} queries across {len(test_cases)} categories")
 
     print("\n🎯 Key Improvements to Verify:")
@@ -196,7 +156,7 @@ def test_specific_case():
     print("🎯 SPECIFIC TEST: Previously Failing Query")
     print("=" * 70)
 
-    search_engine = SearchEngine(MODEL_PATH, INDEX_DIR)
+    search_engine = load_search_engine(MODEL_PATH, INDEX_DIR)
 
     # The query that was returning Brian Josephson biographical content
     query = "what is superconductivity"
@@ -207,8 +167,8 @@ def test_specific_case():
     print(f"   Previously got: Brian Josephson biographical videos")
     print(f"   Should be fixed: Hard negatives prevent bio content matching generic queries")
 
-    results = search_engine.search(query, k=10)
-    search_engine.print_results(query, results)
+    results = search_engine.search(query, 10, mode=SEARCH_MODE)
+    print_results(query, results)
 
     # Check if Brian Josephson appears
     print("\n🔍 Checking for biographical content...")
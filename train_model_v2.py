@@ -18,6 +18,8 @@ from sentence_transformers import SentenceTransformer, InputExample, losses, eva
 from torch.utils.data import DataLoader
 import torch
 
+from json_stream import load_records
+
 # Configuration
 TRAINING_DATA = 'training/training_dataset.json'
 DOCUMENTS_FILE = 'training/documents.json'
@@ -36,8 +38,7 @@ def load_training_data():
     print("📂 Loading Training Data")
     print("="*70)
 
-    with open(TRAINING_DATA, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    data = load_records(TRAINING_DATA)
 
     print(f"\n✅ Loaded {len(data):,} training examples")
 
@@ -145,8 +146,7 @@ def train_model():
     training_data = load_training_data()
 
     print(f"\n📂 Loading documents for evaluation...")
-    with open(DOCUMENTS_FILE, 'r', encoding='utf-8') as f:
-        documents = json.load(f)
+    documents = load_records(DOCUMENTS_FILE, key='documents')
     print(f"✅ Loaded {len(documents):,} documents")
 
     # Create InputExamples